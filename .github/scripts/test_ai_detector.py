@@ -0,0 +1,91 @@
+import sys
+import os
+
+import numpy as np
+
+# Appended: ai_detector only exists in the engine, and test_auth_* (collected next) import the backend's main
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../engine')))
+from ai_detector import class_mask, cpu_pool_layout, roi_crop_box, uncrop_results, yolov8_candidates
+
+LABELS = {0: 'person', 1: 'bicycle', 2: 'car', 3: 'motorcycle', 5: 'bus', 7: 'truck', 15: 'cat', 16: 'dog'}
+VEHICLES = ["car", "truck", "bus", "motorcycle"]
+SCALE, ZERO = 0.004, -128
+
+def reference(output, scale, zero, threshold, allowed_objects):
+    """The former per-row loop of AIDetector.detect(), on (anchors, 4 + classes)"""
+    boxes, scores, labels = [], [], []
+    for row in output:
+        f_row = (row.astype(np.float32) - zero) * scale if (scale != 1.0 or zero != 0) else row.astype(np.float32)
+        class_id = np.argmax(f_row[4:])
+        score = float(f_row[4:][class_id])
+        if score >= threshold:
+            label = LABELS.get(class_id, "unknown")
+            if label in allowed_objects or ("vehicle" in allowed_objects and label in VEHICLES):
+                xc, yc, bw, bh = f_row[:4]
+                boxes.append([float(xc - bw/2), float(yc - bh/2), float(bw), float(bh)])
+                scores.append(score)
+                labels.append(label)
+    return boxes, scores, labels
+
+def make_output(num_classes=80, anchors=2100, seed=0):
+    """Quantized (4 + classes, anchors) tensor: background noise and some confident anchors"""
+    rng = np.random.default_rng(seed)
+    output = rng.integers(-128, -90, size=(4 + num_classes, anchors), dtype=np.int8)
+    output[:4] = rng.integers(-120, 127, size=(4, anchors), dtype=np.int8)
+    hits = rng.choice(anchors, 200, replace=False)
+    output[4 + rng.integers(0, num_classes, 200), hits] = rng.integers(0, 127, 200, dtype=np.int8)
+    return output
+
+def check(output, allowed_objects, threshold=0.5):
+    allowed = class_mask(LABELS, min(output.shape) - 4, allowed_objects, VEHICLES)
+    boxes, scores, class_ids = yolov8_candidates(output, SCALE, ZERO, threshold, allowed)
+    rows = output.T if output.shape[0] < output.shape[1] else output
+    ref_boxes, ref_scores, ref_labels = reference(rows, SCALE, ZERO, threshold, allowed_objects)
+    assert len(ref_scores) > 0
+    np.testing.assert_allclose(boxes, ref_boxes, rtol=1e-6, atol=1e-6)
+    np.testing.assert_allclose(scores, ref_scores, rtol=1e-6)
+    assert [LABELS.get(int(c), "unknown") for c in class_ids] == ref_labels
+
+def test_matches_per_row_decode_in_both_layouts():
+    output = make_output()
+    check(output, ["person", "vehicle"])
+    check(np.ascontiguousarray(output.T), ["person", "vehicle"])
+    check(output, ["dog", "cat", "bicycle"], threshold=0.3)
+
+def test_class_mask_maps_vehicle_types():
+    mask = class_mask(LABELS, 20, ["person", "vehicle"], VEHICLES)
+    assert np.flatnonzero(mask).tolist() == [0, 2, 3, 5, 7]
+    assert not class_mask(LABELS, 20, ["dog"], VEHICLES)[2]
+
+def test_float_output_and_no_candidates():
+    output = np.zeros((84, 100), dtype=np.float32)
+    output[:4, 7] = [0.5, 0.5, 0.2, 0.4]
+    output[4 + 2, 7] = 0.9  # car
+    allowed = class_mask(LABELS, 80, ["vehicle"], VEHICLES)
+    # TFLite reports (0.0, 0) for the quantization of float tensors
+    boxes, scores, class_ids = yolov8_candidates(output, 0.0, 0, 0.5, allowed)
+    np.testing.assert_allclose(boxes, [[0.4, 0.3, 0.2, 0.4]], rtol=1e-6)
+    assert scores.tolist() == [np.float32(0.9)] and class_ids.tolist() == [2]
+
+    boxes, scores, class_ids = yolov8_candidates(output, 1.0, 0, 0.95, allowed)
+    assert boxes.shape == (0, 4) and len(scores) == 0 and len(class_ids) == 0
+
+def test_cpu_pool_layout():
+    assert cpu_pool_layout(0, cores=2) == (1, 1)
+    assert cpu_pool_layout(0, cores=8) == (2, 2)
+    assert cpu_pool_layout(0, cores=32) == (4, 4)
+    # An explicit pool size keeps AI within half of the cores
+    assert cpu_pool_layout(3, cores=8) == (3, 1)
+
+def test_roi_crop_box_pads_and_clamps():
+    # Small change in the middle: padded to a square, at least a quarter of the short side
+    assert roi_crop_box((0.45, 0.45, 0.55, 0.55), 1280, 720) == (544, 264, 736, 456)
+    # Near the corner the box is shifted inside the frame, not shrunk
+    assert roi_crop_box((0.95, 0.9, 1.0, 1.0), 1280, 720) == (1100, 540, 1280, 720)
+    # Most of the frame changed: no crop
+    assert roi_crop_box((0.0, 0.0, 0.9, 0.9), 1280, 720) is None
+
+def test_uncrop_results_maps_boxes_to_the_full_frame():
+    results = [{"label": "person", "box": [0.0, 0.0, 1.0, 0.5]}]
+    uncrop_results(results, (0.5, 0.25, 1.0, 0.75))
+    assert results[0]["box"] == [0.25, 0.5, 0.75, 0.75]
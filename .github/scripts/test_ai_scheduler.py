@@ -0,0 +1,125 @@
+import sys
+import os
+import threading
+import time
+
+# Appended, as in test_ai_detector: test_auth_* (collected next) import the backend's main
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../engine')))
+from ai_scheduler import AIScheduler
+
+class GatedRun:
+    """run() that blocks until released, recording the order cameras were served in"""
+    def __init__(self):
+        self.order = []
+        self.gate = threading.Event()
+
+    def __call__(self, task, worker):
+        self.gate.wait(5)
+        camera_id, frame = task
+        self.order.append(camera_id)
+        return [f"{camera_id}:{frame}"]
+
+def wait_until(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+def test_latest_frame_only_and_results_through_futures():
+    run = GatedRun()
+    scheduler = AIScheduler(run)
+    try:
+        first = scheduler.submit(1, (1, "a"))
+        wait_until(first.running)
+        # While camera 1 is being served, newer frames replace the waiting one
+        stale = scheduler.submit(1, (1, "b"))
+        latest = scheduler.submit(1, (1, "c"))
+        assert stale.cancelled()
+        run.gate.set()
+        assert first.result(timeout=5) == ["1:a"]
+        assert latest.result(timeout=5) == ["1:c"]
+        stats = scheduler.get_stats()["cameras"][1]
+        assert stats["submitted"] == 3 and stats["inferred"] == 2 and stats["dropped"] == 1
+        assert stats["max_wait_ms"] >= 0 and stats["rate_fps"] > 0
+    finally:
+        scheduler.stop()
+
+def test_weighted_round_robin():
+    weights = {1: 1.0, 2: 1.0, 3: 2.0}  # Camera 3 has motion
+    order = []
+    done = threading.Event()
+    def run(camera_id, worker):
+        order.append(camera_id)
+        if len(order) == 41:
+            done.set()
+        # Every camera always has a newer frame waiting
+        for cam, weight in weights.items():
+            scheduler.submit(cam, cam, weight=weight)
+        return []
+    scheduler = AIScheduler(run)
+    try:
+        scheduler.submit(0, 0)
+        assert done.wait(5)
+        served = order[1:41]
+        assert served.count(3) == 20
+        assert served.count(1) == served.count(2) == 10
+    finally:
+        scheduler.stop()
+
+def test_fps_budget_spaces_turns():
+    served_at = []
+    def run(task, worker):
+        served_at.append(time.monotonic())
+        return []
+    scheduler = AIScheduler(run)
+    try:
+        for _ in range(3):
+            scheduler.submit(7, (7, "f"), fps_budget=20).result(timeout=5)
+        assert all(b - a >= 0.045 for a, b in zip(served_at, served_at[1:]))
+        assert scheduler.get_stats()["cameras"][7]["fps_budget"] == 20
+    finally:
+        scheduler.stop()
+
+def test_restart_abandons_a_stuck_run():
+    stuck = threading.Event()
+    release = threading.Event()
+    def run(task, worker):
+        if task == "hang":
+            stuck.set()
+            release.wait(5)
+            return ["late"]
+        return ["ok"]
+    scheduler = AIScheduler(run)
+    try:
+        hung = scheduler.submit(1, "hang")
+        stuck.wait(5)
+        queued = scheduler.submit(2, "next")
+        assert scheduler.busy_for() > 0
+        scheduler.restart([])
+        assert hung.result(timeout=1) == []
+        # A new thread serves the other cameras while the old one is stuck
+        assert queued.result(timeout=5) == ["ok"]
+        release.set()
+    finally:
+        scheduler.stop()
+
+def test_worker_pool_runs_cameras_in_parallel():
+    barrier = threading.Barrier(3, timeout=5)
+    workers = set()
+    def run(task, worker):
+        workers.add(worker)
+        barrier.wait()  # Only passes if three cameras are being inferred at once
+        return [worker]
+    scheduler = AIScheduler(run, workers=3)
+    try:
+        futures = [scheduler.submit(camera_id, camera_id) for camera_id in range(3)]
+        assert sorted(f.result(timeout=5)[0] for f in futures) == [0, 1, 2]
+        assert workers == {0, 1, 2}
+
+        scheduler.set_workers(1)
+        wait_until(lambda: len(scheduler._threads) == 1)
+        barrier = threading.Barrier(1)
+        assert scheduler.submit(5, 5).result(timeout=5) == [0]
+        assert scheduler.get_stats()["workers"] == 1
+    finally:
+        scheduler.stop()
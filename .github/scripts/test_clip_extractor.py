@@ -0,0 +1,103 @@
+import sys
+import os
+import threading
+
+import av
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../engine')))
+from clip_extractor import ClipExtractor, remux_clip
+
+FPS = 10
+
+def _segment(path, seconds, gop=FPS):
+    """Small MPEG-4 file with a keyframe every `gop` frames"""
+    with av.open(str(path), mode='w') as out:
+        stream = out.add_stream('mpeg4', rate=FPS)
+        stream.width, stream.height = 64, 48
+        stream.pix_fmt = 'yuv420p'
+        stream.codec_context.gop_size = gop
+        stream.codec_context.options = {'sc_threshold': '1000000000'}  # No scene-cut keyframes
+        gradient = np.tile(np.arange(64, dtype=np.uint8) * 4, (48, 1))
+        for i in range(int(seconds * FPS)):
+            img = np.dstack([np.roll(gradient, i, axis=1)] * 3)
+            frame = av.VideoFrame.from_ndarray(img, format='bgr24')
+            frame.pts = i
+            for packet in stream.encode(frame):
+                out.mux(packet)
+        for packet in stream.encode(None):
+            out.mux(packet)
+    return str(path)
+
+def _duration(path):
+    with av.open(path) as inp:
+        stream = inp.streams.video[0]
+        return stream.frames, [float(p.pts * p.time_base) for p in inp.demux(stream) if p.pts is not None]
+
+def test_remux_single_segment_starts_on_keyframe(tmp_path):
+    seg = _segment(tmp_path / 'a.mp4', 6)
+    duration, size = remux_clip([(seg, 1.5, 4.0)], str(tmp_path / 'clip.mp4'))
+    # Starts at the keyframe at 1.0 s, stops before 4.0 s
+    assert abs(duration - 3.0) < 0.15
+    assert size == (64, 48)
+    frames, pts = _duration(str(tmp_path / 'clip.mp4'))
+    assert frames == 30
+    assert pts[0] == 0.0
+
+def test_remux_across_segments_is_continuous(tmp_path):
+    a = _segment(tmp_path / 'a.mp4', 4)
+    b = _segment(tmp_path / 'b.mp4', 4)
+    duration, _ = remux_clip([(a, 2.0, 4.0), (b, 0.0, 2.0)], str(tmp_path / 'clip.mp4'))
+    assert abs(duration - 4.0) < 0.15
+    frames, pts = _duration(str(tmp_path / 'clip.mp4'))
+    assert frames == 40
+    assert sorted(pts) == sorted(set(pts))
+    assert max(pts) < 4.0
+
+def test_clip_waits_for_open_segment(tmp_path):
+    a = _segment(tmp_path / 'a.mp4', 5)
+    b = _segment(tmp_path / 'b.mp4', 5)
+    events = []
+    done = threading.Event()
+    def callback(camera_id, event_type, payload):
+        events.append((camera_id, event_type, payload))
+        done.set()
+
+    extractor = ClipExtractor(7, 'Test')
+    extractor.segment_started(a, 100.0)
+    extractor.segment_finished(a, 105.0)
+    extractor.segment_started(b, 105.0)
+    extractor.add_clip(103.0, 107.0, str(tmp_path / 'clips' / 'm.mp4'), {"ai_metadata": "person"}, callback)
+    assert not done.wait(0.3)
+    assert extractor.pending() == 1
+
+    extractor.segment_finished(b, 110.0)
+    assert done.wait(10)
+    camera_id, event_type, payload = events[0]
+    assert (camera_id, event_type) == (7, 'recording_end')
+    assert payload["file_path"] == str(tmp_path / 'clips' / 'm.mp4')
+    assert payload["reason"] == "Motion"
+    assert payload["ai_metadata"] == "person"
+    assert payload["start_time"] == 103.0
+    assert (payload["width"], payload["height"]) == (64, 48)
+    assert os.path.getsize(payload["file_path"]) > 0
+    assert abs(payload["duration"] - 4.0) < 0.15
+    assert os.path.exists(payload["thumbnail_path"])
+
+def test_short_or_uncovered_clips_are_discarded(tmp_path):
+    a = _segment(tmp_path / 'a.mp4', 3)
+    extractor = ClipExtractor(1, 'Test')
+    extractor.segment_started(a, 100.0)
+    extractor.segment_finished(a, 103.0)
+    extractor._extract((100.2, 101.0, str(tmp_path / 'short.mp4'), {}, None), extractor._sources(100.2, 101.0))
+    extractor._extract((200.0, 210.0, str(tmp_path / 'none.mp4'), {}, None), extractor._sources(200.0, 210.0))
+    assert not os.path.exists(tmp_path / 'short.mp4')
+    assert not os.path.exists(tmp_path / 'none.mp4')
+    assert extractor.stats["discarded"] == 2
+
+def test_invalid_segment_is_forgotten(tmp_path):
+    extractor = ClipExtractor(1, 'Test')
+    extractor.segment_started('/nowhere/a.mp4', 100.0)
+    assert extractor._sources(90.0, 110.0) is None
+    extractor.segment_finished('/nowhere/a.mp4', 101.0, valid=False)
+    assert extractor._sources(90.0, 110.0) == []
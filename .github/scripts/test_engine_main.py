@@ -127,3 +127,22 @@ def test_update_config_ai_model_and_hardware_update_actual(mock_set_enabled, moc
         mock_update_model.assert_called_once_with("yolov8n")
         mock_update_hardware.assert_called_once_with("cpu")
         mock_set_enabled.assert_not_called()
+
+def test_update_config_ai_fps_budget_reaches_the_scheduler():
+    """opt_ai_fps_budget synced through /config caps every camera, whatever its own config holds."""
+    import numpy as np
+    from ai_detector import AIDetector
+
+    response = client.post("/config", json={"opt_ai_fps_budget": 0})
+    assert response.status_code == 200
+    assert GLOBAL_CONFIG["opt_ai_fps_budget"] == 0
+
+    with patch.object(AIDetector, "_instance", None):
+        detector = AIDetector(config=GLOBAL_CONFIG)
+    detector._enabled = True
+    detector.interpreter = object()
+    detector.scheduler = MagicMock()
+    detector.scheduler.busy_for.return_value = 0.0
+    with patch.object(detector, "_preprocess", return_value=("input", (300, 300))):
+        detector.submit(np.zeros((48, 64, 3), dtype=np.uint8), camera_id=1, config={"ai_threshold": 0.5})
+    assert detector.scheduler.submit.call_args.kwargs["fps_budget"] == 0
@@ -0,0 +1,47 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath('backend'))
+from unittest.mock import patch, MagicMock
+
+import event_file_service
+
+def _process(payload, tmp_path):
+    created = []
+    with patch.object(event_file_service.database, 'SessionLocal', return_value=MagicMock()), \
+         patch.object(event_file_service.crud, 'get_camera', return_value=MagicMock(id=1)), \
+         patch.object(event_file_service.crud, 'create_event', side_effect=lambda db, data: created.append(data)), \
+         patch.object(event_file_service.storage_service, 'translate_path', side_effect=lambda p: p), \
+         patch.object(event_file_service, 'is_path_safe', return_value=True), \
+         patch.object(event_file_service.subprocess, 'run') as run:
+        event_file_service.process_webhook_file_event(1, "movie_end", payload, in_schedule=False)
+    return created[0], run
+
+def test_engine_metadata_skips_ffprobe_and_ffmpeg(tmp_path):
+    video = tmp_path / 'a.mp4'
+    video.write_bytes(b'\0' * 2048)
+    thumb = tmp_path / 'a.jpg'
+    thumb.write_bytes(b'jpeg')
+    payload = {"file_path": str(video), "timestamp": "2026-01-01T10:00:00+00:00", "reason": "Motion",
+               "duration": 12.5, "thumbnail_path": str(thumb)}
+    event, run = _process(payload, tmp_path)
+    run.assert_not_called()
+    assert (event.timestamp_end - event.timestamp_start).total_seconds() == 12.5
+    assert event.thumbnail_path == str(thumb)
+    assert event.file_size == 2048
+
+def test_engine_start_time_wins_over_webhook_time(tmp_path):
+    video = tmp_path / 'a.mp4'
+    video.write_bytes(b'\0' * 2048)
+    payload = {"file_path": str(video), "timestamp": "2026-01-01T10:05:00+00:00", "reason": "Motion",
+               "start_time": "2026-01-01T10:00:30+00:00", "duration": 20.0}
+    event, _ = _process(payload, tmp_path)
+    assert event.timestamp_start.isoformat() == "2026-01-01T10:00:30+00:00"
+    assert event.timestamp_end.isoformat() == "2026-01-01T10:00:50+00:00"
+
+def test_payload_without_metadata_still_probes(tmp_path):
+    video = tmp_path / 'a.mp4'
+    video.write_bytes(b'\0' * 2048)
+    payload = {"file_path": str(video), "timestamp": "2026-01-01T10:00:00+00:00", "reason": "Motion"}
+    _, run = _process(payload, tmp_path)
+    commands = [c.args[0][0] for c in run.call_args_list]
+    assert commands == ["ffprobe", "ffmpeg"]
@@ -0,0 +1,107 @@
+import sys
+import os
+import queue
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../engine')))
+from frame_queue import FrameQueue, OVERLOAD_SECONDS
+from precapture_buffer import EncodedFrame
+
+FRAME = np.zeros((100, 100, 3), dtype=np.uint8)  # 30000 bytes
+
+def test_bounded_by_bytes_not_count():
+    q = FrameQueue(3 * FRAME.nbytes)
+    for i in range(3):
+        q.put_nowait((i, FRAME))
+    with pytest.raises(queue.Full):
+        q.put_nowait((3, FRAME))
+    q.put_nowait(None)
+    assert q.qsize() == 4
+    assert q.nbytes == 3 * FRAME.nbytes
+    assert [q.get()[0] for _ in range(3)] == [0, 1, 2]
+    assert q.get() is None
+    with pytest.raises(queue.Empty):
+        q.get(timeout=0.01)
+    assert q.stats["dropped"] == 1 and q.stats["overloads"] == 1
+
+    # Compressed pre-capture frames count with their compressed size
+    small = FrameQueue(1000)
+    small.put_nowait((0, EncodedFrame(np.zeros(400, dtype=np.uint8))))
+    small.put_nowait((1, EncodedFrame(np.zeros(400, dtype=np.uint8))))
+    assert small.nbytes == 800
+
+def test_reduce_fps_thins_frames_as_the_queue_fills():
+    q = FrameQueue(8 * FRAME.nbytes, policy="reduce_fps")
+    for i in range(40):
+        try:
+            q.put_nowait((i, FRAME))
+        except queue.Full:
+            pass
+    kept = [q.get()[0] for _ in range(q.qsize())]
+    # Full rate up to half the budget, then every 2nd and every 4th frame
+    assert kept[:4] == [0, 1, 2, 3]
+    assert kept[4:6] == [5, 7]
+    assert all(b - a == 4 for a, b in zip(kept[6:], kept[7:]))
+    assert q.stats["decimated"] > 0
+    # Back to the full rate once the writer has drained the queue
+    for i in range(3):
+        q.put_nowait((100 + i, FRAME))
+    assert q.qsize() == 3 and q.stride == 1
+
+def test_overloaded_after_sustained_drops_and_shared_stats():
+    clock = [100.0]
+    stats = {}
+    with patch('frame_queue.time', SimpleNamespace(monotonic=lambda: clock[0])):
+        q = FrameQueue(FRAME.nbytes, policy="passthrough", stats=stats)
+        q.put_nowait((0, FRAME))
+        with pytest.raises(queue.Full):
+            q.put_nowait((1, FRAME))
+        assert not q.overloaded
+        clock[0] += OVERLOAD_SECONDS
+        assert q.overloaded
+        # The writer catching up ends the overload
+        q.get()
+        assert not q.overloaded
+        q.put_nowait((2, FRAME))
+        q.put_nowait(None)
+        assert q.clear() == 1
+        assert q.get() is None
+    assert stats["dropped"] == 2
+    assert q.get_stats()["depth"] == 0
+
+def test_recorder_switches_to_passthrough_when_overloaded():
+    from recording_manager import RecordingManager, RecordingState
+    engine_main = SimpleNamespace(GLOBAL_CONFIG={'opt_recording_overload': 'passthrough', 'opt_recording_queue_mb': 32})
+    reader = SimpleNamespace(video_stream=object())
+    with patch.dict(sys.modules, {'main': engine_main}), patch('recording_manager.threading.Thread'):
+        manager = RecordingManager(3, 'Test', {'storage_path': '/tmp/vibe-test'}, stream_reader=reader)
+        manager._start_transcoded_recording(RecordingState('/tmp/vibe-test/x.mp4', 0.0, "Motion", "transcoded"), 64, 48, None, None)
+    assert manager.frame_queue.max_bytes == 32 * 1024 * 1024
+    assert not manager._switch_to_passthrough()
+    manager.frame_queue.full_since = 0.0
+    assert manager._switch_to_passthrough()
+    manager.stream_reader = None
+    assert not manager._switch_to_passthrough()
+    assert manager.get_queue_stats()["policy"] == "passthrough"
+
+def test_recorder_with_privacy_masks_stays_transcoded_when_overloaded():
+    from recording_manager import RecordingManager, RecordingState
+    engine_main = SimpleNamespace(GLOBAL_CONFIG={'opt_recording_overload': 'passthrough', 'opt_recording_queue_mb': 32})
+    reader = SimpleNamespace(video_stream=object())
+    masks = '[{"points": [{"x": 0.1, "y": 0.1}, {"x": 0.5, "y": 0.1}, {"x": 0.5, "y": 0.5}]}]'
+    with patch.dict(sys.modules, {'main': engine_main}), patch('recording_manager.threading.Thread'):
+        manager = RecordingManager(3, 'Test', {'storage_path': '/tmp/vibe-test', 'privacy_masks': masks}, stream_reader=reader)
+        manager._start_transcoded_recording(RecordingState('/tmp/vibe-test/x.mp4', 0.0, "Motion", "transcoded"), 64, 48, None, None)
+    # Copying the stream would record it unmasked: the overloaded encoder drops frames instead
+    assert manager.get_queue_stats()["policy"] == "drop"
+    manager.frame_queue.full_since = 0.0
+    manager.frame_queue.policy = 'passthrough'
+    assert not manager._switch_to_passthrough()
+    manager.start_recording = MagicMock()
+    manager.handle_recording(FRAME, True, 0.0, MagicMock(), override_should_record=True, override_reason="Motion")
+    manager.start_recording.assert_not_called()
+    assert not manager.passthrough_active
@@ -123,3 +123,66 @@ def test_opencv_end_motion(mock_threshold, mock_resize, mock_mog2, base_config,
     assert result is False
     assert md.motion_detected is False
     event_cb.assert_called_once_with(1, 'motion_end')
+
+@patch('cv2.resize')
+def test_opencv_uses_motion_plane(mock_resize, base_config, dummy_frame, mock_callbacks):
+    base_config['opt_motion_analysis_height'] = 90
+    md = MotionDetector(1, "test_cam", base_config)
+    event_cb, save_snapshot_cb, apply_masks_fn = mock_callbacks
+
+    plane = np.zeros((90, 160), dtype=np.uint8)
+    md.detect(dummy_frame, event_cb, save_snapshot_cb, [], [], apply_masks_fn, motion_plane=plane)
+
+    # The decoder-provided luma plane replaces the BGR resize and MOG2 runs single-channel
+    mock_resize.assert_not_called()
+    assert apply_masks_fn.call_args_list[0].args[0] is plane
+    assert md.fgbg_channels == 1
+
+    # Falling back to the BGR path rebuilds the subtractor for 3 channels
+    mock_resize.return_value = np.zeros((90, 90, 3), dtype=np.uint8)
+    md.detect(dummy_frame, event_cb, save_snapshot_cb, [], [], apply_masks_fn)
+    assert md.fgbg_channels == 3
+
+def test_running_average_subtractor_flags_changes():
+    from engine.motion_detector import RunningAverageSubtractor
+    sub = RunningAverageSubtractor()
+    still = np.full((90, 160), 100, dtype=np.uint8)
+
+    assert not sub.apply(still).any()
+    assert not sub.apply(still).any()
+
+    moved = still.copy()
+    moved[10:30, 10:30] = 250
+    mask = sub.apply(moved)
+    assert np.count_nonzero(mask) == 400
+
+def test_motion_vectors_state_machine(base_config, dummy_frame, mock_callbacks):
+    base_config['detect_engine'] = 'Motion Vectors'
+    base_config['min_motion_frames'] = 2
+    md = MotionDetector(1, "test_cam", base_config)
+    event_cb, save_snapshot_cb, apply_masks_fn = mock_callbacks
+
+    # Per-frame detect() only reports state; scores drive it
+    assert md.detect(dummy_frame, event_cb, save_snapshot_cb, [], [], apply_masks_fn) is False
+    assert md.detect_motion_vectors(5.0, 16 / 9, event_cb, save_snapshot_cb) is False
+    assert md.detect_motion_vectors(5.0, 16 / 9, event_cb, save_snapshot_cb) is True
+    assert md.last_trigger_source == "Motion Vectors"
+    event_cb.assert_called_once_with(1, 'motion_start', {'file_path': '/tmp/snap.jpg', 'source': 'Motion Vectors'})
+
+def test_changed_region_bounds_the_changed_pixels(base_config, dummy_frame, mock_callbacks):
+    base_config['opt_motion_analysis_height'] = 90
+    md = MotionDetector(1, "test_cam", base_config)
+    _, _, apply_masks_fn = mock_callbacks
+
+    still = np.full((90, 160), 100, dtype=np.uint8)
+    for _ in range(2):
+        changed, region = md.changed_region(dummy_frame, [], [], apply_masks_fn, motion_plane=still.copy(), subtractor="running_average")
+        assert changed is False and region is None
+
+    moved = still.copy()
+    moved[45:90, 80:120] = 250
+    changed, region = md.changed_region(dummy_frame, [], [], apply_masks_fn, motion_plane=moved, subtractor="running_average")
+    assert changed is True
+    assert region == pytest.approx((0.5, 0.5, 0.75, 1.0))
+    # The gate does not drive the motion state
+    assert md.motion_detected is False
@@ -0,0 +1,52 @@
+import sys
+import os
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../engine')))
+from mv_motion import MotionVectorAnalyzer, MB_SIZE
+
+MV_DTYPE = np.dtype([
+    ('source', '<i4'), ('w', 'u1'), ('h', 'u1'), ('src_x', '<i2'), ('src_y', '<i2'),
+    ('dst_x', '<i2'), ('dst_y', '<i2'), ('flags', '<u8'), ('motion_x', '<i4'),
+    ('motion_y', '<i4'), ('motion_scale', '<u2')
+])
+
+def _mvs(blocks, motion=(16, 0)):
+    """One vector per (col, row) macroblock, motion in quarter-pel units"""
+    arr = np.zeros(len(blocks), dtype=MV_DTYPE)
+    for i, (col, row) in enumerate(blocks):
+        arr[i]['dst_x'] = col * MB_SIZE + 8
+        arr[i]['dst_y'] = row * MB_SIZE + 8
+        arr[i]['motion_x'], arr[i]['motion_y'] = motion
+        arr[i]['motion_scale'] = 4
+    return arr
+
+def test_ratio_over_window():
+    analyzer = MotionVectorAnalyzer(window=2)
+    # 160x160 -> 10x10 macroblocks
+    analyzer.feed(_mvs([(0, 0), (1, 0)]), 160, 160, 1.0)
+    assert analyzer.consume() is None
+    analyzer.feed(_mvs([(1, 0), (2, 0)]), 160, 160, 2.0)
+    ratio, ts = analyzer.consume()
+    assert ratio == 3.0  # Union of 3 moving blocks out of 100
+    assert ts == 2.0
+
+def test_small_vectors_ignored():
+    analyzer = MotionVectorAnalyzer(window=1, min_magnitude=2.0)
+    analyzer.feed(_mvs([(0, 0)], motion=(4, 0)), 160, 160, 1.0)  # 1px
+    assert analyzer.consume()[0] == 0.0
+
+def test_masked_blocks_excluded():
+    analyzer = MotionVectorAnalyzer(window=1)
+    # Mask the left half of the picture
+    analyzer.set_masks([np.array([[0, 0], [0.5, 0], [0.5, 1], [0, 1]], dtype=np.float32)])
+    analyzer.feed(_mvs([(0, 0), (9, 9)]), 160, 160, 1.0)
+    assert analyzer.consume()[0] == 2.0  # 1 of 50 unmasked blocks
+
+def test_masks_follow_rotation():
+    analyzer = MotionVectorAnalyzer(window=1)
+    # Top half of the displayed (rotated 90 degrees clockwise) image is the left half of the coded frame
+    analyzer.set_masks([np.array([[0, 0], [1, 0], [1, 0.5], [0, 0.5]], dtype=np.float32)], rotation=90)
+    analyzer.feed(_mvs([(0, 0), (9, 0)]), 160, 160, 1.0)
+    ratio = analyzer.consume()[0]
+    assert ratio == 2.0  # Only one of the two blocks survives the mask
@@ -0,0 +1,83 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../engine')))
+from object_tracker import MAX_COAST, MAX_MISSES, ObjectTracker
+
+def person(x, y=0.3, label="person"):
+    return {"label": label, "confidence": 0.8, "box": [y, x, y + 0.3, x + 0.1]}
+
+def test_ids_stay_with_moving_objects():
+    tracker = ObjectTracker()
+    # One-frame detections are not reported
+    assert tracker.update([person(0.2), person(0.6)], now=0.0) == []
+    results = tracker.update([person(0.62), person(0.21)], now=0.2)
+    left, right = sorted(results, key=lambda r: r["box"][1])
+    assert left["track_id"] != right["track_id"]
+
+    for step in range(2, 11):
+        # Detection order changes, ids stay with the objects
+        results = tracker.update([person(0.6 + 0.02 * step), person(0.2 + 0.01 * step)], now=step * 0.2)
+        moved_left, moved_right = sorted(results, key=lambda r: r["box"][1])
+        assert (moved_left["track_id"], moved_right["track_id"]) == (left["track_id"], right["track_id"])
+    assert moved_left["dwell"] == moved_right["dwell"] == 2.0
+
+def test_predicts_between_inferences():
+    tracker = ObjectTracker()
+    for step in range(5):
+        tracker.update([person(0.2 + 0.02 * step)], now=step * 0.2)
+    # Moving 0.1 per second: predicted ahead without a detection
+    predicted = tracker.predict(now=1.0)[0]["box"]
+    assert abs(predicted[1] - 0.3) < 0.01
+
+def test_labels_do_not_match_and_lost_tracks_are_dropped():
+    tracker = ObjectTracker()
+    tracker.update([person(0.2)], now=0.0)
+    tracker.update([person(0.2)], now=0.2)
+    results = tracker.update([person(0.2, label="dog")], now=0.4)
+    # The dog starts its own (tentative) track; the person missed this inference and coasts
+    assert [r["label"] for r in results] == ["person"]
+    assert sorted(t.label for t in tracker.tracks) == ["dog", "person"]
+    for i in range(MAX_MISSES):
+        tracker.update([], now=0.6 + i * 0.2)
+    assert tracker.tracks == []
+
+def test_confirmed_tracks_survive_a_missed_inference():
+    tracker = ObjectTracker()
+    tracker.update([person(0.2)], now=0.0)
+    track_id = tracker.update([person(0.22)], now=0.2)[0]["track_id"]
+    # Occluded for one inference: still reported, where it is predicted to be
+    missed = tracker.update([], now=0.4)
+    assert [r["track_id"] for r in missed] == [track_id]
+    assert [r["track_id"] for r in tracker.predict(now=0.5)] == [track_id]
+    assert tracker.update([person(0.26)], now=0.6)[0]["track_id"] == track_id
+    # Not predicted longer than MAX_COAST
+    assert tracker.predict(now=0.6 + MAX_COAST) == []
+
+def test_still_objects_need_few_detections():
+    tracker = ObjectTracker()
+    inferences = 0
+    for tick in range(100):  # 20 s at 5 fps
+        now = tick * 0.2
+        if not len(tracker) or tracker.needs_detection(now):
+            tracker.update([person(0.5)], now=now)
+            inferences += 1
+    assert inferences <= 25
+    # Never predicted longer than MAX_COAST
+    assert tracker.needs_detection(tracker.tracks[0].last_seen + MAX_COAST)
+
+def test_covers_changes_around_the_tracks():
+    tracker = ObjectTracker()
+    tracker.update([person(0.5)], now=0.0)
+    assert tracker.covers((0.52, 0.35, 0.58, 0.5))
+    assert not tracker.covers((0.05, 0.05, 0.15, 0.2))
+    tracker.reset()
+    assert not tracker.covers((0.52, 0.35, 0.58, 0.5))
+
+def test_covers_each_track_separately():
+    tracker = ObjectTracker()
+    tracker.update([person(0.1), person(0.8)], now=0.0)
+    assert tracker.covers((0.12, 0.35, 0.18, 0.5))
+    assert tracker.covers((0.82, 0.35, 0.88, 0.5))
+    # Between the two objects, inside their hull but around neither
+    assert not tracker.covers((0.45, 0.35, 0.55, 0.5))
@@ -0,0 +1,84 @@
+import sys
+import os
+from fractions import Fraction
+
+import av
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../engine')))
+from packet_buffer import PacketRingBuffer
+from shared_packet import SharedPacket
+
+def _packet(t, keyframe=False, size=100, stream_type='video'):
+    packet = av.Packet(bytes(size))
+    packet.pts = int(t * 90000)
+    packet.time_base = Fraction(1, 90000)
+    return SharedPacket(packet, stream_type, int(keyframe), t)
+
+def _fill(buffer, seconds, fps=8, gop=8, size=100):
+    for i in range(int(seconds * fps)):
+        buffer.append(_packet(i / fps, keyframe=(i % gop == 0), size=size))
+
+def test_time_limit():
+    buffer = PacketRingBuffer(max_duration=2.0)
+    _fill(buffer, 5)
+    stats = buffer.get_stats()
+    assert stats["duration_s"] == 2.0
+    assert stats["packets"] == 17
+    assert stats["bytes"] == 1700
+    assert stats["keyframes"] == 2
+
+def test_byte_limit():
+    buffer = PacketRingBuffer(max_duration=60.0, max_bytes=1000)
+    _fill(buffer, 5, size=100)
+    assert len(buffer) == 10
+    assert buffer.nbytes == 1000
+
+def test_replay_from_nth_keyframe():
+    buffer = PacketRingBuffer(max_duration=60.0)
+    _fill(buffer, 3.5)  # Keyframes at 0, 1, 2, 3s
+    newest = buffer.from_keyframe(1)
+    assert newest[0].time_sec == 3.0 and newest[0].is_keyframe
+    assert len(newest) == 4
+    assert buffer.from_keyframe(3)[0].time_sec == 1.0
+    # Clamped to the oldest keyframe held
+    assert buffer.from_keyframe(99)[0].time_sec == 0.0
+    assert len(buffer.oldest_keyframe()) == 28
+
+def test_keyframe_index_follows_eviction():
+    buffer = PacketRingBuffer(max_duration=1.5)
+    _fill(buffer, 3.5)
+    assert buffer.keyframe_count == 2
+    assert buffer.oldest_keyframe()[0].time_sec == 2.0
+    # Audio "keyframes" are not replay points
+    buffer.append(_packet(3.5, keyframe=True, stream_type='audio'))
+    assert buffer.keyframe_count == 2
+
+def test_no_keyframe_and_clear():
+    buffer = PacketRingBuffer()
+    buffer.append(_packet(0.0))
+    assert buffer.from_keyframe() == []
+    buffer.clear()
+    assert len(buffer) == 0 and buffer.nbytes == 0
+    buffer.append(_packet(1.0, keyframe=True))
+    assert len(buffer.from_keyframe()) == 1
+
+def test_pre_roll_keeps_one_covering_gop():
+    # GOP of 1s, 2.5s pre-roll: keyframe at newest - 2.5s or earlier must survive
+    buffer = PacketRingBuffer(max_duration=60.0, pre_roll=2.5)
+    _fill(buffer, 10)  # Newest packet at 9.875s
+    oldest = buffer.oldest_keyframe()[0]
+    assert oldest.time_sec == 7.0
+    assert buffer.get_stats()["duration_s"] <= 2.5 + 1.0
+    # Without pre-roll only the current GOP is held
+    buffer.set_limits(pre_roll=0.0)
+    assert buffer.oldest_keyframe()[0].time_sec == 9.0
+    assert buffer.keyframe_count == 1
+
+def test_covering_picks_newest_sufficient_keyframe():
+    buffer = PacketRingBuffer(max_duration=60.0)
+    _fill(buffer, 6)  # Keyframes every second, newest packet at 5.875s
+    assert buffer.covering(2.0)[0].time_sec == 3.0
+    assert buffer.covering(0.5)[0].time_sec == 5.0
+    # Longer than the history: oldest keyframe
+    assert buffer.covering(30.0)[0].time_sec == 0.0
+    assert PacketRingBuffer().covering(1.0) == []
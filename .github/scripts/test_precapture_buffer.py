@@ -0,0 +1,48 @@
+import sys
+import os
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../engine')))
+from precapture_buffer import PrecaptureBuffer, EncodedFrame
+
+def _frame(value, size=(180, 320)):
+    frame = np.zeros(size + (3,), dtype=np.uint8)
+    frame[:, :] = value
+    return frame
+
+def test_frames_stored_compressed_and_restored():
+    buffer = PrecaptureBuffer(max_frames=5)
+    frame = _frame((10, 120, 240))
+    buffer.append(frame, 123.5)
+    frame[:] = 0  # Overlays drawn afterwards must not leak into the buffer
+    assert buffer.nbytes < frame.nbytes / 10
+    (encoded,) = buffer.drain()
+    assert isinstance(encoded, EncodedFrame)
+    assert encoded.capture_time == 123.5
+    restored = encoded.decode()
+    assert restored.shape == frame.shape
+    assert np.abs(restored.astype(int) - (10, 120, 240)).max() <= 4
+    assert len(buffer) == 0 and buffer.nbytes == 0
+
+def test_bounded_by_frames_and_bytes():
+    buffer = PrecaptureBuffer(max_frames=3)
+    for i in range(6):
+        buffer.append(_frame(i * 40))
+    assert len(buffer) == 3
+    assert buffer.drain()[0].decode()[0, 0, 0] >= 110
+    per_frame = PrecaptureBuffer(max_frames=1)
+    per_frame.append(_frame(50))
+    buffer = PrecaptureBuffer(max_frames=100, max_bytes=per_frame.nbytes * 2)
+    for i in range(6):
+        buffer.append(_frame(50))
+    assert len(buffer) == 2
+
+def test_disabled_and_shrunk():
+    buffer = PrecaptureBuffer(max_frames=0)
+    buffer.append(_frame(1))
+    assert len(buffer) == 0
+    buffer.set_max_frames(4)
+    for i in range(4):
+        buffer.append(_frame(i))
+    buffer.set_max_frames(2)
+    assert len(buffer) == 2
@@ -0,0 +1,295 @@
+import sys
+import os
+import itertools
+import queue
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+
+import av
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../engine')))
+from recording_manager import RecordingManager, RecordingState, CfrClock, MAX_CFR_GAP
+from shared_packet import SharedPacket
+
+FPS = 10
+
+def _source(path, seconds=6, gop=FPS):
+    """Small MPEG-4 file with a keyframe every `gop` frames"""
+    with av.open(str(path), mode='w') as out:
+        stream = out.add_stream('mpeg4', rate=FPS)
+        stream.width, stream.height = 64, 48
+        stream.pix_fmt = 'yuv420p'
+        stream.codec_context.gop_size = gop
+        stream.codec_context.options = {'sc_threshold': '1000000000'}
+        gradient = np.tile(np.arange(64, dtype=np.uint8) * 4, (48, 1))
+        for i in range(int(seconds * FPS)):
+            frame = av.VideoFrame.from_ndarray(np.dstack([np.roll(gradient, i, axis=1)] * 3), format='bgr24')
+            frame.pts = i
+            for packet in stream.encode(frame):
+                out.mux(packet)
+        for packet in stream.encode(None):
+            out.mux(packet)
+    return str(path)
+
+def _frames(path):
+    with av.open(path) as inp:
+        return sum(1 for _ in inp.decode(video=0))
+
+def test_passthrough_writer_cuts_segments_without_restarting(tmp_path):
+    inp = av.open(_source(tmp_path / 'src.mp4'))
+    video = inp.streams.video[0]
+    packets = [SharedPacket(p, 'video', p.is_keyframe, float(p.pts * p.time_base))
+               for p in inp.demux(video) if p.size]
+    reader = SimpleNamespace(video_stream=video, audio_stream=None,
+                             subscribe_packets=MagicMock(return_value=[]), unsubscribe_packets=MagicMock())
+    config = {'movie_passthrough': True, 'max_movie_length': 2, 'storage_path': str(tmp_path / 'rec'),
+              'movie_file_name': '%H-%M-%S'}
+    manager = RecordingManager(3, 'Test', config, stream_reader=reader)
+    listener = MagicMock()
+    manager.segment_listener = listener
+    events = []
+
+    # Wall clock advancing one second per reading keeps segment lengths deterministic
+    clock = itertools.count(1_000_000, 1.0)
+    with patch('recording_manager.time', SimpleNamespace(time=lambda: next(clock), sleep=lambda s: None)):
+        manager.start_recording(64, 48, None, lambda *args: events.append(args), reason="Continuous")
+        assert manager.segmenting
+        for packet in packets:
+            manager.passthrough_queue.put(packet)
+        while not manager.passthrough_queue.empty():
+            time.sleep(0.01)
+        assert not manager.check_segment_rotation(MagicMock())
+        manager.stop_recording(lambda *args: events.append(args), 64, 48).result(timeout=30)
+        manager.wait_finalized()
+    inp.close()
+
+    ends = [payload for _, kind, payload in events if kind == 'recording_end']
+    assert len(ends) >= 2
+    assert reader.subscribe_packets.call_count == 1
+    assert sum(_frames(e["file_path"]) for e in ends) == len(packets)
+    for payload in ends:
+        with av.open(payload["file_path"]) as seg:
+            first = next(seg.demux(video=0))
+            assert first.is_keyframe
+        assert payload["reason"] == "Continuous"
+        # Metadata for the backend, which then runs no ffprobe/ffmpeg
+        assert payload["codec"] == 'mpeg4'
+        assert payload["keyframes"] >= 1
+        assert abs(payload["duration"] - _frames(payload["file_path"]) / FPS) < 0.15
+        assert payload["file_size"] == os.path.getsize(payload["file_path"])
+        assert payload["thumbnail_path"] == payload["file_path"][:-4] + '.jpg'
+        assert os.path.exists(payload["thumbnail_path"])
+    started = [c.args[0] for c in listener.segment_started.call_args_list]
+    finished = [c.args[0] for c in listener.segment_finished.call_args_list]
+    # Cut segments are reported on the finalizer pool, in any order
+    assert started == finished
+    assert sorted(started) == sorted(e["file_path"] for e in ends)
+
+def test_thumbnail_is_kept_from_the_live_frames(tmp_path):
+    manager = RecordingManager(3, 'Test', {})
+    manager.is_recording = True
+    manager.recording = RecordingState(str(tmp_path / 'a.mp4'), 100.0, "Motion", "Transcode")
+    frame = np.full((720, 1280, 3), 200, dtype=np.uint8)
+    manager._keep_thumbnail(frame, 100.5)
+    assert manager.recording.segment.thumbnail is None
+    manager._keep_thumbnail(frame, 101.0)
+    manager._keep_thumbnail(np.zeros_like(frame), 102.0)
+    thumb = manager.recording.segment.thumbnail
+    assert thumb.shape == (180, 320, 3) and thumb[0, 0, 0] == 200
+
+def test_segment_monitor_renames_listed_segments(tmp_path):
+    config = {'storage_path': str(tmp_path / 'rec'), 'movie_file_name': '%H-%M-%S'}
+    manager = RecordingManager(3, 'Test', config)
+    manager.is_recording = True
+    state = RecordingState(manager.output_path("Continuous"), 1_000_000.0, "Continuous", "Transcode", segmenting=True)
+    manager.recording = state
+    seg_dir = os.path.dirname(manager.recording_filename)
+    os.makedirs(seg_dir)
+    pattern = os.path.join(seg_dir, '.segment-1000000-%05d.mp4.part')
+    for i in range(2):
+        with open(pattern % i, 'wb') as f:
+            f.write(b'\0' * 4096)
+    with open(pattern % 2, 'wb') as f:
+        f.write(b'partial')
+    first = manager.recording_filename
+    process = SimpleNamespace(stdout=MagicMock())
+    process.stdout.readline.side_effect = [
+        b'.segment-1000000-00000.mp4.part,0.000000,10.000000\n',
+        b'.segment-1000000-00001.mp4.part,10.000000,20.000000\n',
+        b''
+    ]
+    events = []
+    manager._monitor_ffmpeg_segments(state, process, pattern, 64, 48, lambda *args: events.append(args))
+    manager.wait_finalized()
+
+    ends = [payload["file_path"] for _, kind, payload in events if kind == 'recording_end']
+    assert first in ends
+    assert len(ends) == 2
+    assert all(os.path.getsize(p) == 4096 for p in ends)
+    # The unfinished third segment is removed, nothing hidden is left behind
+    assert not [f for f in os.listdir(seg_dir) if f.startswith('.segment')]
+    assert manager.segment_start_time == 1_000_020.0
+
+def test_stop_recording_returns_before_the_file_is_closed(tmp_path):
+    manager = RecordingManager(3, 'Test', {'storage_path': str(tmp_path), 'movie_file_name': '%H-%M-%S'})
+    manager.encoder_backend = 'pyav'
+    manager.is_recording = True
+    manager.recording = RecordingState(manager.output_path("Motion"), time.time() - 10, "Motion", "Transcode")
+    os.makedirs(os.path.dirname(manager.recording_filename))
+    manager.frame_queue = queue.Queue()
+    release = threading.Event()
+
+    def writer():
+        # A slow encoder flush: the file only exists once the writer is done
+        release.wait(10)
+        with open(manager.recording_filename, 'wb') as f:
+            f.write(b'\0' * 4096)
+    manager.writer_thread = threading.Thread(target=writer)
+    manager.writer_thread.start()
+    events = []
+
+    started = time.monotonic()
+    future = manager.stop_recording(lambda *args: events.append(args), 64, 48)
+    assert time.monotonic() - started < 0.2
+    assert manager.frame_queue.get_nowait() is None
+    assert not events
+    release.set()
+    future.result(timeout=10)
+    assert [kind for _, kind, _ in events] == ['recording_end']
+    assert events[0][2]["reason"] == "Motion"
+    assert events[0][2]["file_path"] == manager.recording_filename
+
+def test_writer_reports_its_last_file_after_the_next_recording_started(tmp_path):
+    manager = RecordingManager(3, 'Test', {'storage_path': str(tmp_path), 'movie_file_name': '%H-%M-%S'})
+    manager.is_recording = True
+    first = RecordingState(str(tmp_path / 'a.mp4'), time.time() - 10, "Continuous", "Passthrough", segmenting=True)
+    first.writer_reports = True
+    manager.recording = first
+    with open(first.segment.path, 'wb') as f:
+        f.write(b'\0' * 4096)
+    events = []
+    manager.stop_recording(lambda *args: events.append(args), 64, 48).result(timeout=10)
+    # The writer is still closing the file: the next recording gets its own state meanwhile
+    assert not events
+    manager.recording = RecordingState(str(tmp_path / 'b.mp4'), time.time(), "Continuous", "Passthrough", segmenting=True)
+    manager._writer_exited(first)
+    assert [(kind, payload["file_path"]) for _, kind, payload in events] == [('recording_end', first.segment.path)]
+    assert manager.recording_filename == str(tmp_path / 'b.mp4')
+
+def test_cfr_clock_follows_capture_times():
+    clock = CfrClock(10)
+    # Camera at 20 fps: every other frame fills a slot
+    assert [clock.slots(100 + i * 0.05) for i in range(6)] == [1, 0, 1, 0, 1, 0]
+    # 0.35 s without frames: the next frame covers the missing slots
+    assert clock.slots(100.6) == 4
+    assert clock.written == 7
+    # Outages longer than MAX_CFR_GAP are not padded
+    assert clock.slots(100.6 + MAX_CFR_GAP * 2) == 1
+    assert clock.slots(100.6 + MAX_CFR_GAP * 2 + 0.1) == 1
+
+def test_transcoded_writer_duplicates_and_drops_without_sleeping():
+    manager = RecordingManager(3, 'Test', {})
+    frames = [(100 + t, np.full((4, 4, 3), i, dtype=np.uint8)) for i, t in enumerate([0.0, 0.02, 0.3, 0.4])]
+    q = queue.Queue()
+    for item in frames + [None]:
+        q.put(item)
+    written = []
+    proc = SimpleNamespace(poll=lambda: None, stdin=SimpleNamespace(write=lambda d: written.append(bytes(d)[0]), close=lambda: None))
+    started = time.monotonic()
+    manager._async_ffmpeg_writer(proc, q, 'Test', 4, 4, False, fps=10)
+    assert time.monotonic() - started < 0.5
+    assert written == [0, 0, 0, 2, 3]
+
+def test_pyav_encoder_stamps_capture_times(tmp_path):
+    from pyav_encoder import PyAVEncoder
+    path = str(tmp_path / 'out.mp4')
+    encoder = PyAVEncoder(path, 64, 48, FPS)
+    # 128x96 BGR frames are scaled down; a 1 s gap stays a 1 s gap
+    for t in [0.0, 0.1, 0.2, 1.2, 1.3]:
+        encoder.encode(np.zeros((96, 128, 3), dtype=np.uint8), 500 + t)
+    encoder.close()
+    with av.open(path) as inp:
+        stream = inp.streams.video[0]
+        assert (stream.codec_context.width, stream.codec_context.height) == (64, 48)
+        pts = sorted(float(f.pts * f.time_base) for f in inp.decode(stream))
+    assert encoder.frames == 5
+    assert [round(p, 2) for p in pts] == [0.0, 0.1, 0.2, 1.2, 1.3]
+
+def _audio_source(path, codec, fmt, seconds=4):
+    """8 kHz mono tone, like a camera's G.711 or AAC track"""
+    with av.open(str(path), mode='w', format=fmt) as out:
+        stream = out.add_stream(codec, rate=8000)
+        stream.layout = 'mono'
+        for n in range(0, seconds * 8000, 160):
+            samples = (np.sin(np.arange(n, n + 160) / 8000 * 2 * np.pi * 440) * 10000).astype(np.int16)
+            frame = av.AudioFrame.from_ndarray(samples[None, :], format='s16', layout='mono')
+            frame.sample_rate = 8000
+            frame.pts = n
+            for packet in stream.encode(frame):
+                out.mux(packet)
+        for packet in stream.encode(None):
+            out.mux(packet)
+    return str(path)
+
+def test_pyav_encoder_muxes_reader_audio(tmp_path):
+    from pyav_encoder import PyAVEncoder
+    for codec, fmt in (('pcm_mulaw', 'wav'), ('aac', 'adts')):
+        with av.open(_audio_source(tmp_path / f'audio.{fmt}', codec, fmt)) as inp:
+            template = inp.streams.audio[0]
+            packets = [SharedPacket(p, 'audio', 1, float(p.pts * p.time_base)) for p in inp.demux(template) if p.size]
+            path = str(tmp_path / f'{codec}.mp4')
+            encoder = PyAVEncoder(path, 64, 48, FPS, audio_template=template)
+            # Audio from before the first video frame is dropped
+            encoder.mux_audio(packets[0], 999.0)
+            for i in range(40):
+                encoder.encode(np.zeros((48, 64, 3), dtype=np.uint8), 1000 + i / FPS)
+                while packets and 1000 + packets[0].time_sec <= 1000 + i / FPS:
+                    packet = packets.pop(0)
+                    encoder.mux_audio(packet, 1000 + packet.time_sec)
+            encoder.close()
+        with av.open(path) as out:
+            audio = out.streams.audio[0]
+            assert audio.codec_context.name == 'aac'
+            assert abs(float(audio.duration * audio.time_base) - 3.9) < 0.2
+
+def test_pyav_encoders_on_one_reader_decode_audio_separately(tmp_path):
+    from pyav_encoder import PyAVEncoder
+    with av.open(_audio_source(tmp_path / 'audio.wav', 'pcm_mulaw', 'wav')) as inp:
+        template = inp.streams.audio[0]
+        packets = [SharedPacket(p, 'audio', 1, float(p.pts * p.time_base)) for p in inp.demux(template) if p.size]
+        # Continuous and motion recordings of one camera get the same shared packets
+        encoders = [PyAVEncoder(str(tmp_path / f'{name}.mp4'), 64, 48, FPS, audio_template=template)
+                    for name in ('continuous', 'motion')]
+        assert encoders[0].audio_decoder is not encoders[1].audio_decoder
+        for i in range(40):
+            for encoder in encoders:
+                encoder.encode(np.zeros((48, 64, 3), dtype=np.uint8), 1000 + i / FPS)
+            while packets and packets[0].time_sec <= i / FPS:
+                packet = packets.pop(0)
+                for encoder in encoders:
+                    encoder.mux_audio(packet, 1000 + packet.time_sec)
+        for encoder in encoders:
+            encoder.close()
+    for encoder in encoders:
+        with av.open(encoder.path) as out:
+            audio = out.streams.audio[0]
+            assert abs(float(audio.duration * audio.time_base) - 3.9) < 0.2
+
+def test_pyav_backend_falls_back_to_ffmpeg():
+    engine_main = SimpleNamespace(GLOBAL_CONFIG={'opt_recording_encoder': 'pyav'})
+    with patch.dict(sys.modules, {'main': engine_main}):
+        assert RecordingManager(3, 'Test', {})._select_encoder_backend() == 'pyav'
+        # No demuxed audio stream: FFmpeg opens the camera's audio itself
+        assert RecordingManager(3, 'Test', {'record_audio': True})._select_encoder_backend() == 'ffmpeg'
+        manager = RecordingManager(3, 'Test', {})
+        manager.pyav_encoder_failed = True
+        assert manager._select_encoder_backend() == 'ffmpeg'
+    # Audio from the reader's packets is only muxed in-process
+    engine_main.GLOBAL_CONFIG['opt_recording_encoder'] = 'ffmpeg'
+    reader = SimpleNamespace(audio_stream=object())
+    with patch.dict(sys.modules, {'main': engine_main}):
+        assert RecordingManager(3, 'Test', {'record_audio': True}, stream_reader=reader)._select_encoder_backend() == 'pyav'
+        assert RecordingManager(3, 'Test', {}, stream_reader=reader)._select_encoder_backend() == 'ffmpeg'
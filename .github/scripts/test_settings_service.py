@@ -55,6 +55,17 @@ def test_validate_setting_invalid_ffmpeg_preset():
     assert excinfo.value.status_code == 400
     assert "Invalid preset" in str(excinfo.value.detail)
 
+def test_validate_setting_decode_threads():
+    validate_setting("opt_decode_threads", "0")
+    validate_setting("opt_decode_threads", "8")
+    validate_setting("opt_decode_thread_type", "frame")
+    with pytest.raises(HTTPException) as excinfo:
+        validate_setting("opt_decode_threads", "32")
+    assert excinfo.value.status_code == 400
+    with pytest.raises(HTTPException) as excinfo:
+        validate_setting("opt_decode_thread_type", "gpu")
+    assert "Invalid decode thread type" in str(excinfo.value.detail)
+
 def test_validate_setting_invalid_throttle():
     with pytest.raises(HTTPException) as excinfo:
         validate_setting("opt_live_view_fps_throttle", "0")
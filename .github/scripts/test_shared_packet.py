@@ -0,0 +1,53 @@
+import sys
+import os
+import struct
+from fractions import Fraction
+
+import av
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../engine')))
+from shared_packet import SharedPacket, ws_header, WS_VIDEO, WS_AUDIO, WS_METADATA
+
+SPS_PPS = b'\x00\x00\x00\x01\x67\x42\x00\x1f' + b'\x00\x00\x00\x01\x68\xce\x3c\x80'
+SLICE = b'\x00\x00\x00\x01\x65' + bytes(range(200))
+
+def _packet(data, pts=9000, dts=8000):
+    packet = av.Packet(data)
+    packet.pts = pts
+    packet.dts = dts
+    packet.time_base = Fraction(1, 90000)
+    return packet
+
+def test_ws_header_layout():
+    header = ws_header(WS_METADATA, 0, 12.5)
+    assert len(header) == 10
+    assert struct.unpack('<BBd', header) == (2, 0, 12.5)
+
+def test_ws_payload_cached_for_keyframes_only():
+    key = SharedPacket(_packet(SLICE), 'video', 1, 1.0)
+    assert key.ws_payload is key.ws_payload
+    delta = SharedPacket(_packet(SLICE), 'video', 0, 1.0)
+    assert delta.ws_payload == ws_header(WS_VIDEO, 0, 1.0) + SLICE
+    assert delta._ws_payload is None
+    assert len(delta) == len(SLICE)
+
+def test_param_sets_only_on_video_keyframes():
+    key = SharedPacket(_packet(SLICE), 'video', 1, 2.0, SPS_PPS)
+    assert key.ws_payload == ws_header(WS_VIDEO, 1, 2.0) + SPS_PPS + SLICE
+    delta = SharedPacket(_packet(SLICE), 'video', 0, 2.0, SPS_PPS)
+    assert delta.ws_payload == ws_header(WS_VIDEO, 0, 2.0) + SLICE
+    audio = SharedPacket(_packet(b'\xff\xf1audio'), 'audio', 1, 2.0, SPS_PPS)
+    assert audio.ws_payload == ws_header(WS_AUDIO, 1, 2.0) + b'\xff\xf1audio'
+
+def test_clone_is_private_copy_with_timing():
+    original = _packet(SLICE)
+    shared = SharedPacket(original, 'video', 1, 0.1)
+    clone = shared.clone()
+    assert bytes(clone) == SLICE
+    assert (clone.pts, clone.dts, clone.time_base) == (9000, 8000, Fraction(1, 90000))
+    assert clone.is_keyframe
+    assert not SharedPacket(_packet(SLICE), 'video', 0, 0.1).clone().is_keyframe
+    clone.pts = 0
+    clone.dts = 0
+    assert (original.pts, original.dts) == (9000, 8000)
+    assert (shared.pts, shared.dts) == (9000, 8000)
@@ -92,3 +92,126 @@ def test_exception_handler_closes_container(stream_reader):
 
     # container.close() should be called in the exception handler
     mock_container.close.assert_called_once()
+
+def test_decode_demand_paces_conversion(stream_reader):
+    stream_reader.set_decode_demand(target_fps=10)
+    frame = MagicMock(key_frame=False)
+
+    assert stream_reader._frame_wanted(frame, now=100.0) is True
+    stream_reader._last_convert_time = 100.0
+    # 50ms later is too early for a 10fps consumer, 100ms later is due
+    assert stream_reader._frame_wanted(frame, now=100.05) is False
+    assert stream_reader._frame_wanted(frame, now=100.1) is True
+
+def test_decode_all_mode_converts_every_frame(stream_reader):
+    stream_reader.set_decode_demand(target_fps=10, mode="all")
+    stream_reader._last_convert_time = 100.0
+    assert stream_reader._frame_wanted(MagicMock(key_frame=False), now=100.01) is True
+
+def test_idle_sets_keyframe_only_skip(stream_reader):
+    video_stream = MagicMock()
+    video_stream.codec_context.skip_frame = "DEFAULT"
+
+    stream_reader.set_decode_demand(idle=True)
+    assert stream_reader._decode_settings_dirty is True
+    stream_reader._apply_decode_settings(video_stream)
+    assert video_stream.codec_context.skip_frame == "NONKEY"
+    assert stream_reader._decode_settings_dirty is False
+    # Seconds between frames on long GOPs: the stall watchdog goes by packets meanwhile
+    assert stream_reader.keyframes_only is True
+
+    # Leaving idle mid-GOP waits for the next keyframe before publishing frames
+    stream_reader.set_decode_demand(idle=False)
+    stream_reader._apply_decode_settings(video_stream)
+    assert video_stream.codec_context.skip_frame == "NONREF"
+    assert stream_reader.keyframes_only is False
+    assert stream_reader._frame_wanted(MagicMock(key_frame=False), now=100.0) is False
+    assert stream_reader._frame_wanted(MagicMock(key_frame=True), now=100.0) is True
+
+def test_decode_stats_ratio(stream_reader):
+    stream_reader.decode_stats.update(packets_demuxed=100, frames_decoded=40, frames_converted=15)
+    stats = stream_reader.get_decode_stats()
+    assert stats["decode_ratio"] == 0.4
+    assert stats["frames_converted"] == 15
+    assert stats["mode"] == "demand"
+
+def test_motion_plane_matches_display_aspect():
+    import av
+    import numpy as np
+    from frame_pipeline import convert_frame, motion_plane
+
+    frame = av.VideoFrame.from_ndarray(np.full((360, 640, 3), 128, dtype=np.uint8), format='bgr24').reformat(format='yuv420p')
+
+    assert convert_frame(frame, 320, 180, 90).shape == (320, 180, 3)
+    assert motion_plane(frame, 90).shape == (90, 160)
+    # Display geometry 480x480 stretches the frame; the plane follows the display aspect
+    assert motion_plane(frame, 90, 480, 480).shape == (90, 90)
+    # Rotated display image is 360x640 (portrait): plane keeps 90 rows after rotation
+    assert motion_plane(frame, 90, 0, 0, 90).shape == (90, 50)
+
+def test_decode_lag_tracks_pts_vs_wall_clock(stream_reader):
+    frame = MagicMock()
+    # Frames arrive exactly on the stream clock: no lag
+    for i in range(10):
+        frame.time = i * 0.1
+        stream_reader._update_decode_lag(frame, 1000.0 + i * 0.1)
+    assert stream_reader.decode_lag < 0.001
+
+    # Decoder falls 2s behind
+    frame.time = 1.0
+    stream_reader._update_decode_lag(frame, 1003.0)
+    assert abs(stream_reader.decode_lag_max - 2.0) < 0.001
+    assert stream_reader.get_decode_stats()["lag_max_ms"] == 2000.0
+
+def test_decode_threading_auto_by_resolution(stream_reader):
+    stream = MagicMock()
+    stream.codec_context.width, stream.codec_context.height = 3840, 2160
+    with patch('os.cpu_count', return_value=8):
+        stream_reader._apply_decode_threading(stream)
+    assert stream.codec_context.thread_count == 4
+    assert stream.codec_context.thread_type == "AUTO"
+
+    # Explicit per-camera setting wins, whatever the resolution
+    stream_reader.set_decode_threading(2, "slice")
+    stream.codec_context.width, stream.codec_context.height = 640, 360
+    stream_reader._apply_decode_threading(stream)
+    assert stream.codec_context.thread_count == 2
+    assert stream.codec_context.thread_type == "SLICE"
+
+def test_decode_thread_type_applies_with_auto_count(stream_reader):
+    stream = MagicMock()
+    stream.codec_context.width, stream.codec_context.height = 1920, 1080
+    stream.codec_context.thread_count = 0
+    stream_reader.set_decode_threading(0, "frame")
+    stream_reader._apply_decode_threading(stream)
+    # FFmpeg keeps choosing the count up to 1080p, but the chosen type is not ignored
+    assert stream.codec_context.thread_count == 0
+    assert stream.codec_context.thread_type == "FRAME"
+    assert stream_reader.active_decode_threads == (0, "frame")
+
+def test_wait_for_frame_wakes_on_publish(stream_reader):
+    import threading
+    import time
+    stream_reader.running = True
+    frame = object()
+    publisher = threading.Timer(0.05, stream_reader._publish_frame, args=(frame, None, 123.0))
+    start = time.monotonic()
+    publisher.start()
+    got, plane, read_time, seq = stream_reader.wait_for_frame(0, timeout=5.0)
+    assert time.monotonic() - start < 1.0
+    assert got is frame and read_time == 123.0 and seq == 1
+    # Nothing new: times out with the same sequence number
+    start = time.monotonic()
+    _, _, _, seq2 = stream_reader.wait_for_frame(seq, timeout=0.05)
+    assert seq2 == seq
+    assert time.monotonic() - start >= 0.04
+
+def test_stop_releases_frame_waiter(stream_reader):
+    import threading
+    import time
+    stream_reader.running = True
+    threading.Timer(0.05, stream_reader.stop).start()
+    start = time.monotonic()
+    _, _, _, seq = stream_reader.wait_for_frame(0, timeout=5.0)
+    assert seq == 0
+    assert time.monotonic() - start < 1.0
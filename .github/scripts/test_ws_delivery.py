@@ -0,0 +1,106 @@
+import sys
+import os
+import asyncio
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../engine')))
+from shared_packet import ws_header, WS_VIDEO, WS_AUDIO, WS_METADATA
+from ws_delivery import LoopDispatcher, WSClient, get_dispatcher
+
+def _video(keyframe=0, n=0):
+    return ws_header(WS_VIDEO, keyframe, float(n)) + b'v'
+
+def _drain(client):
+    items = []
+    while client._items:
+        items.append(asyncio.run(client.get()))
+    return items
+
+def test_batch_delivered_with_one_wakeup():
+    payloads = [_video(n == 0, n) for n in range(100)]
+    async def scenario():
+        dispatcher = LoopDispatcher(asyncio.get_running_loop())
+        clients = (WSClient(maxsize=200), WSClient(maxsize=200))
+        producer = threading.Thread(target=lambda: [dispatcher.publish(clients, p) for p in payloads])
+        producer.start()
+        producer.join()
+        await asyncio.sleep(0)
+        return dispatcher, clients
+
+    dispatcher, clients = asyncio.run(scenario())
+    for client in clients:
+        assert _drain(client) == payloads
+    assert dispatcher.stats["wakeups"] == 1
+    assert dispatcher.stats["delivered"] == 200
+
+def test_full_queue_skips_to_next_keyframe():
+    client = WSClient(maxsize=3)
+    for n in range(3):
+        assert client.offer(_video(n == 0, n))
+    # Queue full mid-GOP: the rest of the GOP is dropped, audio too
+    assert not client.offer(_video(0, 3))
+    assert not client.offer(ws_header(WS_AUDIO, 1, 3.5) + b'a')
+    assert not client.offer(_video(0, 4))
+    assert client.waiting_for_keyframe
+    # Metadata still flows
+    meta = ws_header(WS_METADATA, 0, 4.5) + b'{}'
+    assert client.offer(meta)
+    assert client.offer(_video(1, 5))
+    assert _drain(client) == [_video(1, 5)]
+    stats = client.get_stats()
+    assert stats["resyncs"] == 1
+    assert stats["dropped"] == 3 + 3 + 1  # queued GOP, late packets, stale metadata
+    assert not stats["waiting_for_keyframe"]
+
+def test_lagging_client_jumps_to_keyframe():
+    client = WSClient(maxsize=100, max_lag=0.05)
+    client.offer(_video(1, 0))
+    client.offer(_video(0, 1))
+    time.sleep(0.06)
+    client.offer(_video(1, 2))
+    assert _drain(client) == [_video(1, 2)]
+    assert client.stats["resyncs"] == 1
+
+def test_up_to_date_client_keeps_everything():
+    client = WSClient(maxsize=100, max_lag=10)
+    payloads = [_video(n % 3 == 0, n) for n in range(9)]
+    for p in payloads:
+        assert client.offer(p)
+    assert _drain(client) == payloads
+    assert client.stats["resyncs"] == 0
+    assert client.stats["sent"] == 9
+
+def test_dispatcher_overflow_resyncs_clients():
+    import ws_delivery
+    loop = asyncio.new_event_loop()
+    try:
+        dispatcher = LoopDispatcher(loop)
+        dispatcher.loop = type("StalledLoop", (), {"call_soon_threadsafe": lambda self, cb: None})()
+        lagging, fresh = WSClient(maxsize=10_000), WSClient(maxsize=10_000)
+        payloads = [_video(n == 0, n) for n in range(ws_delivery.MAX_PENDING + 2)]
+        for p in payloads:
+            dispatcher.publish((lagging,), p)
+        # The loop never ran: the GOP start was discarded
+        dispatcher.publish((fresh,), ws_header(WS_METADATA, 0, 0.0) + b'{}')
+        dispatcher._drain()
+        assert dispatcher.stats["overflow"] == 3
+        assert lagging.waiting_for_keyframe and not lagging._items
+        assert not fresh.waiting_for_keyframe and len(fresh._items) == 1
+        dispatcher.publish((lagging,), _video(1, 99))
+        dispatcher._drain()
+        assert _drain(lagging) == [_video(1, 99)]
+    finally:
+        loop.close()
+
+def test_one_dispatcher_per_loop():
+    loop = asyncio.new_event_loop()
+    try:
+        assert get_dispatcher(loop) is get_dispatcher(loop)
+    finally:
+        loop.close()
+    other = asyncio.new_event_loop()
+    try:
+        assert get_dispatcher(other).loop is other
+    finally:
+        other.close()
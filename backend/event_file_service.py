@@ -183,7 +183,8 @@ def process_webhook_file_event(
         if local_path and os.path.exists(local_path):
             file_size = os.path.getsize(local_path)
 
-        ts_str = payload.get("timestamp")
+        # Motion clips are reported once their continuous segment closes: start_time is the real start
+        ts_str = payload.get("start_time") or payload.get("timestamp")
         try:
             ts = datetime.datetime.fromisoformat(ts_str)
         except:
@@ -215,71 +216,83 @@ def process_webhook_file_event(
             if camera_id in events_state.ACTIVE_CAMERAS:
                 del events_state.ACTIVE_CAMERAS[camera_id]
 
-            # Get Duration using ffprobe
-            if local_path and os.path.exists(local_path):
-                # Security: Prevent argument injection
-                if not os.path.basename(local_path).startswith("-"):
-                    try:
-                        cmd = [
-                            "ffprobe",
-                            "-v",
-                            "error",
-                            "-show_entries",
-                            "format=duration",
-                            "-of",
-                            "default=noprint_wrappers=1:nokey=1",
-                            "-i",
-                            local_path,
-                        ]
-                        result = subprocess.run(
-                            cmd,
-                            stdout=subprocess.PIPE,
-                            stderr=subprocess.PIPE,
-                            text=True,
-                            timeout=10,
-                        )
-                        if result.returncode == 0:
-                            duration_str = result.stdout.strip()
-                            if duration_str and duration_str != "N/A":
-                                duration_sec = float(duration_str)
-                                event_data.timestamp_end = ts + datetime.timedelta(
-                                    seconds=duration_sec
-                                )
-                    except Exception as e:
-                        logger.error(f"[BG-WORK] ffprobe failed: {e}")
-
-            # Generate Thumbnail
-            try:
+            # The engine reports duration and writes the thumbnail itself; ffprobe/ffmpeg
+            # only run for payloads without them (older engines)
+            duration_sec = payload.get("duration")
+            if duration_sec is not None:
+                try:
+                    event_data.timestamp_end = ts + datetime.timedelta(seconds=float(duration_sec))
+                except (TypeError, ValueError):
+                    duration_sec = None
+            if duration_sec is None:
                 if local_path and os.path.exists(local_path):
-                    base, _ = os.path.splitext(local_path)
-                    local_thumb = f"{base}.jpg"
-                    base_db, _ = os.path.splitext(file_path)
-                    db_thumb = f"{base_db}.jpg"
-
-                    subprocess.run(
-                        [
-                            "ffmpeg",
-                            "-y",
-                            "-i",
-                            local_path,
-                            "-ss",
-                            "00:00:01",
-                            "-vframes",
-                            "1",
-                            "-vf",
-                            "scale=320:-1",
-                            local_thumb,
-                        ],
-                        check=True,
-                        stdout=subprocess.DEVNULL,
-                        stderr=subprocess.DEVNULL,
-                        timeout=15,
-                    )
-
-                    if os.path.exists(local_thumb):
-                        event_data.thumbnail_path = db_thumb
-            except Exception as e:
-                logger.error(f"[BG-WORK] Thumbnail failed: {e}")
+                    # Security: Prevent argument injection
+                    if not os.path.basename(local_path).startswith("-"):
+                        try:
+                            cmd = [
+                                "ffprobe",
+                                "-v",
+                                "error",
+                                "-show_entries",
+                                "format=duration",
+                                "-of",
+                                "default=noprint_wrappers=1:nokey=1",
+                                "-i",
+                                local_path,
+                            ]
+                            result = subprocess.run(
+                                cmd,
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE,
+                                text=True,
+                                timeout=10,
+                            )
+                            if result.returncode == 0:
+                                duration_str = result.stdout.strip()
+                                if duration_str and duration_str != "N/A":
+                                    duration_sec = float(duration_str)
+                                    event_data.timestamp_end = ts + datetime.timedelta(
+                                        seconds=duration_sec
+                                    )
+                        except Exception as e:
+                            logger.error(f"[BG-WORK] ffprobe failed: {e}")
+
+            engine_thumb = payload.get("thumbnail_path")
+            local_thumb = storage_service.translate_path(engine_thumb) if engine_thumb else None
+            if local_thumb and is_path_safe(local_thumb, db) and os.path.exists(local_thumb):
+                event_data.thumbnail_path = engine_thumb
+            else:
+                try:
+                    if local_path and os.path.exists(local_path):
+                        base, _ = os.path.splitext(local_path)
+                        local_thumb = f"{base}.jpg"
+                        base_db, _ = os.path.splitext(file_path)
+                        db_thumb = f"{base_db}.jpg"
+
+                        subprocess.run(
+                            [
+                                "ffmpeg",
+                                "-y",
+                                "-i",
+                                local_path,
+                                "-ss",
+                                "00:00:01",
+                                "-vframes",
+                                "1",
+                                "-vf",
+                                "scale=320:-1",
+                                local_thumb,
+                            ],
+                            check=True,
+                            stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL,
+                            timeout=15,
+                        )
+
+                        if os.path.exists(local_thumb):
+                            event_data.thumbnail_path = db_thumb
+                except Exception as e:
+                    logger.error(f"[BG-WORK] Thumbnail failed: {e}")
         else:
             # For picture_save, thumbnail is the same as image
             event_data.thumbnail_path = file_path
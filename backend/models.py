@@ -14,6 +14,7 @@ class Camera(Base):
     is_active = Column(Boolean, default=True)
     rtsp_transport = Column(String, default="tcp") # tcp | udp
     sub_rtsp_transport = Column(String, default="tcp") # tcp | udp
+    decode_threads = Column(Integer, default=0) # 0 = global opt_decode_threads
     live_view_mode = Column(String, default="auto") # auto | webcodecs | mjpeg
     status = Column(String, default="STARTING")
     last_seen = Column(DateTime(timezone=True), nullable=True)
@@ -122,7 +123,7 @@ class Camera(Base):
 
     # Schedule & Detection Settings
     detect_motion_mode = Column(String, default="Always") # Always | Working Schedule | Manual Toggle
-    detect_engine = Column(String, default="OpenCV") # OpenCV | ONVIF Edge
+    detect_engine = Column(String, default="OpenCV") # OpenCV | Motion Vectors | ONVIF Edge
     
     schedule_monday = Column(Boolean, default=True)
     schedule_monday_start = Column(String, default="00:00")
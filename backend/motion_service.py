@@ -77,6 +77,9 @@ def get_optimization_settings(db: Session) -> dict:
     defaults = {
         "opt_live_view_fps_throttle": 2,
         "opt_motion_fps_throttle": 3,
+        "opt_ai_fps_budget": 5,
+        "opt_ai_cpu_interpreters": 0,
+        "opt_ai_motion_gate": False,
         "opt_live_view_height_limit": 720,
         "opt_motion_analysis_height": 180,
         "opt_live_view_quality": 60,
@@ -84,6 +87,14 @@ def get_optimization_settings(db: Session) -> dict:
         "opt_ffmpeg_preset": "ultrafast",
         "opt_pre_capture_fps_throttle": 1,
         "opt_verbose_engine_logs": False,
+        "opt_decode_mode": "demand",
+        "opt_motion_subtractor": "mog2",
+        "opt_decode_threads": 0,
+        "opt_decode_thread_type": "auto",
+        "opt_motion_clips_from_continuous": False,
+        "opt_recording_encoder": "ffmpeg",
+        "opt_recording_queue_mb": 256,
+        "opt_recording_overload": "drop",
         "ai_enabled": False,
         "ai_model": "mobilenet_ssd_v2",
         "ai_hardware": "auto",
@@ -94,9 +105,9 @@ def get_optimization_settings(db: Session) -> dict:
         settings = db.query(SystemSettings).filter(SystemSettings.key.startswith("opt_")).all()
         for s in settings:
             # Most are integers, preset is string, some are boolean
-            if s.key == "opt_ffmpeg_preset":
+            if s.key in ("opt_ffmpeg_preset", "opt_decode_mode", "opt_motion_subtractor", "opt_decode_thread_type", "opt_recording_encoder", "opt_recording_overload"):
                 defaults[s.key] = s.value
-            elif s.key == "opt_verbose_engine_logs":
+            elif s.key in ("opt_verbose_engine_logs", "opt_motion_clips_from_continuous", "opt_ai_motion_gate"):
                 defaults[s.key] = s.value.lower() == "true"
             else:
                 try:
@@ -182,6 +193,7 @@ def camera_to_config(cam: Camera, opt_settings: dict = None) -> dict:
         "ptz_can_zoom": cam.ptz_can_zoom if cam.ptz_can_zoom is not None else True,
         "rtsp_transport": cam.rtsp_transport or "tcp",
         "sub_rtsp_transport": cam.sub_rtsp_transport or "tcp",
+        "decode_threads": cam.decode_threads or 0,
         "live_view_mode": cam.live_view_mode or "auto",
         "audio_enabled": cam.audio_enabled if cam.audio_enabled is not None else False,
         "enable_audio": cam.enable_audio if cam.enable_audio is not None else False,
@@ -291,6 +303,17 @@ def sync_global_config(db: Session):
 
     payload = {
         "opt_verbose_engine_logs": opt_settings.get("opt_verbose_engine_logs", False),
+        "opt_decode_mode": opt_settings.get("opt_decode_mode", "demand"),
+        "opt_motion_subtractor": opt_settings.get("opt_motion_subtractor", "mog2"),
+        "opt_decode_threads": opt_settings.get("opt_decode_threads", 0),
+        "opt_decode_thread_type": opt_settings.get("opt_decode_thread_type", "auto"),
+        "opt_motion_clips_from_continuous": opt_settings.get("opt_motion_clips_from_continuous", False),
+        "opt_recording_encoder": opt_settings.get("opt_recording_encoder", "ffmpeg"),
+        "opt_recording_queue_mb": opt_settings.get("opt_recording_queue_mb", 256),
+        "opt_recording_overload": opt_settings.get("opt_recording_overload", "drop"),
+        "opt_ai_cpu_interpreters": opt_settings.get("opt_ai_cpu_interpreters", 0),
+        "opt_ai_fps_budget": opt_settings.get("opt_ai_fps_budget", 5),
+        "opt_ai_motion_gate": opt_settings.get("opt_ai_motion_gate", False),
         "ai_enabled": opt_settings.get("ai_enabled", False),
         "ai_model": opt_settings.get("ai_model", "mobilenet_ssd_v2"),
         "ai_hardware": opt_settings.get("ai_hardware", "auto"),
@@ -102,9 +102,10 @@ def update_bulk_settings(settings: dict, db: Session = Depends(database.get_db),
         numeric_keys = [
             "max_global_storage_gb", "cleanup_interval_hours", "archival_interval_hours", 
             "backup_auto_frequency_hours", "backup_auto_retention",
-            "opt_live_view_fps_throttle", "opt_motion_fps_throttle",
+            "opt_live_view_fps_throttle", "opt_motion_fps_throttle", "opt_ai_fps_budget", "opt_ai_cpu_interpreters",
             "opt_live_view_height_limit", "opt_motion_analysis_height",
-            "opt_live_view_quality", "opt_snapshot_quality"
+            "opt_live_view_quality", "opt_snapshot_quality", "opt_decode_threads",
+            "opt_recording_queue_mb"
         ]
         if key in numeric_keys:
             try:
@@ -116,7 +117,7 @@ def update_bulk_settings(settings: dict, db: Session = Depends(database.get_db),
                 raise HTTPException(status_code=400, detail=f"Value for {key} must be a number")
 
         # Force lowercase for boolean fields
-        boolean_keys = ["opt_verbose_engine_logs", "telemetry_enabled", "mqtt_enabled", "cleanup_enabled", "ai_enabled", "go2rtc_enabled", "backup_auto_enabled", "oauth_global_enabled", "oauth_auto_redirect"]
+        boolean_keys = ["opt_verbose_engine_logs", "opt_motion_clips_from_continuous", "opt_ai_motion_gate", "telemetry_enabled", "mqtt_enabled", "cleanup_enabled", "ai_enabled", "go2rtc_enabled", "backup_auto_enabled", "oauth_global_enabled", "oauth_auto_redirect"]
         if key in boolean_keys:
             value = str(value).lower()
         
@@ -202,12 +203,23 @@ DEFAULT_SETTINGS = {
     # Optimization Settings (Advanced)
     "opt_live_view_fps_throttle": {"value": "2", "description": "Process every Nth frame for Live View (higher = less CPU)"},
     "opt_motion_fps_throttle": {"value": "3", "description": "Process every Nth frame for Motion Detection (higher = less CPU)"},
+    "opt_ai_fps_budget": {"value": "5", "description": "Max AI inferences per second for each camera (0 = unlimited). The AI engine is shared fairly between cameras, cameras with motion get a larger share"},
+    "opt_ai_cpu_interpreters": {"value": "0", "description": "Parallel AI interpreters when inference runs on CPU (0 = auto: one per 4 cores, up to 4). Ignored with a Coral TPU"},
+    "opt_ai_motion_gate": {"value": "false", "description": "Run AI inference only when pixels change (OpenCV background model), on a padded crop around the change. A full-frame inference still runs every 10 seconds"},
     "opt_live_view_height_limit": {"value": "720", "description": "Max height for live stream (downscales if larger)"},
     "opt_motion_analysis_height": {"value": "180", "description": "Height for motion analysis resizing (smaller = faster)"},
     "opt_live_view_quality": {"value": "60", "description": "JPEG Quality for live stream (1-100)"},
     "opt_snapshot_quality": {"value": "90", "description": "JPEG Quality for snapshots (1-100)"},
     "opt_ffmpeg_preset": {"value": "ultrafast", "description": "FFmpeg preset for transcoding (ultrafast, superfast, veryfast, faster, fast, medium)"},
     "opt_verbose_engine_logs": {"value": "false", "description": "Enable verbose logs from PyAV/FFmpeg in the engine"},
+    "opt_decode_mode": {"value": "demand", "description": "Engine decoding strategy: 'demand' decodes only what consumers need (keyframes when idle), 'all' decodes every frame"},
+    "opt_decode_threads": {"value": "0", "description": "Video decoder threads per camera (0 = auto: multi-threaded above 1080p). Cameras can override this"},
+    "opt_decode_thread_type": {"value": "auto", "description": "Decoder threading model: 'auto', 'frame' or 'slice' (applied at every resolution)"},
+    "opt_motion_subtractor": {"value": "mog2", "description": "Background model for OpenCV motion detection: 'mog2' (robust) or 'running_average' (much lighter on CPU)"},
+    "opt_recording_encoder": {"value": "ffmpeg", "description": "Encoder for transcoded recordings: 'ffmpeg' (subprocess fed through a pipe) or 'pyav' (in-process, no per-frame copies). Recordings with audio are encoded in-process unless VAAPI is used"},
+    "opt_recording_queue_mb": {"value": "256", "description": "Memory budget (MB) of each transcoded recording's frame queue; frames beyond it are handled by the overload policy"},
+    "opt_recording_overload": {"value": "drop", "description": "When the recording encoder falls behind: 'drop' frames, 'reduce_fps' (keep every 2nd/4th frame while the queue fills) or 'passthrough' (continue by copying the camera stream)"},
+    "opt_motion_clips_from_continuous": {"value": "false", "description": "In Always/Continuous mode, cut motion event clips from the continuous recording instead of encoding them a second time"},
     "telemetry_enabled": {"value": "true", "description": "Enable anonymous telemetry to help improve VibeNVR"},
     "instance_id": {"value": "", "description": "Unique anonymous ID for this VibeNVR instance"},
     "default_live_view_mode": {"value": "auto", "description": "Default streaming mode for new cameras (auto, webcodecs, mjpeg)"},
@@ -49,6 +49,7 @@ class CameraBase(BaseModel):
     is_active: bool = True
     rtsp_transport: Optional[str] = "tcp" # tcp | udp
     sub_rtsp_transport: Optional[str] = "tcp" # tcp | udp
+    decode_threads: Optional[int] = 0 # 0 = global opt_decode_threads
     live_view_mode: Optional[str] = "auto" # auto | webcodecs | mjpeg
     storage_profile_id: Optional[int] = None
     motion_storage_profile_id: Optional[int] = None
@@ -204,7 +205,7 @@ class CameraBase(BaseModel):
 
     # Schedule
     detect_motion_mode: Optional[str] = "Always"
-    detect_engine: Optional[str] = "OpenCV" # OpenCV | ONVIF Edge
+    detect_engine: Optional[str] = "OpenCV" # OpenCV | Motion Vectors | ONVIF Edge
 
     
     schedule_monday: Optional[bool] = True
@@ -343,6 +344,16 @@ class CameraBase(BaseModel):
 
 
 
+    @field_validator('decode_threads', mode='before')
+    @classmethod
+    def validate_decode_threads(cls, v: Any) -> int:
+        try:
+            val = int(v)
+        except (TypeError, ValueError):
+            return 0
+        # 0 = inherit the global setting, capped at 16 decoder threads
+        return max(0, min(16, val))
+
     @field_validator('max_movie_length')
     @classmethod
     def validate_max_movie_length(cls, v: Optional[int]) -> Optional[int]:
@@ -45,10 +45,46 @@ def validate_setting(key: str, value: str):
             if value not in VALID_FFMPEG_PRESETS:
                 raise ValueError(f"Invalid preset. Must be one of: {', '.join(VALID_FFMPEG_PRESETS)}")
         
+        elif key == "opt_decode_mode":
+            if value not in ["demand", "all"]:
+                raise ValueError("Invalid decode mode. Must be 'demand' or 'all'")
+
+        elif key == "opt_decode_threads":
+            v = int(value)
+            if v < 0 or v > 16: raise ValueError("Decode threads must be between 0 (auto) and 16")
+
+        elif key == "opt_decode_thread_type":
+            if value not in ["auto", "frame", "slice"]:
+                raise ValueError("Invalid decode thread type. Must be 'auto', 'frame' or 'slice'")
+
+        elif key == "opt_recording_encoder":
+            if value not in ["ffmpeg", "pyav"]:
+                raise ValueError("Invalid recording encoder. Must be 'ffmpeg' or 'pyav'")
+
+        elif key == "opt_recording_queue_mb":
+            v = int(value)
+            if v < 32 or v > 8192: raise ValueError("Recording queue size must be between 32 and 8192 MB")
+
+        elif key == "opt_recording_overload":
+            if value not in ["drop", "reduce_fps", "passthrough"]:
+                raise ValueError("Invalid overload policy. Must be 'drop', 'reduce_fps' or 'passthrough'")
+
+        elif key == "opt_motion_subtractor":
+            if value not in ["mog2", "running_average"]:
+                raise ValueError("Invalid motion subtractor. Must be 'mog2' or 'running_average'")
+
         elif key in ["opt_live_view_fps_throttle", "opt_motion_fps_throttle"]:
             v = int(value)
             if v < 1: raise ValueError("Throttle must be >= 1")
             
+        elif key == "opt_ai_fps_budget":
+            v = int(value)
+            if v < 0 or v > 30: raise ValueError("AI inference budget must be between 0 (unlimited) and 30 fps")
+            
+        elif key == "opt_ai_cpu_interpreters":
+            v = int(value)
+            if v < 0 or v > 16: raise ValueError("CPU interpreters must be between 0 (auto) and 16")
+            
         elif key == "opt_live_view_height_limit":
             v = int(value)
             if v < 144: raise ValueError("Height limit must be >= 144")
@@ -65,7 +101,7 @@ def validate_setting(key: str, value: str):
             if value not in ["auto", "webcodecs", "mjpeg"]:
                 raise ValueError("Invalid mode. Must be 'auto', 'webcodecs', or 'mjpeg'")
         
-        elif key in ["opt_verbose_engine_logs", "telemetry_enabled", "mqtt_enabled", "cleanup_enabled", "ai_enabled", "go2rtc_enabled", "backup_auto_enabled"]:
+        elif key in ["opt_verbose_engine_logs", "opt_motion_clips_from_continuous", "opt_ai_motion_gate", "telemetry_enabled", "mqtt_enabled", "cleanup_enabled", "ai_enabled", "go2rtc_enabled", "backup_auto_enabled"]:
             if value.lower() not in ["true", "false"]:
                 raise ValueError("Must be 'true' or 'false'")
         
@@ -6,8 +6,11 @@ import logging
 import threading
 import numpy as np
 import cv2
+from concurrent.futures import CancelledError, TimeoutError as FutureTimeoutError
 from typing import List, Dict, Any
 
+from ai_scheduler import AIScheduler, ACTIVE_WEIGHT, DEFAULT_FPS_BUDGET
+
 # Suppress TFLite / TensorFlow C++ internal logging BEFORE importing tflite_runtime.
 # These control the underlying C++ logging framework (ABSL / glog) used by TFLite.
 # Level 3 = FATAL only (0=INFO, 1=WARNING, 2=ERROR, 3=FATAL).
@@ -26,6 +29,98 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# An invoke() running longer than this is a hung EdgeTPU: the model is reloaded
+INVOKE_TIMEOUT = 6.0
+# Auto-sized CPU pool (opt_ai_cpu_interpreters = 0): one interpreter per 4 cores, at most this many
+MAX_AUTO_INTERPRETERS = 4
+# Threads of one CPU interpreter; beyond this a small detection model barely gets faster
+MAX_INTERPRETER_THREADS = 4
+
+def cpu_pool_layout(requested=0, cores=None):
+    """(interpreters, threads per interpreter) of the CPU inference pool.
+
+    Several interpreters invoking side by side get more frames per second out
+    of the cores than one interpreter with many threads. AI gets at most half
+    of the cores, the rest stays with decoding and encoding.
+    """
+    cores = cores or os.cpu_count() or 1
+    interpreters = requested if requested and requested > 0 else max(1, min(MAX_AUTO_INTERPRETERS, cores // 4))
+    threads = max(1, min(MAX_INTERPRETER_THREADS, (cores // 2) // interpreters))
+    return interpreters, threads
+
+# Margin added around a changed region before cropping, as a fraction of its larger side
+ROI_PADDING = 0.25
+# Smallest crop side, as a fraction of the frame's shorter side (keeps some context around tiny changes)
+ROI_MIN_SIDE = 0.25
+# Crops covering more of the frame than this gain too little: the full frame is used
+ROI_MAX_AREA = 0.6
+
+def roi_crop_box(region, frame_w, frame_h):
+    """Pixel box (x0, y0, x1, y1) to run the model on for a changed `region`, or None for the full frame.
+
+    `region` is normalized (xmin, ymin, xmax, ymax). The box is padded and made
+    as square as the frame allows, since the model input is square.
+    """
+    xmin, ymin, xmax, ymax = region
+    side = max((xmax - xmin) * frame_w, (ymax - ymin) * frame_h)
+    side = max(side * (1 + 2 * ROI_PADDING), ROI_MIN_SIDE * min(frame_w, frame_h))
+    box_w, box_h = min(side, frame_w), min(side, frame_h)
+    if box_w * box_h > ROI_MAX_AREA * frame_w * frame_h:
+        return None
+    x0 = min(max((xmin + xmax) / 2 * frame_w - box_w / 2, 0), frame_w - box_w)
+    y0 = min(max((ymin + ymax) / 2 * frame_h - box_h / 2, 0), frame_h - box_h)
+    return round(x0), round(y0), round(x0 + box_w), round(y0 + box_h)
+
+def uncrop_results(results, roi):
+    """Map detection boxes (normalized [ymin, xmin, ymax, xmax]) from a crop back to the full frame.
+
+    `roi` is the crop as normalized (xmin, ymin, xmax, ymax) of the full frame.
+    """
+    rx0, ry0, rx1, ry1 = roi
+    rw, rh = rx1 - rx0, ry1 - ry0
+    for result in results:
+        ymin, xmin, ymax, xmax = result["box"]
+        result["box"] = [ry0 + ymin * rh, rx0 + xmin * rw, ry0 + ymax * rh, rx0 + xmax * rw]
+    return results
+
+def class_mask(labels, num_classes, allowed_objects, vehicle_classes):
+    """Boolean mask over class ids: True where the label is one of `allowed_objects`"""
+    mask = np.zeros(num_classes, dtype=bool)
+    for class_id in range(num_classes):
+        label = labels.get(class_id, "unknown")
+        mask[class_id] = label in allowed_objects or ("vehicle" in allowed_objects and label in vehicle_classes)
+    return mask
+
+def yolov8_candidates(output, scale, zero, threshold, allowed):
+    """Vectorized decode of a YOLOv8 output tensor, before NMS.
+
+    `output` is (4 + classes, anchors) or (anchors, 4 + classes) with the box
+    as (xc, yc, w, h), quantized with (scale, zero) unless scale is 0 or 1.
+    Returns (boxes as x, y, w, h; scores; class ids) of the anchors whose best
+    class reaches `threshold` and is set in the boolean `allowed` mask.
+    """
+    if output.shape[0] < output.shape[1]:
+        boxes, scores = output[:4], output[4:]
+    else:
+        boxes, scores = output[:, :4].T, output[:, 4:].T
+    # Float models report (0.0, 0): nothing to dequantize
+    quantized = scale > 0 and (scale != 1.0 or zero != 0)
+    # Dequantization is monotonic (scale > 0): max over the raw values, then convert only the best scores
+    best = scores.max(axis=0).astype(np.float32)
+    if quantized:
+        best = (best - zero) * scale
+    keep = np.flatnonzero(best >= threshold)
+    if keep.size == 0:
+        return np.empty((0, 4), dtype=np.float32), best[keep], keep
+    # argmax is far slower than max, so it only runs on the anchors above the threshold
+    class_ids = scores[:, keep].argmax(axis=0)
+    allowed_rows = allowed[class_ids]
+    keep, class_ids = keep[allowed_rows], class_ids[allowed_rows]
+    xc, yc, w, h = boxes[:, keep].astype(np.float32)
+    if quantized:
+        xc, yc, w, h = ((v - zero) * scale for v in (xc, yc, w, h))
+    return np.stack([xc - w / 2, yc - h / 2, w, h], axis=1), best[keep], class_ids
+
 @contextlib.contextmanager
 def _suppress_native_output():
     """
@@ -83,9 +178,13 @@ class AIDetector:
             
         self.config = config or {}
         self.interpreter = None
+        self.interpreters = [] # One per scheduler worker: the Coral's, or the CPU pool
+        self._cpu_pool_request = 0
         self.labels = {}
         self.hardware = "unknown"
         self.inference_lock = threading.Lock()
+        self.scheduler = AIScheduler(self._infer)
+        self._reset_lock = threading.Lock()
         
         if not HAS_TFLITE:
             logger.error("AI: tflite-runtime not installed. AI disabled.")
@@ -159,6 +258,7 @@ class AIDetector:
             else:
                 logger.info("AI: GLOBAL DEACTIVATION - Releasing resources...")
                 self.interpreter = None
+                self.interpreters = []
                 self.labels = {}
                 self.hardware = "disabled"
 
@@ -186,6 +286,15 @@ class AIDetector:
             self.config['ai_hardware'] = hardware
             self._load_model()
 
+    def update_cpu_interpreters(self, count: int):
+        """Resize the CPU interpreter pool (0 = auto) if the CPU model is loaded"""
+        with self.inference_lock:
+            self.config['opt_ai_cpu_interpreters'] = count
+            # Compared with the loaded pool: self.config may be GLOBAL_CONFIG, already updated
+            if self.hardware == 'cpu' and self.interpreter is not None and count != self._cpu_pool_request:
+                logger.info(f"AI: Resizing CPU interpreter pool ({count or 'auto'})...")
+                self._load_model()
+
     def _load_model(self, force_cpu=False):
         """
         Load TFLite model with iterative fallback strategy:
@@ -203,6 +312,9 @@ class AIDetector:
     def _load_model_impl(self, force_cpu=False):
         model_dir = "models"
         self.interpreter = None
+        self.interpreters = []
+        self._cpu_pool_request = self.config.get('opt_ai_cpu_interpreters', 0)
+        pool_size, threads = cpu_pool_layout(self._cpu_pool_request)
         
         # Initial target from config
         target_model = self.config.get('ai_model', 'mobilenet_ssd_v2')
@@ -259,9 +371,9 @@ class AIDetector:
                             experimental_delegates=[tflite.load_delegate(_lib_path)]
                         )
                 else:
-                    logger.info(f"AI: Loading CPU interpreter for {model_type} from {model_path}...")
+                    logger.info(f"AI: Loading {pool_size} CPU interpreter(s) ({threads} threads each) for {model_type} from {model_path}...")
                     with _suppress_native_output():
-                        self.interpreter = tflite.Interpreter(model_path=model_path)
+                        self.interpreter = tflite.Interpreter(model_path=model_path, num_threads=threads)
                 
                 # Success!
                 self.hardware = hardware
@@ -276,6 +388,18 @@ class AIDetector:
                     self.interpreter.allocate_tensors()
                     self.input_details = self.interpreter.get_input_details()
                     self.output_details = self.interpreter.get_output_details()
+
+                # CPU: more interpreters of the same model, invoked in parallel by the scheduler
+                # workers (TFLite releases the GIL in invoke()). Tensor indices are identical.
+                pool = [self.interpreter]
+                if hardware == 'cpu':
+                    for _ in range(pool_size - 1):
+                        with _suppress_native_output():
+                            extra = tflite.Interpreter(model_path=model_path, num_threads=threads)
+                            extra.allocate_tensors()
+                        pool.append(extra)
+                self.interpreters = pool
+                self.scheduler.set_workers(len(pool))
                 
                 # Warmup inference
                 if hardware == 'tpu':
@@ -331,90 +455,76 @@ class AIDetector:
             else:
                 self.labels = {0: 'person', 1: 'bicycle', 2: 'car', 3: 'motorcycle', 5: 'bus', 7: 'truck', 16: 'cat', 17: 'dog'}
 
-    def _start_inference_thread(self):
-        """Start a dedicated background thread that owns all interpreter.invoke() calls.
-        
-        The Coral EdgeTPU USB driver can hang indefinitely when the host CPU is under
-        heavy load (e.g. libx264 startup). By isolating invoke() in its own daemon thread,
-        the camera thread can time out on the result queue and continue without blocking.
-        If invoke() hangs, the thread is abandoned (daemon=True) and a fresh CPU model
-        is loaded in a new thread.
+    def _class_mask(self, num_classes, allowed_objects, vehicle_classes):
+        """class_mask() for the current labels, rebuilt only when the labels or the allowed types change"""
+        key = (num_classes, tuple(allowed_objects))
+        cached = getattr(self, '_class_mask_cache', None)
+        if cached is None or cached[0] is not self.labels or cached[1] != key:
+            cached = (self.labels, key, class_mask(self.labels, num_classes, allowed_objects, vehicle_classes))
+            self._class_mask_cache = cached
+        return cached[2]
+
+    def _infer(self, task, worker):
+        """Scheduler task: invoke() and post-process one camera's frame.
+
+        Runs on AIScheduler worker `worker`, which alone invokes interpreter
+        number `worker`. The Coral EdgeTPU USB driver can hang indefinitely when
+        the host CPU is under heavy load (e.g. libx264 startup);
+        _check_invoke_timeout() then abandons the workers and loads a fresh model.
         """
-        import queue as _queue
-        self._infer_queue = _queue.Queue(maxsize=1)   # Single frame slot (always latest)
-        self._infer_thread_alive = threading.Event()
-        self._infer_thread_alive.set()
-
-        def _inference_loop():
-            logger.info(f"AI: Inference thread started (hardware={self.hardware})")
-            while self._infer_thread_alive.is_set():
-                try:
-                    task = self._infer_queue.get(timeout=0.5)
-                except Exception:
-                    continue  # Timeout, loop again
-
-                if task is None:
-                    break  # Shutdown signal
-
-                input_data, camera_id, request_q = task
-                try:
-                    if not self.interpreter:
-                        request_q.put([], block=False)
-                        continue
-                    self.interpreter.set_tensor(self.input_details[0]['index'], input_data)
-                    self.interpreter.invoke()
-                    
-                    self.last_inference_time = time.time()
-                    self.inference_count += 1
-                    
-                    # Collect raw outputs
-                    raw = {
-                        'boxes': None, 'classes': None, 'scores': None, 'count': None,
-                        'raw_outputs': [self.interpreter.get_tensor(d['index']) for d in self.output_details],
-                        'model_type': self.model_type,
-                        'hardware': self.hardware,
-                    }
-                    request_q.put(raw, block=False)
-                except Exception as e:
-                    logger.error(f"AI: Inference thread error: {e}")
-                    try:
-                        request_q.put([], block=False)
-                    except Exception:
-                        pass
-            logger.info("AI: Inference thread exiting")
-
-        self._infer_thread = threading.Thread(target=_inference_loop, daemon=True)
-        self._infer_thread.start()
-
-    def detect(self, frame, camera_id: int = 0, config: Dict[str, Any] = None) -> List[Dict[str, Any]]:
-        self.last_inference_attempt = time.time()
-        
-        if not self._enabled:
+        input_data, input_shape, camera_id, config, roi = task
+        interpreters = self.interpreters
+        if not self.interpreter or worker >= len(interpreters):
             return []
-            
-        if not self.interpreter:
-            # Watchdog: If interpreter is None for >20s and not currently loading, trigger a reload
-            if not getattr(self, '_is_loading', False) and (time.time() - getattr(self, '_last_tpu_fail', 0) > 20):
-                logger.error(f"Camera {camera_id}: AI Watchdog triggered - interpreter is None, forcing reload.")
-                self._tpu_fail_count += 1
-                self._last_tpu_fail = time.time()
-                threading.Thread(target=self._load_model, kwargs={'force_cpu': self._tpu_fail_count > 3}, daemon=True).start()
+        interpreter = interpreters[worker]
+        try:
+            interpreter.set_tensor(self.input_details[0]['index'], input_data)
+            interpreter.invoke()
+
+            self.last_inference_time = time.time()
+            self.inference_count += 1
+
+            # Collect raw outputs
+            raw = {
+                'raw_outputs': [interpreter.get_tensor(d['index']) for d in self.output_details],
+                'model_type': self.model_type,
+                'hardware': self.hardware,
+            }
+        except Exception as e:
+            logger.error(f"AI: Inference thread error: {e}")
             return []
+        results = self._postprocess(raw, input_shape, camera_id, config)
+        return uncrop_results(results, roi) if roi else results
 
-        # Ensure inference thread is running
-        if not hasattr(self, '_infer_queue') or not getattr(self, '_infer_thread', None) or not self._infer_thread.is_alive():
-            logger.info("AI: (Re)starting inference thread...")
-            self._start_inference_thread()
-
-        current_config = config or self.config
-
-        # Pre-process frame
+    def _check_invoke_timeout(self):
+        """Reload the model when the scheduler has been stuck in one invoke() for INVOKE_TIMEOUT"""
+        if self.scheduler.busy_for() < INVOKE_TIMEOUT:
+            return
+        with non_blocking_lock(self._reset_lock) as acquired:
+            if not acquired or self.scheduler.busy_for() < INVOKE_TIMEOUT:
+                return
+            logger.warning(f"AI: invoke() timed out ({INVOKE_TIMEOUT:.0f}s) on {self.hardware} — reloading model.")
+            self._tpu_fail_count += 1
+            self._last_tpu_fail = time.time()
+            self.interpreter = None
+            self.interpreters = []
+            self.hardware = "resetting"
+            self.scheduler.restart([])
+
+            # Allow TPU to retry up to 3 times before forcing CPU fallback.
+            # The EdgeTPU USB driver can crash during libx264 high-CPU bursts.
+            # Re-loading the model after the burst settles usually recovers it.
+            force_cpu = self._tpu_fail_count > 3
+            threading.Thread(target=self._load_model, kwargs={'force_cpu': force_cpu}, daemon=True).start()
+
+    def _preprocess(self, frame, camera_id):
+        """Model input tensor for `frame` and the (h, w) it was resized to, or None"""
         try:
             input_shape = self.input_details[0]['shape']
             h, w = input_shape[1], input_shape[2]
             input_frame = cv2.resize(frame, (w, h))
             if input_frame is None or input_frame.size == 0:
-                return []
+                return None
             input_data = np.expand_dims(input_frame, axis=0)
 
             expected_dtype = self.input_details[0]['dtype']
@@ -425,62 +535,69 @@ class AIDetector:
                     input_data = (input_data.astype(np.int16) + 128).astype(np.uint8)
         except Exception as e:
             logger.error(f"Camera {camera_id}: AI pre-process error: {e}")
-            return []
+            return None
+        return input_data, input_frame.shape[:2]
+
+    def submit(self, frame, camera_id: int = 0, config: Dict[str, Any] = None, active: bool = False, region=None):
+        """Queue `frame` for inference without waiting for it.
+
+        Returns a Future of the detections list (cancelled if a newer frame of
+        the same camera replaces it before its turn), or None when AI is not
+        ready. `active` (recent motion) gives the camera ACTIVE_WEIGHT in the
+        scheduler; opt_ai_fps_budget (engine-wide) caps its inference rate. With a changed
+        `region` (normalized xmin, ymin, xmax, ymax), only a padded crop around
+        it is resized to the model input, so small objects keep more pixels;
+        the boxes are still relative to the full frame.
+        """
+        self.last_inference_attempt = time.time()
 
-        # Use a submit lock to ensure only one camera is waiting on the inference thread at a time.
-        # This prevents the 6s watchdog from firing due to queue wait time, measuring only actual invoke() time.
-        if not getattr(self, '_submit_lock', None):
-            self._submit_lock = threading.Lock()
-            
-        # Wait up to 200ms for the AI to become free. This drastically improves the detection 
-        # hit rate for multi-camera setups without blocking the video stream for too long.
-        if not self._submit_lock.acquire(timeout=0.2):
-            return []  # AI is heavily loaded, drop frame
+        if not self._enabled:
+            return None
 
-        try:
-            # Submit to inference thread
-            import queue as _queue
-            request_q = _queue.Queue(maxsize=1)
-            try:
-                self._infer_queue.put_nowait((input_data, camera_id, request_q))
-            except Exception:
-                return []
+        self._check_invoke_timeout()
 
-            # Block on result (timeout prevents hanging the camera thread if TPU crashes)
-            try:
-                raw = request_q.get(timeout=6.0)
-            except _queue.Empty:
-                logger.warning(f"AI: invoke() timed out (6s) on {self.hardware} — reloading model.")
+        if not self.interpreter:
+            # Watchdog: If interpreter is None for >20s and not currently loading, trigger a reload
+            if not getattr(self, '_is_loading', False) and (time.time() - getattr(self, '_last_tpu_fail', 0) > 20):
+                logger.error(f"Camera {camera_id}: AI Watchdog triggered - interpreter is None, forcing reload.")
                 self._tpu_fail_count += 1
                 self._last_tpu_fail = time.time()
-                self.interpreter = None
-                self.hardware = "resetting"
-                if hasattr(self, '_infer_thread_alive'):
-                    self._infer_thread_alive.clear()
-                if getattr(self, '_infer_queue', None):
-                    try: self._infer_queue.get_nowait()
-                    except Exception: pass
-                
-                # Allow TPU to retry up to 3 times before forcing CPU fallback.
-                # The EdgeTPU USB driver can crash during libx264 high-CPU bursts.
-                # Re-loading the model after the burst settles usually recovers it.
-                force_cpu = self._tpu_fail_count > 3
-                threading.Thread(target=self._load_model, kwargs={'force_cpu': force_cpu}, daemon=True).start()
-                return []
-        finally:
-            self._submit_lock.release()
+                threading.Thread(target=self._load_model, kwargs={'force_cpu': self._tpu_fail_count > 3}, daemon=True).start()
+            return None
 
-        if not isinstance(raw, dict):
-            return []  # Error sentinel from inference thread
+        current_config = config or self.config
+        roi = None
+        box = roi_crop_box(region, frame.shape[1], frame.shape[0]) if region else None
+        if box:
+            x0, y0, x1, y1 = box
+            roi = (x0 / frame.shape[1], y0 / frame.shape[0], x1 / frame.shape[1], y1 / frame.shape[0])
+            frame = frame[y0:y1, x0:x1]
+        prepared = self._preprocess(frame, camera_id)
+        if prepared is None:
+            return None
+        input_data, input_shape = prepared
+        return self.scheduler.submit(camera_id, (input_data, input_shape, camera_id, current_config, roi),
+                                     weight=ACTIVE_WEIGHT if active else 1.0,
+                                     fps_budget=self.config.get('opt_ai_fps_budget', DEFAULT_FPS_BUDGET))
 
-        # Post-process results using raw_outputs collected by the inference thread
+    def detect(self, frame, camera_id: int = 0, config: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """Blocking submit(): the detections for `frame`, or [] if it was dropped or timed out"""
+        future = self.submit(frame, camera_id, config)
+        if future is None:
+            return []
+        try:
+            return future.result(timeout=INVOKE_TIMEOUT) or []
+        except (FutureTimeoutError, CancelledError):
+            return []
+
+    def _postprocess(self, raw, input_shape, camera_id, current_config):
         raw_outputs = raw.get('raw_outputs', [])
         model_type = raw.get('model_type', self.model_type)
         results = []
         threshold = current_config.get('ai_threshold', 0.5)
         allowed_objects = current_config.get('ai_object_types', ["person", "vehicle"])
         vehicle_classes = ["car", "truck", "bus", "motorcycle"]
-        input_h, input_w = input_frame.shape[0], input_frame.shape[1]
+        input_h, input_w = input_shape
 
         try:
             if model_type == 'yolo_v8':
@@ -501,31 +618,21 @@ class AIDetector:
                                 results.append({"label": label, "score": score, "confidence": score,
                                                 "box": [float(boxes[i][0]), float(boxes[i][1]), float(boxes[i][2]), float(boxes[i][3])]})
                 else:
-                    # Standard YOLOv8 format
-                    if output.ndim == 2 and output.shape[0] < output.shape[1]:
-                        output = output.T
+                    # Standard YOLOv8 format, (4 + classes, anchors) or (anchors, 4 + classes)
                     o_detail = self.output_details[0]
                     o_scale, o_zero = 1.0, 0
                     if 'quantization' in o_detail:
                         o_scale, o_zero = o_detail['quantization']
-                    if output.shape[-1] <= 4:
+                    if output.ndim != 2 or min(output.shape) <= 4:
                         logger.error(f"Camera {camera_id}: YOLOv8 unexpected output shape {output.shape}")
                         return []
-                    candidate_boxes, candidate_scores, candidate_labels = [], [], []
-                    for row in output:
-                        f_row = (row.astype(np.float32) - o_zero) * o_scale if (o_scale != 1.0 or o_zero != 0) else row.astype(np.float32)
-                        scores_row = f_row[4:]
-                        if len(scores_row) == 0: continue
-                        class_id = np.argmax(scores_row)
-                        score = float(scores_row[class_id])
-                        if score >= threshold:
-                            label = self.labels.get(class_id, "unknown")
-                            if label in allowed_objects or ("vehicle" in allowed_objects and label in vehicle_classes):
-                                xc, yc, bw, bh = f_row[0], f_row[1], f_row[2], f_row[3]
-                                candidate_boxes.append([float(xc - bw/2), float(yc - bh/2), float(bw), float(bh)])
-                                candidate_scores.append(score)
-                                candidate_labels.append(label)
-                    if candidate_boxes:
+                    # Decoded in the model's layout: a transposed copy per frame would cost more than the decode
+                    allowed = self._class_mask(min(output.shape) - 4, allowed_objects, vehicle_classes)
+                    boxes, scores, class_ids = yolov8_candidates(output, o_scale, o_zero, threshold, allowed)
+                    if len(scores):
+                        candidate_boxes = boxes.tolist()
+                        candidate_scores = scores.tolist()
+                        candidate_labels = [self.labels.get(int(c), "unknown") for c in class_ids]
                         nms_indices = cv2.dnn.NMSBoxes(candidate_boxes, candidate_scores, threshold, 0.45)
                         if len(nms_indices) > 0:
                             if isinstance(nms_indices, np.ndarray):
@@ -0,0 +1,214 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, InvalidStateError
+
+logger = logging.getLogger(__name__)
+
+# Default inference rate limit per camera (opt_ai_fps_budget), 0 = unlimited
+DEFAULT_FPS_BUDGET = 5
+# Share of the inference time a camera with recent motion gets, relative to an idle one
+ACTIVE_WEIGHT = 2.0
+# Window of the per-camera inference rate in get_stats()
+RATE_WINDOW = 10.0
+
+class _CameraSlot:
+    def __init__(self):
+        self.task = None
+        self.future = None
+        self.submitted_at = 0.0
+        self.weight = 1.0
+        self.min_interval = 0.0
+        self.last_start = 0.0
+        self.finish_tag = 0.0 # Virtual time at which this camera's last turn ended
+        self.starts = deque()
+        self.stats = {"submitted": 0, "inferred": 0, "dropped": 0, "wait_ms_total": 0.0, "wait_ms_max": 0.0}
+
+class AIScheduler:
+    """Fair sharing of the inference workers between the AI cameras.
+
+    Every camera has a slot that holds only its latest frame: submit() replaces
+    a frame still waiting (its Future is cancelled and counted as dropped) and
+    returns a Future at once, so camera threads never wait for another camera's
+    inference. Idle workers take the slots in weighted fair order (start-time
+    fair queuing: a camera with weight 2 gets twice the turns of a camera with
+    weight 1 when both always have a frame, and idle cameras do not bank turns).
+    A camera with an fps budget is not served again before 1/budget seconds
+    have passed since its last turn.
+
+    `run(task, worker)` is called on worker thread number `worker` (one per
+    interpreter: 1 for the Coral, a pool on CPU) and its return value becomes
+    the Future's result. If it hangs (a stuck Coral USB driver), restart()
+    abandons the workers and starts new ones; an old worker exits once its
+    run() returns.
+    """
+    def __init__(self, run, workers=1):
+        self.run = run
+        self.workers = max(1, workers)
+        self._cond = threading.Condition()
+        self._slots = {}
+        self._vtime = 0.0
+        self._generation = 0
+        self._threads = {}
+        self._running = {} # worker -> (start, Future) of the run() in progress
+
+    def submit(self, camera_id, task, weight=1.0, fps_budget=0):
+        future = Future()
+        with self._cond:
+            slot = self._slots.get(camera_id)
+            if slot is None:
+                slot = self._slots[camera_id] = _CameraSlot()
+            if slot.future is not None and slot.future.cancel():
+                slot.stats["dropped"] += 1
+            slot.task, slot.future, slot.submitted_at = task, future, time.monotonic()
+            slot.weight = max(weight, 0.1)
+            slot.min_interval = 1.0 / fps_budget if fps_budget and fps_budget > 0 else 0.0
+            slot.stats["submitted"] += 1
+            self._ensure_threads()
+            self._cond.notify()
+        return future
+
+    def set_workers(self, workers):
+        """Resize the worker pool; surplus workers exit after their current run()"""
+        with self._cond:
+            self.workers = max(1, workers)
+            self._ensure_threads()
+            self._cond.notify_all()
+
+    def remove(self, camera_id):
+        """Forget a stopped camera: its waiting frame is cancelled and its stats dropped"""
+        with self._cond:
+            slot = self._slots.pop(camera_id, None)
+            if slot is not None and slot.future is not None:
+                slot.future.cancel()
+
+    def busy_for(self):
+        """Seconds the longest run() in progress has been going, 0 when idle"""
+        with self._cond:
+            starts = [start for start, _ in self._running.values()]
+        return time.monotonic() - min(starts) if starts else 0.0
+
+    def restart(self, result=None):
+        """Abandon the workers (a run() is stuck) and resolve their Futures with `result`"""
+        with self._cond:
+            self._generation += 1
+            self._threads = {}
+            running, self._running = self._running, {}
+            if any(slot.future is not None for slot in self._slots.values()):
+                self._ensure_threads()
+            self._cond.notify_all()
+        for _, future in running.values():
+            self._resolve(future, result)
+
+    def stop(self):
+        with self._cond:
+            self._generation += 1
+            self._threads = {}
+            for slot in self._slots.values():
+                if slot.future is not None:
+                    slot.future.cancel()
+                slot.task = slot.future = None
+            self._cond.notify_all()
+
+    def _ensure_threads(self):
+        for worker in range(self.workers):
+            thread = self._threads.get(worker)
+            if thread is None or not thread.is_alive():
+                thread = threading.Thread(target=self._loop, args=(self._generation, worker), daemon=True,
+                                          name=f"AIScheduler-{worker}")
+                self._threads[worker] = thread
+                thread.start()
+
+    def _next(self, now):
+        """The waiting slot with the earliest virtual start, or the time until a throttled one is due"""
+        best, best_tag, wake = None, None, None
+        for camera_id, slot in self._slots.items():
+            if slot.future is None:
+                continue
+            due = slot.last_start + slot.min_interval
+            if due > now:
+                wake = due - now if wake is None else min(wake, due - now)
+                continue
+            tag = max(slot.finish_tag, self._vtime)
+            if best is None or tag < best_tag:
+                best, best_tag = camera_id, tag
+        return best, best_tag, wake
+
+    def _retired(self, generation, worker):
+        """Abandoned by restart()/stop(), or beyond the pool size after set_workers()"""
+        if generation != self._generation:
+            return True
+        if worker >= self.workers:
+            if self._threads.get(worker) is threading.current_thread():
+                del self._threads[worker]
+            return True
+        return False
+
+    def _loop(self, generation, worker):
+        logger.info(f"AI: Scheduler worker {worker} started")
+        while True:
+            with self._cond:
+                while True:
+                    if self._retired(generation, worker):
+                        return
+                    now = time.monotonic()
+                    camera_id, tag, wake = self._next(now)
+                    if camera_id is not None:
+                        break
+                    self._cond.wait(wake if wake is not None else 0.5)
+                slot = self._slots[camera_id]
+                task, future = slot.task, slot.future
+                slot.task = slot.future = None
+                if not future.set_running_or_notify_cancel():
+                    continue
+                self._vtime = tag
+                slot.finish_tag = tag + 1.0 / slot.weight
+                slot.last_start = now
+                slot.starts.append(now)
+                while now - slot.starts[0] > RATE_WINDOW:
+                    slot.starts.popleft()
+                slot.stats["inferred"] += 1
+                wait_ms = (now - slot.submitted_at) * 1000
+                slot.stats["wait_ms_total"] += wait_ms
+                slot.stats["wait_ms_max"] = max(slot.stats["wait_ms_max"], wait_ms)
+                self._running[worker] = (now, future)
+            try:
+                result = self.run(task, worker)
+            except Exception as e:
+                logger.error(f"AI: Scheduler task error (camera {camera_id}): {e}")
+                result = None
+            with self._cond:
+                if generation != self._generation:
+                    return # Abandoned by restart() while run() was stuck
+                self._running.pop(worker, None)
+            self._resolve(future, result)
+
+    @staticmethod
+    def _resolve(future, result):
+        try:
+            future.set_result(result)
+        except InvalidStateError:
+            pass
+
+    def get_stats(self):
+        now = time.monotonic()
+        cameras = {}
+        with self._cond:
+            for camera_id, slot in self._slots.items():
+                while slot.starts and now - slot.starts[0] > RATE_WINDOW:
+                    slot.starts.popleft()
+                stats = slot.stats
+                cameras[camera_id] = {
+                    "rate_fps": round(len(slot.starts) / RATE_WINDOW, 2),
+                    "avg_wait_ms": round(stats["wait_ms_total"] / stats["inferred"], 1) if stats["inferred"] else 0.0,
+                    "max_wait_ms": round(stats["wait_ms_max"], 1),
+                    "submitted": stats["submitted"],
+                    "inferred": stats["inferred"],
+                    "dropped": stats["dropped"],
+                    "weight": slot.weight,
+                    "fps_budget": round(1.0 / slot.min_interval, 2) if slot.min_interval else 0,
+                    "waiting": slot.future is not None,
+                }
+            return {"workers": self.workers, "busy": len(self._running), "busy_ms": round(self.busy_for() * 1000, 1),
+                    "cameras": cameras}
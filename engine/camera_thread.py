@@ -3,20 +3,33 @@ import threading
 import os
 import logging
 from datetime import datetime
-from collections import deque
 import cv2
 import numpy as np
 
 from utils import mask_url
 from stream_reader import StreamReader
 from motion_detector import MotionDetector
+from mv_motion import MotionVectorAnalyzer
 from recording_manager import RecordingManager
+from precapture_buffer import PrecaptureBuffer
+from clip_extractor import ClipExtractor
 from mask_handler import parse_polygons, apply_masks
 from overlay_handler import draw_overlay
 from ai_detector import AIDetector
+from object_tracker import ObjectTracker
 
 logger = logging.getLogger(__name__)
 
+# Longest the loop blocks waiting for a frame before running its housekeeping
+FRAME_WAIT = 0.5
+# Shorter while motion vectors are analysed, since MV samples arrive without new frames
+FRAME_WAIT_MV = 0.05
+# Continuous segment length when motion clips are cut from it and max_movie_length
+# is unlimited: a clip can only be extracted once its segment is closed
+CLIP_SEGMENT_LENGTH = 300
+# Motion-gated AI (opt_ai_motion_gate): a full-frame inference still runs this often on a still scene
+AI_GATE_REFRESH = 10.0
+
 class CameraThread(threading.Thread):
     def __init__(self, camera_id, config, manager=None, event_callback=None):
         super().__init__(name=f"CameraThread-{camera_id}")
@@ -44,12 +57,14 @@ class CameraThread(threading.Thread):
             primary_transport = self.config.get('rtsp_transport', 'tcp')
             secondary_url = sub_url
 
+        decode_mode = self._global_opt('opt_decode_mode', 'demand')
         self.stream_reader = StreamReader(
             self.camera_id, 
             primary_url, 
             self.config.get('name', str(camera_id)), 
             event_callback=self.event_callback,
-            rtsp_transport=primary_transport
+            rtsp_transport=primary_transport,
+            decode_mode=decode_mode
         )
 
         self.sub_stream_reader = None
@@ -60,11 +75,15 @@ class CameraThread(threading.Thread):
                 secondary_url, 
                 f"{self.config.get('name', str(camera_id))} (Sub)", 
                 event_callback=self.event_callback,
-                rtsp_transport=self.config.get('sub_rtsp_transport', 'tcp')
+                rtsp_transport=self.config.get('sub_rtsp_transport', 'tcp'),
+                decode_mode=decode_mode
             )
         self.motion_detector = MotionDetector(self.camera_id, self.config.get('name', str(camera_id)), self.config)
         self.continuous_recorder = RecordingManager(self.camera_id, self.config.get('name', str(camera_id)), self.config, stream_reader=self.stream_reader)
         self.motion_recorder = RecordingManager(self.camera_id, self.config.get('name', str(camera_id)), self.config, stream_reader=self.stream_reader)
+        self.stream_reader.set_pre_roll(self.motion_recorder.pre_roll_seconds())
+        self.clip_extractor = ClipExtractor(self.camera_id, self.config.get('name', str(camera_id)))
+        self.motion_clip = None  # Open motion interval while clips come from the continuous recording
         self.ai_detector = AIDetector(self.camera_id, self.config)
         
         # Buffered results for UI
@@ -75,9 +94,15 @@ class CameraThread(threading.Thread):
         self.last_external_motion_source = "none"
         self.latest_ai_results = []
         self.last_ai_update_time = 0.0
+        self._ai_future = None  # Inference of the last frame handed to the AI scheduler
+        self._last_ai_full_frame = 0.0
+        self.ai_gate_stats = {"changed": 0, "refresh": 0, "skipped": 0, "tracked": 0}
+        self.tracker = ObjectTracker()  # Used when ai_tracking_enabled
+        self._announced_tracks = set()  # Track ids already sent in a motion_start/motion_on event
         self._sw_recording_started_at = 0.0  # Tracks SW encode start for libx264 startup skip
         self.lock = threading.Lock()
         self.last_motion_on_webhook_time = 0.0  # Track last motion_on webhook to refresh UI badge
+        self.last_frame_request_time = 0.0  # Last JPEG poll from the UI (drives decode demand)
         
         # Shared processing state
         self.pre_buffer_counter = 0
@@ -87,10 +112,11 @@ class CameraThread(threading.Thread):
         self.last_fps_time = time.time()
         self.live_view_counter = 0
         self.last_processed_read_time = 0
+        self.last_frame_seq = 0
         
         self.height = 0
         self.width = 0
-        self.pre_buffer = deque(maxlen=self.config.get('pre_capture', 0) or 1)
+        self.pre_buffer = PrecaptureBuffer()
         self.last_health_report_status = "STARTING"
         self.last_health_check_time = 0.0
         
@@ -98,6 +124,56 @@ class CameraThread(threading.Thread):
         self.privacy_polygons = []
         self.motion_polygons = []
         self._update_masks()
+        self._apply_output_geometry()
+        self.mv_analyzer = None
+        self._configure_mv_analysis()
+        self._update_decode_threading()
+
+    def _apply_output_geometry(self):
+        """Let the primary reader scale, rotate and convert frames in one pass"""
+        self.stream_reader.set_output_geometry(
+            self.config.get('width') or 0,
+            self.config.get('height') or 0,
+            self.config.get('rotation', 0)
+        )
+        # Motion analysis runs on a small luma plane taken straight from the decoder
+        opencv_motion = (
+            self.config.get('detect_engine', 'OpenCV') in ('OpenCV', 'AI')
+            and self.config.get('detect_motion_mode', 'Always') != 'Off'
+        )
+        self.stream_reader.set_motion_height(self.config.get('opt_motion_analysis_height', 180) if opencv_motion else 0)
+
+    def _mv_reader(self):
+        """Motion vectors come from the sub-stream when there is one (cheaper to decode)"""
+        return self.sub_stream_reader or self.stream_reader
+
+    def _configure_mv_analysis(self):
+        """Attach or detach the compressed-domain motion analyzer for the 'Motion Vectors' engine"""
+        enabled = self.config.get('detect_engine', 'OpenCV') == 'Motion Vectors'
+        for reader in (self.stream_reader, self.sub_stream_reader):
+            if reader is not None and (not enabled or reader is not self._mv_reader()):
+                if reader.mv_analyzer is not None:
+                    reader.set_mv_analyzer(None)
+        if not enabled:
+            self.mv_analyzer = None
+            return
+        if self.mv_analyzer is None:
+            self.mv_analyzer = MotionVectorAnalyzer()
+        self.mv_analyzer.set_window(max(1, self.config.get('opt_motion_fps_throttle', 3)))
+        self.mv_analyzer.set_masks(self.privacy_polygons + self.motion_polygons, self.config.get('rotation', 0))
+        reader = self._mv_reader()
+        if reader.mv_analyzer is not self.mv_analyzer:
+            reader.set_mv_analyzer(self.mv_analyzer)
+
+    def _poll_mv_motion(self):
+        """Advance the motion state machine from motion-vector scores, independent of frame conversion"""
+        sample = self.mv_analyzer.consume()
+        if sample is None:
+            return
+        grid = self.mv_analyzer.grid_shape()
+        aspect = (grid[1] / grid[0]) if grid else 16 / 9
+        # Snapshot from the last processed (masked) UI frame: raw reader frames are not privacy-masked
+        self.motion_detector.detect_motion_vectors(sample[0], aspect, self.event_callback, self.save_snapshot)
 
     def _update_masks(self):
         self.privacy_polygons = parse_polygons(self.config.get('privacy_masks'), self.config.get('name'))
@@ -106,6 +182,48 @@ class CameraThread(threading.Thread):
             logger.warning(f"Camera {self.config.get('name')}: Disabling passthrough (Privacy Masks Active)")
             self.config['movie_passthrough'] = False
 
+    def _global_opt(self, key, default):
+        """Read an engine-wide optimization setting synced from the backend"""
+        global_config = getattr(self.manager, 'global_config', None) or {}
+        return global_config.get(key, default)
+
+    def _update_decode_demand(self):
+        """Tell the stream readers how many frames this camera currently needs.
+
+        The primary reader must keep full-rate decoding whenever something consumes
+        its frames (detection, transcoded recording/pre-capture, UI polling). Otherwise
+        the camera is idle and only keyframes are decoded to keep health and snapshots fresh.
+        """
+        mode = self._global_opt('opt_decode_mode', 'demand')
+        target_fps = self.config.get('framerate', 15)
+        ui_active = (time.time() - self.last_frame_request_time) < 15.0
+        detect_engine = self.config.get('detect_engine', 'OpenCV')
+        ai_active = detect_engine == 'AI' and getattr(self.ai_detector, 'enabled', False)
+        # ONVIF Edge needs no frames at all; Motion Vectors only needs decoded (not converted) frames
+        motion_active = (
+            self.config.get('detect_motion_mode', 'Always') != 'Off'
+            and self.config.get('recording_mode', 'Off') != 'Off'
+            and detect_engine not in ('ONVIF Edge', 'Motion Vectors')
+        )
+        transcoding = (
+            (self.config.get('recording_mode', 'Off') != 'Off' and not self.config.get('movie_passthrough', False))
+            or (self.continuous_recorder.is_recording and not self.continuous_recorder.passthrough_active)
+            or (self.motion_recorder.is_recording and not self.motion_recorder.passthrough_active)
+        )
+        needs_frames = ui_active or ai_active or motion_active or transcoding
+        self.stream_reader.set_decode_demand(target_fps=target_fps, idle=not needs_frames, mode=mode)
+        if self.sub_stream_reader:
+            self.sub_stream_reader.set_decode_demand(target_fps=target_fps, idle=not (ui_active or ai_active), mode=mode)
+
+    def _update_decode_threading(self):
+        """Apply decoder thread settings: the per-camera value wins over the global default (0 = auto)"""
+        thread_type = self._global_opt('opt_decode_thread_type', 'auto')
+        threads = self.config.get('decode_threads') or self._global_opt('opt_decode_threads', 0)
+        self.stream_reader.set_decode_threading(threads, thread_type)
+        if self.sub_stream_reader:
+            # Sub-streams are low resolution: automatic sizing is enough
+            self.sub_stream_reader.set_decode_threading(0, thread_type)
+
     def _mask_url(self, text):
         """Compatibility wrapper for mask_url utility"""
         return mask_url(text)
@@ -125,6 +243,13 @@ class CameraThread(threading.Thread):
     def get_health(self):
         return self.stream_reader.get_health()
 
+    def get_recording_queue_stats(self):
+        """Frame queue depth and drops of both recorders"""
+        return {
+            "continuous": self.continuous_recorder.get_queue_stats(),
+            "motion": self.motion_recorder.get_queue_stats()
+        }
+
     def _stream_health_watchdog(self):
         """Detect + recover silently-stalled stream readers.
 
@@ -136,26 +261,34 @@ class CameraThread(threading.Thread):
         catch that here: a connected reader whose last decoded frame is older
         than STALL_SECS is forced to reconnect. Each check also logs a state
         snapshot so a stall vs a reconnect-loop can be told apart from logs.
+
+        An idle reader decoding keyframes only (opt_decode_mode 'demand') gets
+        one frame per GOP, 4 s or more on some cameras: it is measured against
+        its last demuxed packet instead.
         """
         STALL_SECS = 30.0
         now = time.time()
         for tag, r in (("primary", self.stream_reader), ("sub", self.sub_stream_reader)):
             if r is None:
                 continue
-            lrt = getattr(r, 'last_read_time', 0) or 0
+            keyframes_only = getattr(r, 'keyframes_only', False)
+            if keyframes_only:
+                lrt = getattr(r, 'last_packet_time', 0) or 0
+            else:
+                lrt = getattr(r, 'last_read_time', 0) or 0
             ct = getattr(r, 'connection_time', 0) or 0
             age = now - lrt if lrt else -1
             conn_age = now - ct if ct else -1
             if r.connected and lrt and age > 10:
                 logger.warning(
                     f"[STREAM-WD] Cam {self.camera_id} {tag}: health={r.health_status} "
-                    f"connected={r.connected} frame_age={age:.1f}s conn_age={conn_age:.1f}s "
+                    f"connected={r.connected} {'packet_age' if keyframes_only else 'frame_age'}={age:.1f}s conn_age={conn_age:.1f}s "
                     f"fails={getattr(r, 'consecutive_failures', '?')}"
                 )
             if r.connected and lrt and age > STALL_SECS:
                 logger.error(
-                    f"[STREAM-WD] Cam {self.camera_id} {tag}: STALLED {age:.1f}s with no decoded "
-                    f"frame while connected — forcing reconnect"
+                    f"[STREAM-WD] Cam {self.camera_id} {tag}: STALLED {age:.1f}s with no "
+                    f"{'packet' if keyframes_only else 'decoded frame'} while connected — forcing reconnect"
                 )
                 try:
                     r.force_reconnect()
@@ -171,7 +304,6 @@ class CameraThread(threading.Thread):
         
         last_heartbeat_time = 0.0
         while self.running:
-            loop_start_time = time.time()
             try:
                 # Diagnostic heartbeat every 5 seconds
                 if time.time() - last_heartbeat_time > 5.0:
@@ -194,23 +326,24 @@ class CameraThread(threading.Thread):
                         trigger_source = self.last_external_motion_source if motion_active else None
                         self.motion_recorder.start_recording(self.width, self.height, None, self.event_callback, reason="Motion", trigger_source=trigger_source)
 
-                frame, read_time = self.stream_reader.get_latest()
-                if frame is None or read_time == self.last_processed_read_time:
-                    time.sleep(0.01)
+                self._update_decode_demand()
+                self._update_decode_threading()
+                if self.mv_analyzer is not None:
+                    self._poll_mv_motion()
+                # Block until the reader publishes a frame; the timeout keeps the
+                # housekeeping above (watchdog, segment rotation, MV polling) running
+                wait = FRAME_WAIT_MV if self.mv_analyzer is not None else FRAME_WAIT
+                frame, motion_plane, read_time, seq = self.stream_reader.wait_for_frame(self.last_frame_seq, wait)
+                if seq == self.last_frame_seq or frame is None:
+                    continue
+                self.last_frame_seq = seq
+                if not self._frame_due(read_time):
                     continue
                 
                 self.last_processed_read_time = read_time
-                frame = frame.copy()
-                
-                # Pre-processing (Resize/Rotate)
-                target_w, target_h = self.config.get('width'), self.config.get('height')
-                if target_w and target_h and (frame.shape[1] != target_w or frame.shape[0] != target_h):
-                    frame = cv2.resize(frame, (target_w, target_h))
-
-                rotation = self.config.get('rotation', 0)
-                if rotation == 90: frame = cv2.rotate(frame, cv2.ROTATE_90_CLOCKWISE)
-                elif rotation == 180: frame = cv2.rotate(frame, cv2.ROTATE_180)
-                elif rotation == 270: frame = cv2.rotate(frame, cv2.ROTATE_90_COUNTERCLOCKWISE)
+                # The reader hands over a freshly converted array already scaled to
+                # width x height and rotated (see _apply_output_geometry), so it can be
+                # drawn on in place without a defensive copy.
 
                 self.height, self.width = frame.shape[:2]
                 self.live_view_counter += 1
@@ -269,7 +402,24 @@ class CameraThread(threading.Thread):
                         elif sw_recording_skip:
                             raw_ai_results = getattr(self, 'latest_ai_results', [])  # Freeze AI results to keep UI active
                         else:
-                            raw_ai_results = self.ai_detector.detect(ai_detect_frame, camera_id=self.camera_id, config=self.config)
+                            # Results arrive on a later tick: the camera thread never waits for inference
+                            detections = self._collect_ai_results()
+                            if self.config.get('ai_tracking_enabled', False):
+                                # Tracks carry the objects (and their ids) across the frames between inferences
+                                if detections is not None:
+                                    raw_ai_results = self.tracker.update(self._filter_ai_results_by_zones(detections))
+                                else:
+                                    raw_ai_results = self.tracker.predict()
+                            else:
+                                raw_ai_results = detections or []
+                            if self._ai_future is None or not self._ai_future.running():
+                                run_ai, region = self._ai_plan(frame, motion_plane)
+                                if run_ai:
+                                    if region is None:
+                                        self._last_ai_full_frame = time.time()
+                                    # Replaces this camera's frame if it is still waiting for its turn
+                                    self._ai_future = self.ai_detector.submit(ai_detect_frame, camera_id=self.camera_id, config=self.config,
+                                                                              active=self.motion_detector.motion_detected, region=region)
                             
                         # Filter results by motion zones (Exclusion zones)
                         ai_results = self._filter_ai_results_by_zones(raw_ai_results)
@@ -306,10 +456,13 @@ class CameraThread(threading.Thread):
                                         'ai_metadata': ai_results
                                     })
                                 self.last_motion_on_webhook_time = time.time()
+                                self._announced_tracks = set()
+                                self._new_tracks(ai_results)
                             else:
                                 # Motion was already detected: re-send motion_on webhook every 20s
-                                # to keep the live motion badge alive in the UI (LIVE_MOTION TTL is 60s)
-                                if time.time() - self.last_motion_on_webhook_time > 20:
+                                # to keep the live motion badge alive in the UI (LIVE_MOTION TTL is 60s),
+                                # and at once when tracking picks up a new object
+                                if self._new_tracks(ai_results) or time.time() - self.last_motion_on_webhook_time > 20:
                                     if self.event_callback:
                                         self.event_callback(self.camera_id, 'motion_on', {
                                             'source': f'AI Engine [{hw_label}]',
@@ -342,6 +495,7 @@ class CameraThread(threading.Thread):
                     motion_gap = self.config.get('motion_gap', 10)
                     if self.motion_detector.motion_detected and (time.time() - self.motion_detector.last_motion_time > motion_gap):
                         self.motion_detector.motion_detected = False
+                        self._announced_tracks = set()
                         hw_label = f"{self.ai_detector.hardware.upper()} - {self.ai_detector.model_type}"
                         logger.info(f"Camera {self.config.get('name')} (ID: {self.camera_id}): Motion END (AI Engine [{hw_label}])")
                         if self.event_callback:
@@ -356,7 +510,9 @@ class CameraThread(threading.Thread):
                         frame, self.event_callback, self.save_snapshot, 
                         self.privacy_polygons, self.motion_polygons, apply_masks,
                         external_motion_time=self.last_external_motion_time,
-                        source=self.last_external_motion_source
+                        source=self.last_external_motion_source,
+                        motion_plane=motion_plane,
+                        subtractor=self._global_opt('opt_motion_subtractor', 'mog2')
                     )
                     
                     # AI as a filter is no longer supported per user request.
@@ -379,20 +535,28 @@ class CameraThread(threading.Thread):
                     frame, motion_active, self.motion_detector.last_motion_time, 
                     lambda: self.continuous_recorder.stop_recording(self.event_callback, self.width, self.height),
                     trigger_source=trigger_source, ai_results=ai_results, pre_buffer_frames=None,
-                    override_should_record=should_record_cont, override_reason="Continuous"
+                    override_should_record=should_record_cont, override_reason="Continuous", frame_time=read_time
                 )
                 
-                # Motion Recorder
-                should_record_motion = motion_active and mode in ['Always', 'Continuous', 'Motion Triggered']
-                pre_buf = list(self.pre_buffer) if not self.config.get('movie_passthrough', False) else None
-                res = self.motion_recorder.handle_recording(
-                    frame, motion_active, self.motion_detector.last_motion_time, 
-                    lambda: self.motion_recorder.stop_recording(self.event_callback, self.width, self.height),
-                    trigger_source=trigger_source, ai_results=ai_results, pre_buffer_frames=pre_buf,
-                    override_should_record=should_record_motion, override_reason="Motion"
-                )
-                if res == "STARTED":
-                    self.pre_buffer.clear()
+                # Motion Recorder (or motion clips cut from the continuous segments)
+                clips_from_continuous = self._motion_clips_from_continuous(mode)
+                if clips_from_continuous:
+                    self._track_motion_clip(motion_active, ai_results)
+                else:
+                    self._close_motion_clip()
+                    should_record_motion = motion_active and mode in ['Always', 'Continuous', 'Motion Triggered']
+                    pre_buf = None
+                    if should_record_motion and not self.motion_recorder.is_recording and not self.config.get('movie_passthrough', False):
+                        # Compressed pre-roll; the writer thread decodes it frame by frame
+                        pre_buf = self.pre_buffer.drain()
+                    res = self.motion_recorder.handle_recording(
+                        frame, motion_active, self.motion_detector.last_motion_time, 
+                        lambda: self.motion_recorder.stop_recording(self.event_callback, self.width, self.height),
+                        trigger_source=trigger_source, ai_results=ai_results, pre_buffer_frames=pre_buf,
+                        override_should_record=should_record_motion, override_reason="Motion", frame_time=read_time
+                    )
+                    if res == "STARTED":
+                        self.pre_buffer.clear()
                 
                 # Detect transition into a NEW SW recording (even during back-to-back file splits)
                 new_recording_start_cont = getattr(self.continuous_recorder, 'recording_start_time', 0)
@@ -405,9 +569,10 @@ class CameraThread(threading.Thread):
                     self._last_recording_start_mot = new_recording_start_mot
                     logger.info("[RECORD] SW encoding started — pausing TPU invoke() for 20s to allow libx264 startup burst to settle")
                 
-                # Pre-capture buffer (Only if passthrough is disabled, as passthrough doesn't support pre-capture)
-                if not self.config.get('movie_passthrough', False):
-                    self._update_pre_buffer(frame)
+                # Pre-capture buffer (Only if passthrough is disabled, as passthrough doesn't support pre-capture).
+                # Clips cut from the continuous recording take their pre-roll from the segment itself.
+                if not self.config.get('movie_passthrough', False) and not clips_from_continuous:
+                    self._update_pre_buffer(frame, read_time)
                 else:
                     if len(self.pre_buffer) > 0:
                         self.pre_buffer.clear()
@@ -420,7 +585,7 @@ class CameraThread(threading.Thread):
                         with self.stream_reader.lock: self.stream_reader.health_status = "CONNECTED"
                 
                 # Metrics & Health
-                self._update_metrics(loop_start_time)
+                self._update_metrics()
                 self._check_health()
 
             except Exception as e:
@@ -432,7 +597,11 @@ class CameraThread(threading.Thread):
         if self.sub_stream_reader:
             self.sub_stream_reader.stop()
             self.sub_stream_reader.join(timeout=1.0)
+        self.ai_detector.scheduler.remove(self.camera_id)
         self.stop_recording()
+        # Files are closed on the finalizer pool; the camera is reported stopped once they are
+        self.continuous_recorder.wait_finalized()
+        self.motion_recorder.wait_finalized()
         logger.info(f"Camera {self.config.get('name')} (ID: {self.camera_id}): Stopped")
 
     def _update_ui_frame(self, frame, is_raw=False, ai_results=None):
@@ -467,32 +636,34 @@ class CameraThread(threading.Thread):
         except Exception as e:
             logger.error(f"UI Frame error: {e}")
 
-    def _update_pre_buffer(self, frame):
+    def _update_pre_buffer(self, frame, capture_time=None):
         pre_cap_count = self.config.get('pre_capture', 0)
         throttle = max(1, int(self.config.get('opt_pre_capture_fps_throttle', 1)))
         
         effective_maxlen = pre_cap_count // throttle if pre_cap_count > 0 else 0
+        if self.pre_buffer.max_frames != effective_maxlen:
+            self.pre_buffer.set_max_frames(effective_maxlen)
         if effective_maxlen > 0:
-            if self.pre_buffer.maxlen != effective_maxlen:
-                self.pre_buffer = deque(self.pre_buffer, maxlen=effective_maxlen)
-            
             self.pre_buffer_counter += 1
             if self.pre_buffer_counter % throttle == 0:
-                # Store a copy to avoid issues if the original is modified in-place by overlays
-                self.pre_buffer.append(frame.copy())
+                # Compressed right away, so later in-place overlays do not affect it
+                self.pre_buffer.append(frame, capture_time)
 
-    def _update_metrics(self, loop_start_time):
+    def _frame_due(self, read_time):
+        """Cap processing at `framerate` without sleeping (the reader already paces in demand mode)"""
+        target_fps = self.config.get('framerate', 30)
+        if target_fps <= 0:
+            return True
+        # Same jitter tolerance as the reader's pacing
+        return (read_time - self.last_processed_read_time) >= (0.9 / target_fps)
+
+    def _update_metrics(self):
         self.frame_count += 1
         if time.time() - self.last_fps_time >= 1.0:
             self.fps = self.frame_count
             self.frame_count = 0
             self.last_fps_time = time.time()
         
-        target_fps = self.config.get('framerate', 30)
-        if target_fps > 0:
-            elapsed = time.time() - loop_start_time
-            target_time = 1.0 / target_fps
-            if elapsed < target_time: time.sleep(target_time - elapsed)
 
     def _check_health(self):
         if time.time() - self.last_health_check_time > 60.0:
@@ -512,7 +683,53 @@ class CameraThread(threading.Thread):
                     if self.event_callback:
                         self.event_callback(self.camera_id, 'health_status_changed', {"title": title, "message": msg, "new_status": current_health})
 
+    def _motion_clips_from_continuous(self, mode):
+        """Whether motion events are cut from the continuous segments instead of a second encoder"""
+        enabled = bool(self._global_opt('opt_motion_clips_from_continuous', False)) and mode in ['Always', 'Continuous']
+        recorder = self.continuous_recorder
+        if enabled and recorder.segment_listener is None:
+            # Stays attached once set, so segments opened meanwhile are always closed again
+            recorder.segment_listener = self.clip_extractor
+            if recorder.is_recording:
+                self.clip_extractor.segment_started(recorder.recording_filename, recorder.segment_start_time)
+        recorder.default_max_length = CLIP_SEGMENT_LENGTH if enabled else 0
+        # A motion recording already running is finished by the motion recorder
+        return enabled and recorder.is_recording and not self.motion_recorder.is_recording
+
+    def _track_motion_clip(self, motion_active, ai_results):
+        """Open/close the wall-clock interval of a motion event (same rules as the motion recorder)"""
+        now = time.time()
+        clip = self.motion_clip
+        if clip is None:
+            if not motion_active:
+                return
+            clip = self.motion_clip = {"start": now - self.motion_recorder.pre_roll_seconds(), "labels": []}
+        for res in ai_results or ():
+            label = res.get('label')
+            if label and label not in clip["labels"]:
+                clip["labels"].append(label)
+        max_len = self.config.get('max_movie_length', 0)
+        if not motion_active and now - self.motion_detector.last_motion_time > self.config.get('post_capture', 5):
+            self._close_motion_clip(now)
+        elif max_len > 0 and now - clip["start"] > max_len:
+            self._close_motion_clip(now)
+            self.motion_clip = {"start": now, "labels": []}
+
+    def _close_motion_clip(self, end_time=None):
+        clip = self.motion_clip
+        if clip is None:
+            return
+        self.motion_clip = None
+        out_path = self.motion_recorder.output_path("Motion", datetime.fromtimestamp(clip["start"]))
+        self.clip_extractor.add_clip(clip["start"], end_time or time.time(), out_path, {
+            "width": self.width,
+            "height": self.height,
+            "ai_metadata": ",".join(clip["labels"]) or None
+        }, self.event_callback)
+
     def stop_recording(self):
+        # Before the continuous segment closes, so the clip can be cut from it
+        self._close_motion_clip()
         self.continuous_recorder.stop_recording(self.event_callback, self.width, self.height)
         self.motion_recorder.stop_recording(self.event_callback, self.width, self.height)
 
@@ -553,6 +770,8 @@ class CameraThread(threading.Thread):
 
             # Draw Label
             text = f"{label.capitalize()} {int(conf * 100)}%"
+            if 'track_id' in res:
+                text = f"{label.capitalize()} #{res['track_id']} {int(conf * 100)}%"
 
             (tw, th), baseline = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, font_scale, thickness)
 
@@ -586,6 +805,53 @@ class CameraThread(threading.Thread):
         for res in results:
             self._draw_single_box(frame, res)
 
+    def _ai_plan(self, frame, motion_plane):
+        """(run inference, crop region) for this AI tick.
+
+        With tracking (ai_tracking_enabled) and objects tracked, the tracks stand
+        in for the detector until one of them is uncertain or pixels change away
+        from them. Otherwise the motion gate (opt_ai_motion_gate, implied by
+        tracking for empty scenes) runs inference on the region where pixels
+        changed, and on the full frame every AI_GATE_REFRESH seconds for what the
+        pixel gate cannot see (e.g. an object that stopped before AI was enabled).
+        """
+        tracking = self.config.get('ai_tracking_enabled', False)
+        if not tracking and not self._global_opt('opt_ai_motion_gate', False):
+            return True, None
+        changed, region = self.motion_detector.changed_region(
+            frame, self.privacy_polygons, self.motion_polygons, apply_masks,
+            motion_plane=motion_plane, subtractor=self._global_opt('opt_motion_subtractor', 'mog2')
+        )
+        if tracking and len(self.tracker) > 0:
+            if self.tracker.needs_detection() or (changed and not self.tracker.covers(region)):
+                return True, None
+            self.ai_gate_stats["tracked"] += 1
+            return False, None
+        if time.time() - self._last_ai_full_frame >= AI_GATE_REFRESH:
+            self.ai_gate_stats["refresh"] += 1
+            return True, None
+        if changed:
+            self.ai_gate_stats["changed"] += 1
+            return True, region
+        self.ai_gate_stats["skipped"] += 1
+        return False, None
+
+    def _collect_ai_results(self):
+        """Detections of the last submitted frame once its inference is done, else None"""
+        future = self._ai_future
+        if future is None or not future.done():
+            return None
+        self._ai_future = None
+        if future.cancelled():
+            return None
+        return future.result() or []
+
+    def _new_tracks(self, results):
+        """Track ids in `results` not announced in an event yet (marked as announced)"""
+        new = {r['track_id'] for r in results if 'track_id' in r} - self._announced_tracks
+        self._announced_tracks |= new
+        return new
+
     def _filter_ai_results_by_zones(self, results):
         """
         Filters AI results based on motion zones (exclusion polygons).
@@ -655,18 +921,21 @@ class CameraThread(threading.Thread):
                         secondary_url, 
                         f"{self.config.get('name', str(self.camera_id))} (Sub)", 
                         event_callback=self.event_callback,
-                        rtsp_transport=self.config.get('sub_rtsp_transport', 'tcp')
+                        rtsp_transport=self.config.get('sub_rtsp_transport', 'tcp'),
+                        decode_mode=self._global_opt('opt_decode_mode', 'demand')
                     )
                     self.sub_stream_reader.start()
             else:
                 if self.sub_stream_reader:
                     self.sub_stream_reader.stop()
                     self.sub_stream_reader = None
+            self._configure_mv_analysis()
 
     def update_config(self, new_config):
         old_passthrough = self.config.get('movie_passthrough', False)
         old_masks = (self.config.get('privacy_masks', '[]'), self.config.get('motion_masks', '[]'))
         old_engine = self.config.get('detect_engine', 'OpenCV')
+        old_tracking = self.config.get('ai_tracking_enabled', False)
         old_rtsp_url = self.config.get('rtsp_url')
         old_sub_rtsp_url = self.config.get('sub_rtsp_url')
 
@@ -675,8 +944,11 @@ class CameraThread(threading.Thread):
         self.continuous_recorder.config = self.config
         self.motion_recorder.config = self.config
         self.ai_detector.config = self.config
+        self.stream_reader.set_pre_roll(self.motion_recorder.pre_roll_seconds())
 
         new_engine = self.config.get('detect_engine', 'OpenCV')
+        if old_engine != new_engine or old_tracking != self.config.get('ai_tracking_enabled', False):
+            self.tracker.reset()
         if old_engine != new_engine:
             if self.motion_detector.motion_detected:
                 logger.info(f"Camera {self.config.get('name')} (ID: {self.camera_id}): Engine changed {old_engine}->{new_engine}, resetting motion state")
@@ -686,6 +958,8 @@ class CameraThread(threading.Thread):
 
         if old_masks != (self.config.get('privacy_masks', '[]'), self.config.get('motion_masks', '[]')):
             self._update_masks()
+        self._apply_output_geometry()
+        self._configure_mv_analysis()
 
 
         if 'movie_passthrough' in new_config and old_passthrough != new_config['movie_passthrough']:
@@ -700,9 +974,6 @@ class CameraThread(threading.Thread):
 
         self._reconfigure_routing(old_passthrough, old_rtsp_url, old_sub_rtsp_url)
 
-        pre_cap = self.config.get('pre_capture', 0)
-        if pre_cap > 0 and self.pre_buffer.maxlen != pre_cap:
-            self.pre_buffer = deque(self.pre_buffer, maxlen=pre_cap)
         logger.info(f"Camera {self.config.get('name')} (ID: {self.camera_id}): Config updated")
 
     def stop(self):
@@ -710,12 +981,14 @@ class CameraThread(threading.Thread):
         self.join(timeout=2.0)
 
     def get_frame_bytes(self):
+        self.last_frame_request_time = time.time()
         with self.lock:
             if self.latest_frame_jpeg is None or time.time() - self.last_frame_update_time > 10:
                 return None
             return self.latest_frame_jpeg
 
     def get_raw_frame_bytes(self):
+        self.last_frame_request_time = time.time()
         with self.lock: return self.latest_raw_frame_jpeg
 
     def save_snapshot(self, frame=None, is_temp=False, reason=None):
@@ -0,0 +1,218 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+
+import av
+
+from shared_packet import add_stream_like
+from recording_metadata import thumbnail_from_file, write_thumbnail, probe_recording
+
+logger = logging.getLogger(__name__)
+
+# Clips shorter than this are discarded, like short recordings
+MIN_CLIP_SECONDS = 2.0
+# Finished segments kept for clip lookups (older ones are forgotten, not deleted)
+MAX_SEGMENTS = 32
+
+def remux_clip(sources, out_path):
+    """Stream-copy pieces of recordings into one MP4 without decoding.
+
+    `sources` is a list of (path, start_offset, end_offset) in seconds from the
+    start of each file, oldest first. Each piece starts at the keyframe at or
+    before its start offset, so a clip can begin up to one GOP early. Returns
+    the clip duration in seconds (0.0 if nothing was written) and its size.
+    """
+    out = None
+    out_vid = out_aud = None
+    codec = None
+    cursor = 0.0  # Output time at which the next piece starts
+    last_dts = {}
+    size = None
+    try:
+        for path, start, end in sources:
+            with av.open(path) as inp:
+                if not inp.streams.video:
+                    continue
+                in_vid = inp.streams.video[0]
+                in_aud = inp.streams.audio[0] if inp.streams.audio else None
+                if out is None:
+                    out = av.open(out_path, mode='w', format='mp4', options={'movflags': '+faststart'})
+                    out_vid = add_stream_like(out, in_vid)
+                    if in_aud is not None:
+                        out_aud = add_stream_like(out, in_aud)
+                    size = (in_vid.codec_context.width, in_vid.codec_context.height)
+                    codec = in_vid.codec_context.name
+                elif in_vid.codec_context.name != codec:
+                    logger.warning(f"Clip {out_path}: {path} uses another codec, clip truncated")
+                    break
+                if start > 0:
+                    inp.seek(int(start / in_vid.time_base), stream=in_vid, backward=True, any_frame=False)
+
+                streams = [in_vid] + ([in_aud] if in_aud is not None and out_aud is not None else [])
+                ref = None  # Source time (s) mapped to `cursor`
+                piece_end = 0.0
+                for packet in inp.demux(streams):
+                    if packet.dts is None:
+                        continue
+                    is_video = packet.stream is in_vid
+                    t = float(packet.pts * packet.time_base) if packet.pts is not None else float(packet.dts * packet.time_base)
+                    if ref is None:
+                        if not (is_video and packet.is_keyframe):
+                            continue
+                        ref = float(packet.dts * packet.time_base)
+                    if is_video and t >= end:
+                        break
+                    out_stream = out_vid if is_video else out_aud
+                    shift = int(round((cursor - ref) / packet.time_base))
+                    packet.dts += shift
+                    if packet.pts is not None:
+                        packet.pts += shift
+                    prev = last_dts.get(is_video)
+                    if prev is not None and packet.dts <= prev:
+                        packet.dts = prev + 1
+                    if packet.pts is not None and packet.pts < packet.dts:
+                        packet.pts = packet.dts
+                    last_dts[is_video] = packet.dts
+                    if is_video:
+                        duration = float((packet.duration or 0) * packet.time_base)
+                        piece_end = max(piece_end, t - ref + duration)
+                    packet.stream = out_stream
+                    out.mux(packet)
+                cursor += piece_end
+    finally:
+        if out is not None:
+            out.close()
+    return cursor, size
+
+class ClipExtractor:
+    """Motion clips cut from the continuous recording instead of a second encoder.
+
+    The continuous RecordingManager reports each segment (file and wall-clock
+    start/end) through segment_started()/segment_finished(). A motion event is
+    queued with add_clip() as a wall-clock interval; once every segment it
+    overlaps is closed, a worker thread remuxes the covered packets into a
+    standalone MP4 and emits the usual 'recording_end' event, so the backend
+    creates the same Event row a motion recording would.
+
+    Offsets are derived from the segment's wall-clock start, so a clip is
+    accurate to about one GOP plus the encoder's start-up delay.
+    """
+    def __init__(self, camera_id, camera_name):
+        self.camera_id = camera_id
+        self.camera_name = camera_name
+        self._segments = deque(maxlen=MAX_SEGMENTS)  # [path, start, end or None]
+        self._clips = deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self.stats = {"clips": 0, "discarded": 0, "failed": 0}
+
+    def segment_started(self, path, start_time):
+        with self._lock:
+            self._segments.append([path, start_time, None])
+
+    def segment_finished(self, path, end_time, valid=True):
+        with self._lock:
+            for segment in self._segments:
+                if segment[0] == path and segment[2] is None:
+                    if valid:
+                        segment[2] = end_time
+                    else:
+                        self._segments.remove(segment)
+                    break
+        self._wake.set()
+
+    def add_clip(self, start_time, end_time, out_path, payload=None, event_callback=None):
+        """Queue the wall-clock interval [start_time, end_time] for extraction to `out_path`"""
+        with self._lock:
+            self._clips.append((start_time, end_time, out_path, payload or {}, event_callback))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=f"ClipExtractor-{self.camera_id}", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def pending(self):
+        with self._lock:
+            return len(self._clips)
+
+    def _sources(self, start_time, end_time):
+        """(path, start_offset, end_offset) pieces for an interval, or None while a segment is still open"""
+        sources = []
+        for path, seg_start, seg_end in self._segments:
+            if seg_start >= end_time:
+                continue
+            if seg_end is None:
+                return None
+            if seg_end <= start_time:
+                continue
+            sources.append((path, max(0.0, start_time - seg_start), min(end_time, seg_end) - seg_start))
+        return sources
+
+    def _next_ready(self):
+        with self._lock:
+            if not self._clips:
+                return None, None
+            clip = self._clips[0]
+            sources = self._sources(clip[0], clip[1])
+            if sources is None:
+                return None, None
+            self._clips.popleft()
+            return clip, sources
+
+    def _run(self):
+        while True:
+            self._wake.wait(timeout=5.0)
+            self._wake.clear()
+            while True:
+                clip, sources = self._next_ready()
+                if clip is None:
+                    break
+                self._extract(clip, sources)
+            with self._lock:
+                if not self._clips:
+                    self._thread = None
+                    return
+
+    def _extract(self, clip, sources):
+        start_time, end_time, out_path, payload, event_callback = clip
+        if not sources:
+            logger.warning(f"Camera {self.camera_name} (ID: {self.camera_id}): No continuous segment covers motion clip {out_path}, skipped")
+            self.stats["discarded"] += 1
+            return
+        started = time.time()
+        try:
+            os.makedirs(os.path.dirname(out_path), exist_ok=True)
+            duration, size = remux_clip(sources, out_path)
+        except Exception as e:
+            logger.error(f"Camera {self.camera_name} (ID: {self.camera_id}): Motion clip extraction failed: {e}")
+            self.stats["failed"] += 1
+            duration, size = 0.0, None
+        if duration < MIN_CLIP_SECONDS:
+            if os.path.exists(out_path):
+                os.remove(out_path)
+            logger.info(f"Camera {self.camera_name} (ID: {self.camera_id}): Discarded short motion clip ({duration:.1f}s)")
+            self.stats["discarded"] += 1
+            return
+        self.stats["clips"] += 1
+        logger.info(f"[RECORDING] Camera {self.camera_name} (ID: {self.camera_id}): Motion clip {out_path} ({duration:.1f}s from {len(sources)} segment(s)) remuxed in {time.time() - started:.2f}s")
+        if event_callback:
+            width, height = size
+            try:
+                meta = probe_recording(out_path)
+                meta["thumbnail_path"] = write_thumbnail(thumbnail_from_file(out_path), out_path)
+            except Exception as e:
+                logger.warning(f"Camera {self.camera_name} (ID: {self.camera_id}): Could not read clip metadata: {e}")
+                meta = {}
+            event_callback(self.camera_id, 'recording_end', {
+                "file_path": out_path,
+                "width": payload.get("width") or width,
+                "height": payload.get("height") or height,
+                "ai_metadata": payload.get("ai_metadata"),
+                "reason": "Motion",
+                "method": "remux",
+                # Emitted once the covering segment closes, possibly minutes later: the event starts here
+                "start_time": start_time,
+                **meta
+            })
@@ -155,6 +155,13 @@ class CameraManager:
                     data["reason"] = payload.get("reason", "unknown")
                     if "ai_metadata" in payload:
                         data["ai_metadata"] = payload["ai_metadata"]
+                    # Probed by the engine, so the backend skips ffprobe/ffmpeg for the event
+                    for key in ("duration", "thumbnail_path", "codec", "keyframes", "file_size"):
+                        if payload.get(key) is not None:
+                            data[key] = payload[key]
+                    if payload.get("start_time") is not None:
+                        # Wall-clock start of a recording reported late (motion clips cut from continuous segments)
+                        data["start_time"] = datetime.fromtimestamp(payload["start_time"]).astimezone().isoformat()
                 else:
                     data["file_path"] = payload # legacy string payload
 
@@ -225,6 +232,11 @@ class CameraManager:
                 "motion": thread.motion_detected,
                 "recording": thread.is_recording,
                 "last_frame_bytes": len(thread.latest_frame_jpeg) if thread.latest_frame_jpeg else 0,
+                "decode": thread.stream_reader.get_decode_stats(),
+                "packet_buffer": thread.stream_reader.get_buffer_stats(),
+                "ws_clients": thread.stream_reader.get_ws_stats(),
+                "recording_queue": thread.get_recording_queue_stats(),
+                "ai_gate": thread.ai_gate_stats,
                 "config": mask_config(thread.config)
             }
             status[cid] = cam_status
@@ -0,0 +1,60 @@
+import cv2
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_ROTATIONS = {
+    90: cv2.ROTATE_90_CLOCKWISE,
+    180: cv2.ROTATE_180,
+    270: cv2.ROTATE_90_COUNTERCLOCKWISE,
+}
+
+def rotate(img, rotation):
+    """Rotate an image by a multiple of 90 degrees (no-op for 0 or unknown values)"""
+    code = _ROTATIONS.get(rotation)
+    return cv2.rotate(img, code) if code is not None else img
+
+def convert_frame(frame, width=0, height=0, rotation=0, fmt='bgr24'):
+    """Turn a decoded av.VideoFrame into a ready-to-use numpy array.
+
+    Scaling and colour conversion are fused into a single swscale pass
+    (one read of the YUV planes, one allocation) instead of a full-resolution
+    BGR conversion followed by cv2.resize. Rotation is applied on the already
+    scaled image, so it never touches more pixels than the output size.
+    """
+    if width and height and (frame.width != width or frame.height != height):
+        out = frame.reformat(width=width, height=height, format=fmt)
+    else:
+        out = frame.reformat(format=fmt)
+    return rotate(out.to_ndarray(), rotation)
+
+def luma_plane(frame):
+    """Zero-copy view of the Y plane of a planar YUV frame, or None for other formats"""
+    if not (frame.format.name.startswith('yuv') or frame.format.name in ('nv12', 'nv21')):
+        return None
+    plane = frame.planes[0]
+    return np.frombuffer(plane, np.uint8).reshape(plane.height, plane.line_size)[:, :plane.width]
+
+def motion_plane(frame, height, width=0, out_height=0, rotation=0):
+    """Small single-channel luma image for motion analysis.
+
+    Sampled straight from the decoder's Y plane at `height` rows, keeping the
+    aspect ratio of the display image (width x out_height after rotation) so
+    normalized mask polygons line up. No colour conversion is involved.
+    """
+    src_w = width or frame.width
+    src_h = out_height or frame.height
+    if rotation in (90, 270):
+        # Aspect of the rotated display image; scale before rotating
+        plane_w = height
+        plane_h = max(1, int(src_h * height / src_w))
+    else:
+        plane_w = max(1, int(src_w * height / src_h))
+        plane_h = height
+    y = luma_plane(frame)
+    if y is not None:
+        out = cv2.resize(y, (plane_w, plane_h), interpolation=cv2.INTER_NEAREST)
+    else:
+        out = frame.reformat(width=plane_w, height=plane_h, format='gray', interpolation='FAST_BILINEAR').to_ndarray()
+    return rotate(out, rotation)
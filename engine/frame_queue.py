@@ -0,0 +1,133 @@
+import queue
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+# Overload policies of a recording frame queue (opt_recording_overload)
+OVERLOAD_POLICIES = ("drop", "reduce_fps", "passthrough")
+# Frames dropped continuously for this long count as an overload, not a hiccup
+OVERLOAD_SECONDS = 2.0
+# Largest decimation of the reduce_fps policy (every 4th frame)
+MAX_STRIDE = 4
+
+def frame_nbytes(frame):
+    """Memory held by a queued frame: a numpy array or a compressed pre-capture frame"""
+    if isinstance(frame, np.ndarray):
+        return frame.nbytes
+    try:
+        return len(frame)
+    except TypeError:
+        return 0
+
+class FrameQueue:
+    """Queue of (capture_time, frame) items for a recording writer, bounded by bytes.
+
+    A count limit alone does not bound memory: 1500 raw 4K frames are ~36 GB.
+    When an item would exceed `max_bytes`, put_nowait() drops it (queue.Full),
+    whatever the policy. With the 'reduce_fps' policy the queue also keeps only
+    every 2nd (over half full) or 4th (over 3/4) frame before it is full, and
+    returns to the full rate below a quarter. The writers timestamp frames with
+    the capture time, so the recorded timeline does not change. 'passthrough' is
+    acted on by RecordingManager once `overloaded` is set.
+
+    None (the writer's stop sentinel) is always accepted. `stats` may be a dict
+    shared with the owner, so counters survive the queue of one recording.
+    """
+    def __init__(self, max_bytes, policy="drop", stats=None):
+        self.max_bytes = max_bytes
+        self.policy = policy if policy in OVERLOAD_POLICIES else "drop"
+        self.stats = stats if stats is not None else {}
+        for key in ("queued", "dropped", "decimated", "overloads"):
+            self.stats.setdefault(key, 0)
+        self._items = deque()
+        self._bytes = 0
+        self._cond = threading.Condition()
+        self.stride = 1
+        self._seq = 0
+        self.full_since = None # First drop of the current overload
+
+    def qsize(self):
+        with self._cond:
+            return len(self._items)
+
+    def empty(self):
+        return self.qsize() == 0
+
+    @property
+    def nbytes(self):
+        return self._bytes
+
+    @property
+    def overloaded(self):
+        """True once frames have been dropped for OVERLOAD_SECONDS without the writer catching up"""
+        since = self.full_since
+        return since is not None and time.monotonic() - since >= OVERLOAD_SECONDS
+
+    def put_nowait(self, item):
+        with self._cond:
+            if item is None:
+                self._items.append((None, 0))
+                self._cond.notify()
+                return
+            size = frame_nbytes(item[1])
+            if self.policy == "reduce_fps" and not self._admit():
+                self.stats["decimated"] += 1
+                return
+            if self._items and self._bytes + size > self.max_bytes:
+                self.stats["dropped"] += 1
+                if self.full_since is None:
+                    self.full_since = time.monotonic()
+                    self.stats["overloads"] += 1
+                raise queue.Full
+            self._items.append((item, size))
+            self._bytes += size
+            self.stats["queued"] += 1
+            self._cond.notify()
+
+    def _admit(self):
+        fill = self._bytes / self.max_bytes if self.max_bytes else 0.0
+        if fill >= 0.75:
+            self.stride = MAX_STRIDE
+        elif fill >= 0.5:
+            self.stride = max(self.stride, 2)
+        elif fill < 0.25:
+            self.stride = 1
+        self._seq += 1
+        return self._seq % self.stride == 0
+
+    def get(self, timeout=None):
+        with self._cond:
+            if not self._items and not self._cond.wait_for(lambda: self._items, timeout):
+                raise queue.Empty
+            item, size = self._items.popleft()
+            self._bytes -= size
+            if self.full_since is not None and self._bytes <= self.max_bytes / 2:
+                self.full_since = None
+            return item
+
+    def clear(self):
+        """Discard the queued frames (not a queued stop sentinel); returns how many were dropped"""
+        with self._cond:
+            stop = any(item is None for item, _ in self._items)
+            dropped = len(self._items) - stop
+            self._items.clear()
+            self._bytes = 0
+            self.full_since = None
+            if stop:
+                self._items.append((None, 0))
+            self.stats["dropped"] += dropped
+            return dropped
+
+    def get_stats(self):
+        with self._cond:
+            return {
+                "depth": len(self._items),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "policy": self.policy,
+                "stride": self.stride,
+                "overloaded": self.overloaded,
+                **self.stats
+            }
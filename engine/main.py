@@ -8,6 +8,7 @@ import psutil
 import os
 import time
 from utils import mask_url
+from ws_delivery import WSClient
 
 # 1. IMMEDIATE LOGGING CONFIGURATION
 def setup_initial_logging():
@@ -108,7 +109,18 @@ GLOBAL_CONFIG = {
     "opt_verbose_engine_logs": False,
     "ai_enabled": False,
     "ai_model": "mobilenet_ssd_v2",
-    "ai_hardware": "auto"
+    "ai_hardware": "auto",
+    "opt_decode_mode": "demand",
+    "opt_motion_subtractor": "mog2",
+    "opt_decode_threads": 0,
+    "opt_decode_thread_type": "auto",
+    "opt_motion_clips_from_continuous": False,
+    "opt_recording_encoder": "ffmpeg",
+    "opt_recording_queue_mb": 256,
+    "opt_recording_overload": "drop",
+    "opt_ai_cpu_interpreters": 0,
+    "opt_ai_fps_budget": 5,
+    "opt_ai_motion_gate": False
 }
 
 def set_engine_log_level(verbose: bool):
@@ -203,6 +215,7 @@ class CameraConfig(BaseModel):
     detect_motion_mode: str = "Always"
     detect_engine: str = "OpenCV"
     rtsp_transport: str = "tcp"
+    decode_threads: int = 0  # 0 = use opt_decode_threads
     sub_rtsp_url: Optional[str] = None
     sub_rtsp_transport: str = "tcp"
     live_view_mode: str = "auto"
@@ -247,6 +260,7 @@ def update_config(config: dict):
     ai_enabled_changed = "ai_enabled" in config and config["ai_enabled"] != GLOBAL_CONFIG.get("ai_enabled")
     ai_model_changed = "ai_model" in config and config["ai_model"] != GLOBAL_CONFIG.get("ai_model")
     ai_hardware_changed = "ai_hardware" in config and config["ai_hardware"] != GLOBAL_CONFIG.get("ai_hardware")
+    ai_pool_changed = "opt_ai_cpu_interpreters" in config and config["opt_ai_cpu_interpreters"] != GLOBAL_CONFIG.get("opt_ai_cpu_interpreters")
     
     # 1. Update all dictionary values first
     for key, value in config.items():
@@ -275,6 +289,8 @@ def update_config(config: dict):
             ai.update_model(GLOBAL_CONFIG["ai_model"])
         if ai_hardware_changed and hasattr(ai, 'update_hardware'):
             ai.update_hardware(GLOBAL_CONFIG["ai_hardware"])
+        if ai_pool_changed and hasattr(ai, 'update_cpu_interpreters'):
+            ai.update_cpu_interpreters(GLOBAL_CONFIG["opt_ai_cpu_interpreters"])
                 
     return {"status": "success", "config": GLOBAL_CONFIG}
 
@@ -316,7 +332,9 @@ def get_stats():
             "model_type": ai.model_type,
             "last_inference_time": getattr(ai, "last_inference_time", 0),
             "inference_count": getattr(ai, "inference_count", 0),
-            "last_inference_attempt": getattr(ai, "last_inference_attempt", 0)
+            "last_inference_attempt": getattr(ai, "last_inference_attempt", 0),
+            # Per camera: inference rate, queue wait and frames replaced by newer ones
+            "scheduler": ai.scheduler.get_stats()
         }
     }
 
@@ -549,16 +567,16 @@ async def camera_ws_endpoint(websocket: WebSocket, camera_id: int):
         await websocket.close()
         return
 
-    # Buffer 120 packets (approx. 8 seconds at 15fps) before dropping
-    q = asyncio.Queue(maxsize=120)
+    # Up to 120 packets queued; a viewer that falls behind skips to the next keyframe
+    client = WSClient(maxsize=120)
     loop = asyncio.get_running_loop()
-    # Need to pass queue and loop to thread-safe set
-    cam_thread.stream_reader.add_ws_client(q, loop)
+    # Need to pass client and loop to thread-safe set
+    cam_thread.stream_reader.add_ws_client(client, loop)
     logger.info(f"WS client attached to camera {camera_id} stream.")
 
     try:
         while True:
-            packet_bytes = await q.get()
+            packet_bytes = await client.get()
             await websocket.send_bytes(packet_bytes)
     except WebSocketDisconnect:
         logger.info(f"WS client disconnected from camera {camera_id} stream.")
@@ -566,7 +584,11 @@ async def camera_ws_endpoint(websocket: WebSocket, camera_id: int):
         if "close" not in str(type(e)).lower():
             logger.error(f"WS connection error for camera {camera_id}: {e}")
     finally:
-        cam_thread.stream_reader.remove_ws_client(q)
+        cam_thread.stream_reader.remove_ws_client(client)
+        stats = client.get_stats()
+        if stats["resyncs"]:
+            logger.info(f"WS client of camera {camera_id}: {stats['sent']} packets sent, {stats['dropped']} dropped, "
+                        f"{stats['resyncs']} keyframe resyncs, max lag {stats['lag_max_ms']} ms")
 
 @app.get("/cameras/{camera_id}/frame")
 def get_single_frame(camera_id: int, raw: bool = False):
@@ -5,12 +5,42 @@ import time
 
 logger = logging.getLogger(__name__)
 
+class RunningAverageSubtractor:
+    """Lightweight background model: exponential running average + absolute difference.
+
+    Far cheaper than MOG2 on a single-channel plane (a handful of vector ops per
+    frame) at the cost of adapting less gracefully to multi-modal backgrounds such
+    as swaying trees. apply() returns a 0/255 mask like cv2's subtractors.
+    """
+    def __init__(self, alpha=0.02, diff_threshold=25):
+        self.alpha = alpha
+        self.diff_threshold = diff_threshold
+        self.background = None
+
+    def apply(self, img):
+        if img.ndim == 3:
+            img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        if self.background is None or self.background.shape != img.shape:
+            self.background = img.astype(np.float32)
+            return np.zeros(img.shape, dtype=np.uint8)
+        diff = cv2.absdiff(img, cv2.convertScaleAbs(self.background))
+        cv2.accumulateWeighted(img, self.background, self.alpha)
+        _, mask = cv2.threshold(diff, self.diff_threshold, 255, cv2.THRESH_BINARY)
+        return mask
+
+def create_subtractor(kind):
+    if kind == 'running_average':
+        return RunningAverageSubtractor()
+    return cv2.createBackgroundSubtractorMOG2(history=200, varThreshold=25, detectShadows=False)
+
 class MotionDetector:
     def __init__(self, camera_id, camera_name, config):
         self.camera_id = camera_id
         self.camera_name = camera_name
         self.config = config
         self.fgbg = None
+        self.fgbg_channels = None
+        self.fgbg_kind = None
         self.motion_detected = False
         self.last_motion_time = 0.0
         self.consecutive_motion_frames = 0
@@ -18,7 +48,7 @@ class MotionDetector:
         self.motion_frame_counter = 0
         self.last_trigger_source = None
 
-    def detect(self, frame, event_callback, save_snapshot_cb, privacy_polygons, motion_polygons, apply_masks_fn, external_motion_time=0, source="external"):
+    def detect(self, frame, event_callback, save_snapshot_cb, privacy_polygons, motion_polygons, apply_masks_fn, external_motion_time=0, source="external", motion_plane=None, subtractor="mog2"):
         detect_mode = self.config.get('detect_motion_mode', 'Always')
         recording_mode = self.config.get('recording_mode', 'Motion Triggered')
         detect_engine = self.config.get('detect_engine', 'OpenCV')
@@ -53,9 +83,13 @@ class MotionDetector:
         if detect_engine == 'ONVIF Edge':
             return self._handle_onvif_edge(ext_motion_active, source, frame, event_callback, save_snapshot_cb)
 
+        # Motion Vectors: state is advanced by detect_motion_vectors() as scores arrive
+        if detect_engine == 'Motion Vectors':
+            return self.motion_detected
+
         # OpenCV or AI Fallback
         if detect_engine.startswith('OpenCV'):
-            return self._handle_opencv_detection(frame, event_callback, save_snapshot_cb, privacy_polygons, motion_polygons, apply_masks_fn)
+            return self._handle_opencv_detection(frame, event_callback, save_snapshot_cb, privacy_polygons, motion_polygons, apply_masks_fn, motion_plane, subtractor)
 
         return self.motion_detected
 
@@ -85,23 +119,53 @@ class MotionDetector:
                     event_callback(self.camera_id, 'motion_end')
         return self.motion_detected
 
-    def _handle_opencv_detection(self, frame, event_callback, save_snapshot_cb, privacy_polygons, motion_polygons, apply_masks_fn):
+    def _handle_opencv_detection(self, frame, event_callback, save_snapshot_cb, privacy_polygons, motion_polygons, apply_masks_fn, motion_plane=None, subtractor="mog2"):
         motion_throttle = self.config.get('opt_motion_fps_throttle', 3)
 
         if self.motion_frame_counter % motion_throttle != 0:
             return self.motion_detected
 
+        fgmask = self._foreground_mask(frame, privacy_polygons, motion_polygons, apply_masks_fn, motion_plane, subtractor)
+        motion_ratio = (np.count_nonzero(fgmask) / fgmask.size) * 100
+        threshold_percent = self._threshold_percent(fgmask.shape[0] * fgmask.shape[1])
+        return self._update_state(motion_ratio, threshold_percent, frame, event_callback, save_snapshot_cb, "OpenCV", "Standard")
+
+    def changed_region(self, frame, privacy_polygons, motion_polygons, apply_masks_fn, motion_plane=None, subtractor="mog2"):
+        """Pixel-change gate of the AI engine: (changed, region).
+
+        Runs the background model of OpenCV detection with the camera's
+        threshold, but leaves the motion state alone (the AI results drive it).
+        `region` bounds the changed pixels as normalized (xmin, ymin, xmax, ymax).
+        """
+        fgmask = self._foreground_mask(frame, privacy_polygons, motion_polygons, apply_masks_fn, motion_plane, subtractor)
+        changed = np.count_nonzero(fgmask)
+        if not changed or (changed / fgmask.size) * 100 <= self._threshold_percent(fgmask.size):
+            return False, None
+        x, y, w, h = cv2.boundingRect(fgmask)
+        mask_h, mask_w = fgmask.shape[:2]
+        return True, (x / mask_w, y / mask_h, (x + w) / mask_w, (y + h) / mask_h)
+
+    def _foreground_mask(self, frame, privacy_polygons, motion_polygons, apply_masks_fn, motion_plane=None, subtractor="mog2"):
+        """Binary mask of the changed pixels at the motion analysis size (masked areas excluded)"""
         motion_h = self.config.get('opt_motion_analysis_height', 180)
-        scale = motion_h / frame.shape[0]
-        motion_w = int(frame.shape[1] * scale)
-        small_frame = cv2.resize(frame, (motion_w, motion_h), interpolation=cv2.INTER_NEAREST)
+        if motion_plane is not None and motion_plane.shape[0] == motion_h:
+            # Luma plane already produced by the decoder at analysis size (owned by us, safe to mask in place)
+            small_frame = motion_plane
+        else:
+            scale = motion_h / frame.shape[0]
+            motion_w = int(frame.shape[1] * scale)
+            small_frame = cv2.resize(frame, (motion_w, motion_h), interpolation=cv2.INTER_NEAREST)
 
         apply_masks_fn(small_frame, privacy_polygons, alpha=1.0, color=(0, 0, 0))
         apply_masks_fn(small_frame, motion_polygons, alpha=1.0, color=(0, 0, 0))
 
-        if self.fgbg is None:
-            self.fgbg = cv2.createBackgroundSubtractorMOG2(history=200, varThreshold=25, detectShadows=False)
-            logger.info(f"Camera {self.camera_name}: MOG2 background subtractor initialized")
+        channels = small_frame.shape[2] if small_frame.ndim == 3 else 1
+        if self.fgbg is None or self.fgbg_channels != channels or self.fgbg_kind != subtractor:
+            # Background models are tied to the input layout; rebuild when switching gray <-> BGR
+            self.fgbg = create_subtractor(subtractor)
+            self.fgbg_channels = channels
+            self.fgbg_kind = subtractor
+            logger.info(f"Camera {self.camera_name}: {subtractor} background subtractor initialized ({channels}ch)")
 
         fgmask = self.fgbg.apply(small_frame)
         _, fgmask = cv2.threshold(fgmask, 200, 255, cv2.THRESH_BINARY)
@@ -110,14 +174,31 @@ class MotionDetector:
             kernel = np.ones((3,3), np.uint8)
             fgmask = cv2.erode(fgmask, kernel, iterations=1)
             fgmask = cv2.dilate(fgmask, kernel, iterations=1)
+        return fgmask
 
-        motion_ratio = (np.count_nonzero(fgmask) / fgmask.size) * 100
-        threshold_percent = self.config.get('threshold_percent', 1.0)
+    def detect_motion_vectors(self, motion_ratio, grid_aspect, event_callback, save_snapshot_cb, frame=None):
+        """Feed one motion-vector score (percent of unmasked macroblocks moving).
 
-        if 'threshold' in self.config:
+        Driven by the motion-vector analyzer rather than by decoded frames, so the
+        state machine keeps running while the reader skips pixel conversion.
+        """
+        if self.config.get('detect_motion_mode', 'Always') == 'Off' or self.config.get('recording_mode', 'Motion Triggered') == 'Off':
+            return self.motion_detected
+        # 'threshold' is expressed in pixels of the motion analysis image; keep the same meaning here
+        motion_h = self.config.get('opt_motion_analysis_height', 180)
+        area = motion_h * motion_h * grid_aspect
+        threshold_percent = self._threshold_percent(area)
+        return self._update_state(motion_ratio, threshold_percent, frame, event_callback, save_snapshot_cb, "Motion Vectors", "Motion Vectors")
+
+    def _threshold_percent(self, area):
+        threshold_percent = self.config.get('threshold_percent', 1.0)
+        if 'threshold' in self.config and area:
             thresh_pixels = int(self.config['threshold'])
-            threshold_percent = (thresh_pixels / (small_frame.shape[0] * small_frame.shape[1])) * 100
+            threshold_percent = (thresh_pixels / area) * 100
+        return threshold_percent
 
+    def _update_state(self, motion_ratio, threshold_percent, frame, event_callback, save_snapshot_cb, trigger_source, payload_source):
+        """Shared min_motion_frames / motion_gap state machine for pixel and compressed-domain scores"""
         if motion_ratio > threshold_percent:
             self.consecutive_motion_frames += 1
             self.consecutive_still_frames = 0
@@ -126,7 +207,7 @@ class MotionDetector:
                 self.last_motion_time = time.time()
                 if not self.motion_detected:
                     self.motion_detected = True
-                    self.last_trigger_source = "OpenCV"
+                    self.last_trigger_source = trigger_source
                     logger.info(f"[DETECTION] Camera {self.camera_name} (ID: {self.camera_id}): Motion START (Source: {self.last_trigger_source})")
                     pic_mode = self.config.get('picture_recording_mode', 'Manual')
                     vid_mode = self.config.get('recording_mode', 'Off')
@@ -136,7 +217,7 @@ class MotionDetector:
                     elif vid_mode != 'Off':
                         snap_path = save_snapshot_cb(frame, is_temp=True)
                     if event_callback:
-                        payload = {'file_path': snap_path, 'source': 'Standard'} if snap_path else {'source': 'Standard'}
+                        payload = {'file_path': snap_path, 'source': payload_source} if snap_path else {'source': payload_source}
                         event_callback(self.camera_id, 'motion_start', payload)
         else:
             self.consecutive_still_frames += 1
@@ -0,0 +1,102 @@
+import threading
+import logging
+
+import cv2
+import numpy as np
+
+from frame_pipeline import rotate
+
+logger = logging.getLogger(__name__)
+
+MB_SIZE = 16
+# Sub-cells per macroblock edge used when rasterizing mask polygons
+_MASK_SUPERSAMPLE = 4
+
+class MotionVectorAnalyzer:
+    """Scores motion from codec motion vectors (FFmpeg export_mvs side data).
+
+    The stream reader calls feed() for every decoded frame that carries motion
+    vectors; the camera thread calls consume() to get the percentage of unmasked
+    macroblocks that moved over the last `window` frames. No pixels are touched,
+    so it works without converting frames to BGR at all.
+    """
+    def __init__(self, window=3, min_magnitude=2.0):
+        self.window = max(1, int(window))
+        self.min_magnitude = float(min_magnitude)
+        self.lock = threading.Lock()
+        self._polygons = []
+        self._rotation = 0
+        self._grid_shape = None
+        self._valid = None          # bool grid: macroblocks that count (outside masks)
+        self._moving = None         # bool grid: union of moving macroblocks in the window
+        self._frames = 0
+        self._pending = None        # (ratio, timestamp) ready for consume()
+
+    def set_masks(self, polygons, rotation=0):
+        """Exclusion polygons in normalized display coordinates (privacy + motion masks)"""
+        with self.lock:
+            self._polygons = list(polygons or [])
+            self._rotation = int(rotation or 0)
+            self._grid_shape = None  # Re-rasterize on next frame
+
+    def set_window(self, window):
+        with self.lock:
+            self.window = max(1, int(window))
+
+    def _rasterize(self, rows, cols):
+        """Build the valid-macroblock grid for a coded frame of rows x cols macroblocks"""
+        # Masks are drawn in display orientation, then rotated back to the coded orientation
+        if self._rotation in (90, 270):
+            disp_rows, disp_cols = cols, rows
+        else:
+            disp_rows, disp_cols = rows, cols
+        s = _MASK_SUPERSAMPLE
+        canvas = np.zeros((disp_rows * s, disp_cols * s), dtype=np.uint8)
+        wh = np.array([disp_cols * s, disp_rows * s], dtype=np.float32)
+        for poly in self._polygons:
+            try:
+                pts = (poly * wh).astype(np.int32).reshape((-1, 1, 2))
+                cv2.fillPoly(canvas, [pts], 255)
+            except Exception as e:
+                logger.error(f"Motion vector mask rasterization failed: {e}")
+        canvas = rotate(canvas, (360 - self._rotation) % 360)
+        # A macroblock is excluded when at least half of it is covered by a mask
+        coverage = canvas.reshape(rows, s, cols, s).mean(axis=(1, 3))
+        self._valid = coverage < 128
+        self._grid_shape = (rows, cols)
+        self._moving = np.zeros((rows, cols), dtype=bool)
+        self._frames = 0
+
+    def feed(self, mvs, width, height, timestamp):
+        """Accumulate one frame of motion vectors (structured array from side data)"""
+        rows = (height + MB_SIZE - 1) // MB_SIZE
+        cols = (width + MB_SIZE - 1) // MB_SIZE
+        with self.lock:
+            if self._grid_shape != (rows, cols):
+                self._rasterize(rows, cols)
+            if mvs is not None and len(mvs):
+                scale = np.maximum(mvs['motion_scale'], 1).astype(np.float32)
+                mag = np.hypot(mvs['motion_x'], mvs['motion_y']) / scale
+                moved = mag >= self.min_magnitude
+                if moved.any():
+                    xs = np.clip(mvs['dst_x'][moved] // MB_SIZE, 0, cols - 1)
+                    ys = np.clip(mvs['dst_y'][moved] // MB_SIZE, 0, rows - 1)
+                    self._moving[ys, xs] = True
+            self._frames += 1
+            if self._frames >= self.window:
+                valid = np.count_nonzero(self._valid)
+                moving = np.count_nonzero(self._moving & self._valid)
+                ratio = (moving / valid) * 100 if valid else 0.0
+                self._pending = (ratio, timestamp)
+                self._moving[:] = False
+                self._frames = 0
+
+    def consume(self):
+        """Return (motion_ratio_percent, timestamp) for the last completed window, or None"""
+        with self.lock:
+            result, self._pending = self._pending, None
+            return result
+
+    def grid_shape(self):
+        with self.lock:
+            return self._grid_shape
@@ -0,0 +1,203 @@
+import itertools
+import logging
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Inferences a new object must be matched in before it is reported (one-frame false positives never are)
+MIN_HITS = 2
+# Inferences a reported object may go unmatched (occluded, missed) before its track is dropped
+MAX_MISSES = 3
+# Smallest IoU between a predicted track box and a detection of the same label to match them
+IOU_MATCH = 0.3
+# A track whose predicted center is less certain than this (std, as a fraction of its size) needs a detection
+MAX_UNCERTAINTY = 0.25
+# Longest a track is predicted without a detection, even when it looks certain (a parked car)
+MAX_COAST = 2.0
+# Motion within this margin (fraction of the box size) around the tracks is theirs, not a new object
+COVER_PADDING = 0.5
+
+# Kalman noise, as fractions of the box size: measured box, and the drift of position and speed per second
+MEASUREMENT_NOISE = 0.05
+POSITION_NOISE = 0.05
+VELOCITY_NOISE = 0.1
+# Initial speed uncertainty of a new track: about one box size per second
+INITIAL_VELOCITY_STD = 1.0
+
+def iou_matrix(boxes_a, boxes_b):
+    """IoU of every box pair; boxes are rows of normalized [ymin, xmin, ymax, xmax]"""
+    a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 1, 4)
+    b = np.asarray(boxes_b, dtype=np.float32).reshape(1, -1, 4)
+    inter_h = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_w = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = inter_h * inter_w
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / np.maximum(area_a + area_b - inter, 1e-9)
+
+class _Track:
+    """Constant-velocity Kalman filter over the box center and size.
+
+    State: [cx, cy, w, h, vx, vy, vw, vh] in normalized frame coordinates, with
+    velocities per second (inferences arrive at uneven intervals).
+    """
+    def __init__(self, track_id, detection, now):
+        self.track_id = track_id
+        self.label = detection.get("label", "unknown")
+        self.confidence = detection.get("confidence", 0.0)
+        self.hits = 1
+        self.misses = 0
+        self.first_seen = self.last_seen = self.updated_at = now
+        self.x = np.zeros(8)
+        self.x[:4] = self._measurement(detection["box"])
+        size = self._size()
+        self.P = np.diag(np.square([2 * MEASUREMENT_NOISE * size] * 4 + [INITIAL_VELOCITY_STD * size] * 4))
+
+    @staticmethod
+    def _measurement(box):
+        ymin, xmin, ymax, xmax = box
+        return np.array([(xmin + xmax) / 2, (ymin + ymax) / 2, xmax - xmin, ymax - ymin])
+
+    def _size(self):
+        return max(self.x[2], self.x[3], 1e-3)
+
+    def _propagate(self, dt):
+        """Mean and covariance `dt` seconds after the last update"""
+        F = np.eye(8)
+        F[:4, 4:] = np.eye(4) * dt
+        size = self._size()
+        Q = np.diag(np.square([POSITION_NOISE * size] * 4 + [VELOCITY_NOISE * size] * 4)) * dt
+        return F @ self.x, F @ self.P @ F.T + Q
+
+    def predict(self, now):
+        """Advance the filter to `now`"""
+        dt = max(0.0, now - self.updated_at)
+        if dt > 0:
+            self.x, self.P = self._propagate(dt)
+            self.x[2:4] = np.maximum(self.x[2:4], 1e-3)
+            self.updated_at = now
+
+    def correct(self, detection, now):
+        z = self._measurement(detection["box"])
+        R = np.eye(4) * (MEASUREMENT_NOISE * self._size()) ** 2
+        H = self.P[:4, :4] + R
+        K = self.P[:, :4] @ np.linalg.inv(H)
+        self.x = self.x + K @ (z - self.x[:4])
+        self.P = (np.eye(8) - K[:, :4] @ np.eye(4, 8)) @ self.P
+        self.confidence = detection.get("confidence", self.confidence)
+        self.hits += 1
+        self.misses = 0
+        self.last_seen = now
+
+    def uncertainty(self, now):
+        """Std of the predicted center at `now`, as a fraction of the box size"""
+        _, P = self._propagate(max(0.0, now - self.updated_at))
+        return float(np.sqrt(P[0, 0] + P[1, 1])) / self._size()
+
+    def box(self):
+        cx, cy, w, h = self.x[:4]
+        return [float(np.clip(cy - h / 2, 0, 1)), float(np.clip(cx - w / 2, 0, 1)),
+                float(np.clip(cy + h / 2, 0, 1)), float(np.clip(cx + w / 2, 0, 1))]
+
+    def result(self, now):
+        return {
+            "label": self.label,
+            "confidence": self.confidence,
+            "box": self.box(),
+            "track_id": self.track_id,
+            "dwell": round(now - self.first_seen, 1),
+        }
+
+class ObjectTracker:
+    """SORT-style multi-object tracker of one camera (ai_tracking_enabled).
+
+    update() associates the detections of an inference with the tracks by
+    IoU of the predicted boxes (greedy, same label only) and corrects their
+    Kalman filters; predict() returns the tracks moved to the current time, for
+    the frames in between. Tracks keep their id while matched, so events carry
+    a stable `track_id` and the `dwell` time of each object.
+
+    needs_detection() tells when predicting is no longer good enough: a track
+    has become too uncertain (new tracks, fast movers) or went MAX_COAST
+    seconds without a detection.
+    """
+    def __init__(self, min_hits=MIN_HITS, max_misses=MAX_MISSES):
+        self.min_hits = min_hits
+        self.max_misses = max_misses
+        self.tracks = []
+        self._ids = itertools.count(1)
+
+    def __len__(self):
+        return len(self.tracks)
+
+    def reset(self):
+        self.tracks = []
+
+    def update(self, detections, now=None):
+        """Feed the detections of one inference; returns the reported tracks"""
+        now = time.time() if now is None else now
+        for track in self.tracks:
+            track.predict(now)
+
+        unmatched = list(range(len(detections)))
+        matched_tracks = set()
+        if self.tracks and detections:
+            ious = iou_matrix([t.box() for t in self.tracks], [d["box"] for d in detections])
+            for i, track in enumerate(self.tracks):
+                for j, det in enumerate(detections):
+                    if det.get("label", "unknown") != track.label:
+                        ious[i, j] = 0.0
+            # Greedy assignment, best overlap first
+            for flat in np.argsort(ious, axis=None)[::-1]:
+                i, j = np.unravel_index(flat, ious.shape)
+                if ious[i, j] < IOU_MATCH:
+                    break
+                if i in matched_tracks or j not in unmatched:
+                    continue
+                self.tracks[i].correct(detections[j], now)
+                matched_tracks.add(i)
+                unmatched.remove(j)
+
+        kept = []
+        for i, track in enumerate(self.tracks):
+            if i not in matched_tracks:
+                track.misses += 1
+                # Tentative tracks die on their first miss, reported ones after max_misses
+                if track.hits < self.min_hits or track.misses > self.max_misses:
+                    logger.debug(f"Tracker: {track.label} #{track.track_id} lost after {now - track.first_seen:.1f}s")
+                    continue
+            kept.append(track)
+        for j in unmatched:
+            kept.append(_Track(next(self._ids), detections[j], now))
+        self.tracks = kept
+        return self._reported(now)
+
+    def predict(self, now=None):
+        """The reported tracks moved to `now`, between inferences"""
+        now = time.time() if now is None else now
+        for track in self.tracks:
+            track.predict(now)
+        return self._reported(now)
+
+    def _reported(self, now):
+        # Confirmed tracks coast through missed inferences (occlusion) until dropped or MAX_COAST old
+        return [t.result(now) for t in self.tracks
+                if t.hits >= self.min_hits and t.misses <= self.max_misses and now - t.last_seen < MAX_COAST]
+
+    def needs_detection(self, now=None):
+        now = time.time() if now is None else now
+        return any(now - t.last_seen >= MAX_COAST or t.uncertainty(now) > MAX_UNCERTAINTY for t in self.tracks)
+
+    def covers(self, region):
+        """Whether a changed `region` (normalized xmin, ymin, xmax, ymax) lies around one of the tracked objects"""
+        xmin, ymin, xmax, ymax = region
+
+        def around(box):
+            pad_y = (box[2] - box[0]) * COVER_PADDING
+            pad_x = (box[3] - box[1]) * COVER_PADDING
+            return (xmin >= box[1] - pad_x and ymin >= box[0] - pad_y and
+                    xmax <= box[3] + pad_x and ymax <= box[2] + pad_y)
+        # Each box on its own: the space between two distant objects is not theirs
+        return any(around(t.box()) for t in self.tracks)
@@ -0,0 +1,123 @@
+from collections import deque
+from itertools import islice
+
+class PacketRingBuffer:
+    """Pre-capture history of SharedPackets bounded by duration and by bytes.
+
+    Packets are numbered with a running sequence and the sequence numbers of
+    video keyframes are kept in a side index, so locating the Nth most recent
+    keyframe is a constant-time lookup and a replay only touches the packets it
+    returns. Not thread-safe: the StreamReader guards it with its own lock.
+
+    With `pre_roll` set, whole GOPs are evicted as soon as the next keyframe
+    alone still covers `pre_roll` seconds, so the buffer holds the pre-roll plus
+    at most one GOP; `max_duration` and `max_bytes` remain hard ceilings.
+    """
+    def __init__(self, max_duration=10.0, max_bytes=64 * 1024 * 1024, pre_roll=None):
+        self.max_duration = max_duration
+        self.max_bytes = max_bytes
+        self.pre_roll = pre_roll
+        self._packets = deque()
+        self._keyframes = deque()  # Sequence numbers of video keyframes, oldest first
+        self._first_seq = 0        # Sequence number of self._packets[0]
+        self._bytes = 0
+
+    def __len__(self):
+        return len(self._packets)
+
+    @property
+    def nbytes(self):
+        return self._bytes
+
+    @property
+    def keyframe_count(self):
+        return len(self._keyframes)
+
+    def append(self, packet):
+        if packet.is_keyframe and packet.stream_type == 'video':
+            self._keyframes.append(self._first_seq + len(self._packets))
+        self._packets.append(packet)
+        self._bytes += len(packet)
+        self._trim(packet.time_sec)
+
+    def _trim(self, newest_time):
+        packets = self._packets
+        while packets and (newest_time - packets[0].time_sec > self.max_duration or self._bytes > self.max_bytes):
+            self._pop()
+        while self._keyframes and self._keyframes[0] < self._first_seq:
+            self._keyframes.popleft()
+        if self.pre_roll is None or not self._keyframes:
+            return
+        # Nothing before the first keyframe can be replayed
+        cut = self._keyframes[0]
+        cutoff = newest_time - self.pre_roll
+        while len(self._keyframes) >= 2 and packets[self._keyframes[1] - self._first_seq].time_sec <= cutoff:
+            self._keyframes.popleft()
+            cut = self._keyframes[0]
+        while self._first_seq < cut:
+            self._pop()
+
+    def _pop(self):
+        self._bytes -= len(self._packets.popleft())
+        self._first_seq += 1
+
+    def set_limits(self, max_duration=None, max_bytes=None, pre_roll=None):
+        if max_duration is not None:
+            self.max_duration = max_duration
+        if max_bytes is not None:
+            self.max_bytes = max_bytes
+        if pre_roll is not None:
+            self.pre_roll = pre_roll
+        if self._packets:
+            self._trim(self._packets[-1].time_sec)
+
+    def from_keyframe(self, n=1):
+        """Packets from the Nth most recent video keyframe (1 = newest) to the end.
+
+        `n` is clamped to the keyframes held, so a large value replays from the
+        oldest one. Returns an empty list when the buffer has no keyframe.
+        """
+        if not self._keyframes:
+            return []
+        seq = self._keyframes[-min(max(1, n), len(self._keyframes))]
+        count = len(self._packets) - (seq - self._first_seq)
+        tail = list(islice(reversed(self._packets), count))
+        tail.reverse()
+        return tail
+
+    def covering(self, seconds):
+        """Packets from the newest keyframe at least `seconds` before the newest packet.
+
+        Falls back to the oldest keyframe when the history is shorter.
+        """
+        if not self._keyframes:
+            return []
+        cutoff = self._packets[-1].time_sec - seconds
+        n = 1
+        for seq in reversed(self._keyframes):
+            if self._packets[seq - self._first_seq].time_sec <= cutoff:
+                break
+            n += 1
+        return self.from_keyframe(n)
+
+    def oldest_keyframe(self):
+        """Packets from the oldest keyframe held (the whole decodable history)"""
+        return self.from_keyframe(len(self._keyframes))
+
+    def clear(self):
+        self._first_seq += len(self._packets)
+        self._packets.clear()
+        self._keyframes.clear()
+        self._bytes = 0
+
+    def get_stats(self):
+        packets = self._packets
+        return {
+            "packets": len(packets),
+            "bytes": self._bytes,
+            "keyframes": len(self._keyframes),
+            "duration_s": round(packets[-1].time_sec - packets[0].time_sec, 2) if packets else 0.0,
+            "max_bytes": self.max_bytes,
+            "max_duration_s": self.max_duration,
+            "pre_roll_s": self.pre_roll,
+        }
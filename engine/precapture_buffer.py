@@ -0,0 +1,75 @@
+import logging
+import time
+from collections import deque
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+class EncodedFrame:
+    """A JPEG-compressed BGR frame and its capture time; decode() restores the numpy array"""
+    __slots__ = ('data', 'capture_time')
+
+    def __init__(self, data, capture_time=None):
+        self.data = data
+        self.capture_time = capture_time
+
+    def __len__(self):
+        return self.data.nbytes
+
+    def decode(self):
+        return cv2.imdecode(self.data, cv2.IMREAD_COLOR)
+
+class PrecaptureBuffer:
+    """Pre-roll frames for transcoded motion recordings, kept JPEG-compressed.
+
+    Raw BGR copies cost width*height*3 bytes each (~6 MB at 1080p, so ~0.9 GB
+    for 10 s at 15 fps); a JPEG is typically 30-60x smaller. The buffer is
+    bounded by frame count and by bytes, and frames are only decoded again by
+    the recording writer thread, one at a time, when a recording starts.
+    """
+    def __init__(self, max_frames=0, max_bytes=128 * 1024 * 1024, quality=85):
+        self.max_frames = max_frames
+        self.max_bytes = max_bytes
+        self.quality = quality
+        self._frames = deque()
+        self._bytes = 0
+
+    def __len__(self):
+        return len(self._frames)
+
+    @property
+    def nbytes(self):
+        return self._bytes
+
+    def set_max_frames(self, max_frames):
+        self.max_frames = max_frames
+        self._trim()
+
+    def append(self, frame, capture_time=None):
+        """Compress and store a frame; the caller may keep drawing on `frame` afterwards"""
+        if self.max_frames <= 0:
+            return
+        ok, data = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), self.quality])
+        if not ok:
+            logger.warning("Pre-capture frame could not be encoded, skipping")
+            return
+        encoded = EncodedFrame(data, capture_time if capture_time is not None else time.time())
+        self._frames.append(encoded)
+        self._bytes += len(encoded)
+        self._trim()
+
+    def _trim(self):
+        frames = self._frames
+        while frames and (len(frames) > self.max_frames or self._bytes > self.max_bytes):
+            self._bytes -= len(frames.popleft())
+
+    def drain(self):
+        """Return the buffered EncodedFrames (oldest first) and empty the buffer"""
+        frames = list(self._frames)
+        self.clear()
+        return frames
+
+    def clear(self):
+        self._frames.clear()
+        self._bytes = 0
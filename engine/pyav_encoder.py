@@ -0,0 +1,139 @@
+import logging
+from fractions import Fraction
+
+import av
+import numpy as np
+
+from shared_packet import add_stream_like, decoder_like
+
+logger = logging.getLogger(__name__)
+
+# Frames are stamped with their capture time in milliseconds (variable frame rate)
+TIME_BASE = Fraction(1, 1000)
+
+def codec_options(video_codec, crf, preset):
+    """Encoder options matching the FFmpeg command line of the subprocess backend"""
+    if video_codec == 'h264_nvenc':
+        return {'preset': 'fast', 'cq': str(crf)}
+    return {'preset': preset, 'crf': str(crf)}
+
+class PyAVEncoder:
+    """In-process H.264/MP4 writer for transcoded recordings.
+
+    Takes the camera thread's BGR numpy frames (or av.VideoFrames) with their
+    capture time. A BGR frame is wrapped without copying, and the conversion to
+    yuv420p plus the optional downscale happen in one swscale pass. There is no
+    pipe and no tobytes() per frame. PTS come from the capture times, so the
+    file follows the wall clock without repeating or dropping frames.
+
+    With `audio_template` (the StreamReader's audio stream), mux_audio() adds
+    the camera's demuxed audio packets: AAC is stream-copied, other codecs
+    (G.711 and the like) are decoded by the encoder's own decoder and
+    re-encoded to AAC, as in passthrough recordings. Audio is placed on the video timeline by wall-clock time.
+    """
+    def __init__(self, path, width, height, fps, video_codec='libx264', crf=26, preset='ultrafast', threads=2, audio_template=None):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.container = av.open(path, mode='w', format='mp4', options={'movflags': '+faststart'})
+        try:
+            self.stream = self.container.add_stream(video_codec, rate=fps, options=codec_options(video_codec, crf, preset))
+            self.stream.width = width
+            self.stream.height = height
+            self.stream.pix_fmt = 'yuv420p'
+            self.stream.time_base = TIME_BASE
+            self.stream.codec_context.time_base = TIME_BASE
+            if video_codec == 'libx264':
+                # Limit CPU threads to prevent system starvation, like the FFmpeg backend
+                self.stream.codec_context.thread_count = threads
+            self.stream.codec_context.open()
+            self.audio = self.resampler = self.audio_decoder = None
+            if audio_template is not None:
+                if audio_template.name == 'aac':
+                    self.audio = add_stream_like(self.container, audio_template)
+                else:
+                    self.audio = self.container.add_stream('aac', rate=max(audio_template.rate or 8000, 8000))
+                    self.resampler = av.AudioResampler(format=self.audio.format, layout=self.audio.layout, rate=self.audio.rate)
+                    self.audio_decoder = decoder_like(audio_template)
+        except Exception:
+            self.container.close()
+            raise
+        self.start_time = None
+        self.last_pts = -1
+        self.frames = 0
+        self.audio_shift = None # Copied AAC: PTS offset from the source stream to the file
+        self.audio_next_pts = None # Re-encoded audio: next sample position
+        self.last_audio_dts = None
+        self.audio_packets = 0
+
+    def encode(self, frame, capture_time):
+        if isinstance(frame, np.ndarray):
+            frame = self._wrap(frame)
+        if frame.width != self.width or frame.height != self.height or frame.format.name != 'yuv420p':
+            frame = frame.reformat(width=self.width, height=self.height, format='yuv420p')
+        if self.start_time is None:
+            self.start_time = capture_time
+        pts = int(round((capture_time - self.start_time) * 1000))
+        if pts <= self.last_pts:
+            pts = self.last_pts + 1
+        frame.pts = self.last_pts = pts
+        frame.time_base = TIME_BASE
+        for packet in self.stream.encode(frame):
+            self.container.mux(packet)
+        self.frames += 1
+
+    def mux_audio(self, shared_packet, capture_time):
+        """Add a demuxed audio SharedPacket captured at `capture_time` (wall clock).
+
+        Audio from before the first video frame is dropped.
+        """
+        if self.audio is None or self.start_time is None or capture_time < self.start_time:
+            return
+        offset = capture_time - self.start_time
+        if self.resampler is None:
+            packet = shared_packet.clone()
+            if packet.pts is None:
+                return
+            if self.audio_shift is None:
+                # Anchored once, so the copied timestamps keep their original spacing
+                self.audio_shift = int(round(offset / packet.time_base)) - packet.pts
+            packet.pts += self.audio_shift
+            packet.dts = packet.pts if packet.dts is None else packet.dts + self.audio_shift
+            if self.last_audio_dts is not None and packet.dts <= self.last_audio_dts:
+                return
+            self.last_audio_dts = packet.dts
+            packet.stream = self.audio
+            self.container.mux(packet)
+            self.audio_packets += 1
+            return
+        for frame in self.audio_decoder.decode(shared_packet.clone()):
+            frame.pts = None
+            for resampled in self.resampler.resample(frame):
+                if self.audio_next_pts is None:
+                    self.audio_next_pts = int(round(offset * self.audio.rate))
+                resampled.pts = self.audio_next_pts
+                resampled.time_base = Fraction(1, self.audio.rate)
+                self.audio_next_pts += resampled.samples
+                for packet in self.audio.encode(resampled):
+                    self.container.mux(packet)
+        self.audio_packets += 1
+
+    @staticmethod
+    def _wrap(array):
+        if array.flags.c_contiguous:
+            try:
+                # Shares the numpy buffer: no copy before swscale
+                return av.VideoFrame.from_numpy_buffer(array, format='bgr24')
+            except (AttributeError, ValueError):
+                pass
+        return av.VideoFrame.from_ndarray(array, format='bgr24')
+
+    def close(self):
+        try:
+            for packet in self.stream.encode(None):
+                self.container.mux(packet)
+            if self.resampler is not None:
+                for packet in self.audio.encode(None):
+                    self.container.mux(packet)
+        finally:
+            self.container.close()
@@ -0,0 +1,46 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Finalizations mostly wait (writer join, FFmpeg writing the index), so a few threads serve all cameras
+MAX_WORKERS = 8
+
+class RecordingFinalizer:
+    """Engine-wide pool that closes stopped recordings off the camera threads.
+
+    RecordingManager.stop_recording() only signals the writer and hands the rest
+    (joining the writer, waiting for FFmpeg, validating the file and emitting
+    'recording_end') to submit(), so the capture loop keeps running meanwhile.
+    """
+    def __init__(self, max_workers=MAX_WORKERS):
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.stats = {"finalized": 0, "failed": 0}
+
+    def submit(self, fn, *args):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="RecordingFinalizer")
+            self.pending += 1
+            return self._executor.submit(self._run, fn, *args)
+
+    def _run(self, fn, *args):
+        outcome = "failed"
+        try:
+            result = fn(*args)
+            outcome = "finalized"
+            return result
+        except Exception:
+            # Bound RecordingManager methods name their camera
+            camera = getattr(getattr(fn, '__self__', None), 'camera_name', None)
+            logger.exception(f"Recording finalization {getattr(fn, '__qualname__', fn)} failed" + (f" (camera {camera})" if camera else ""))
+        finally:
+            with self._lock:
+                self.stats[outcome] += 1
+                self.pending -= 1
+
+finalizer = RecordingFinalizer()
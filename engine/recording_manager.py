@@ -4,14 +4,90 @@ import time
 import logging
 import threading
 import queue
+from collections import deque
+from concurrent.futures import wait
 import cv2
+import numpy as np
 from datetime import datetime
 from utils import mask_url
+from shared_packet import add_stream_like, decoder_like
+from precapture_buffer import EncodedFrame
+from frame_queue import FrameQueue
+from mask_handler import parse_polygons
+from recording_finalizer import finalizer
+from recording_metadata import THUMBNAIL_OFFSET, thumbnail_frame, write_thumbnail, thumbnail_from_file, probe_recording
 
 logger = logging.getLogger(__name__)
 
 _VAAPI_INIT_CACHE = None
 
+# Memory budget of a transcoded recording's frame queue when opt_recording_queue_mb is unset
+DEFAULT_QUEUE_MB = 256
+
+# A capture gap longer than this is not filled with repeated frames; the timeline restarts after it
+MAX_CFR_GAP = 5.0
+
+class CfrClock:
+    """Maps capture timestamps onto the constant frame rate of FFmpeg's rawvideo input.
+
+    Output frame n covers [n / fps, (n + 1) / fps) from the first capture time.
+    slots() tells how many times a frame must be written so the video timeline
+    follows the wall clock: 0 when the slot is already filled (camera faster than
+    `fps`), several when frames went missing (the previous frame fills the gap).
+    """
+    def __init__(self, fps):
+        self.interval = 1.0 / max(1, fps)
+        self.start = None
+        self.written = 0
+
+    def slots(self, capture_time):
+        if self.start is None:
+            self.start = capture_time
+        # The epsilon keeps frames captured exactly on a slot boundary in that slot
+        due = int((capture_time - self.start) / self.interval + 1e-6) + 1
+        count = due - self.written
+        if count * self.interval > MAX_CFR_GAP:
+            # Long outage: continue right after the previous frame instead of padding
+            self.start = capture_time - self.written * self.interval
+            count = 1
+        count = max(0, count)
+        self.written += count
+        return count
+
+class RecordingSegment:
+    """One file of a recording, with what is collected while it is written"""
+    def __init__(self, path, start_time):
+        self.path = path
+        self.start_time = start_time # Wall clock
+        self.ai_detections = [] # Unique labels found while this file was written
+        self.thumbnail = None # Downscaled frame from about 1 s into the file
+
+class RecordingState:
+    """State of one recording, shared by its writer, segment monitor and finalization.
+
+    start_recording() creates a new one every time, so a writer still cutting or
+    closing the previous recording never writes into the state of the next one,
+    and starting a recording never waits for the previous one to be reported.
+    """
+    def __init__(self, path, start_time, reason, method, segmenting=False):
+        self.segment = RecordingSegment(path, start_time) # File being written now
+        self.start_time = start_time
+        self.reason = reason
+        self.method = method
+        self.segmenting = segmenting # The writer cuts segments itself (continuous recordings)
+        self.writer_reports = False # The writer reports its last file itself when it exits
+        self.lock = threading.Lock()
+        self.stop = None # (stopped_at, width, height, event_callback) once stop_recording() ran
+        self.closed = False # The writer exited
+
+def _global_opt(key, default):
+    """Engine-wide optimization setting (opt_*) from main.GLOBAL_CONFIG"""
+    try:
+        from main import GLOBAL_CONFIG
+        return GLOBAL_CONFIG.get(key, default)
+    except ImportError:
+        return default
+
 def _probe_vaapi_init():
     global _VAAPI_INIT_CACHE
     if _VAAPI_INIT_CACHE is not None:
@@ -45,14 +121,46 @@ class RecordingManager:
         self.stream_reader = stream_reader
         self.recording_process = None
         self.is_recording = False
-        self.recording_filename = None
+        self.recording = None # RecordingState of the current (or last) recording
         self.recording_start_time = 0.0
         self.passthrough_active = False
         self.last_event_callback = None
-        self.current_ai_detections = [] # Track unique labels found during this event
+        self.segment_listener = None # ClipExtractor fed with this recorder's segments
+        self.default_max_length = 0 # Rotation interval when max_movie_length is 0 (unlimited)
+        self.segmenting = False # Long-lived writer cutting segments itself (continuous recordings)
+        self.segment_length = 0 # Segment length the FFmpeg segment muxer was launched with
+        self.segment_monitor = None
+        self.encoder_backend = None # 'ffmpeg' (subprocess) or 'pyav' (in-process) for transcoded recordings
+        self.pyav_encoder_failed = False
+        self.queue_stats = {} # Frame queue counters (queued, dropped, decimated, overloads) across recordings
+        self.logged_overload = None
+        self.finalizing = None # Future of the last stop_recording() on the finalizer pool
+        self.reports = set() # Futures of cut segments being reported on the finalizer pool
+
+    @property
+    def recording_filename(self):
+        """File the current recording is writing"""
+        return self.recording.segment.path if self.recording else None
+
+    @property
+    def segment_start_time(self):
+        """Wall-clock start of the file the current recording is writing"""
+        return self.recording.segment.start_time if self.recording else 0.0
+
+    def pre_roll_seconds(self):
+        """Requested pre-capture (captured_before) in seconds; the engine gets it as frames"""
+        fps = self.config.get('framerate', 15) or 15
+        return max(0, self.config.get('pre_capture', 0) or 0) / fps
+
+    def max_segment_length(self):
+        return self.config.get('max_movie_length', 0) or self.default_max_length
 
     def check_segment_rotation(self, stop_recording_cb):
-        max_len = self.config.get('max_movie_length', 0)
+        max_len = self.max_segment_length()
+        if self.segmenting and (self.passthrough_active or self.encoder_backend == 'pyav' or max_len == self.segment_length):
+            # The writer cuts segments at keyframes itself; FFmpeg is only restarted
+            # when the segment length it was launched with no longer applies
+            return False
         if self.is_recording and max_len > 0:
             if time.time() - self.recording_start_time > max_len:
                 logger.info(f"Camera {self.camera_name} (ID: {self.camera_id}): Max movie length reached, splitting file")
@@ -60,7 +168,7 @@ class RecordingManager:
                 return True
         return False
 
-    def handle_recording(self, frame, motion_detected, last_motion_time, stop_recording_cb, trigger_source=None, ai_results=None, pre_buffer_frames=None, override_should_record=None, override_reason=None):
+    def handle_recording(self, frame, motion_detected, last_motion_time, stop_recording_cb, trigger_source=None, ai_results=None, pre_buffer_frames=None, override_should_record=None, override_reason=None, frame_time=None):
         if override_should_record is not None and override_reason is not None:
             should_record = override_should_record
             reason = override_reason
@@ -77,10 +185,14 @@ class RecordingManager:
         
         # Accumulate AI results if recording
         if self.is_recording and ai_results:
+            detections = self.recording.segment.ai_detections
             for res in ai_results:
                 label = res.get('label')
-                if label and label not in self.current_ai_detections:
-                    self.current_ai_detections.append(label)
+                if label and label not in detections:
+                    detections.append(label)
+
+        if self.is_recording:
+            self._keep_thumbnail(frame, frame_time)
 
         if should_record and not self.is_recording:
             pre_buf = pre_buffer_frames or []
@@ -99,6 +211,21 @@ class RecordingManager:
                  self.start_recording(frame.shape[1], frame.shape[0], None, event_callback=self.last_event_callback, reason="Fallback", trigger_source=trigger_source)
                  return True
 
+        if self.is_recording and not self.passthrough_active and self._switch_to_passthrough():
+             logger.warning(f"Camera {self.camera_name}: Recording encoder cannot keep up, continuing as passthrough recording")
+             self.frame_queue.clear()
+             self.stop_recording(self.last_event_callback, frame.shape[1], frame.shape[0])
+             self.start_recording(frame.shape[1], frame.shape[0], None, event_callback=self.last_event_callback, reason="Overload", trigger_source=trigger_source)
+             return True
+
+        if self.is_recording and self.encoder_backend == 'pyav' and not self.passthrough_active:
+            if not self.writer_thread.is_alive():
+                 logger.error(f"Camera {self.camera_name}: PyAV encoder thread died unexpectedly. Restarting recording with the FFmpeg encoder.")
+                 self.stop_recording(None, frame.shape[1], frame.shape[0])
+                 self.start_recording(frame.shape[1], frame.shape[0], None, event_callback=self.last_event_callback, reason="Restart", trigger_source=trigger_source)
+                 return True
+            self._queue_frame(frame, frame_time)
+
         if self.is_recording and self.recording_process and not self.passthrough_active:
             if self.recording_process.poll() is not None:
                  logger.error(f"Camera {self.camera_name}: Transcoded recording process died unexpectedly. Attempting to restart recording.")
@@ -106,15 +233,57 @@ class RecordingManager:
                  self.start_recording(frame.shape[1], frame.shape[0], None, event_callback=self.last_event_callback, reason="Restart", trigger_source=trigger_source)
                  return True
 
-            if hasattr(self, 'frame_queue'):
-                try:
-                    # Pass the numpy array reference instead of converting to bytes immediately
-                    self.frame_queue.put_nowait(frame)
-                except queue.Full:
-                    logger.warning(f"Camera {self.camera_name}: FFmpeg queue full, dropping frame")
+            self._queue_frame(frame, frame_time)
         
         return True
 
+    def _queue_frame(self, frame, frame_time):
+        if hasattr(self, 'frame_queue'):
+            try:
+                # Pass the numpy array reference instead of converting to bytes immediately
+                self.frame_queue.put_nowait((frame_time or time.time(), frame))
+            except queue.Full:
+                if self.frame_queue.full_since != self.logged_overload:
+                    # Once per overload, not once per dropped frame
+                    self.logged_overload = self.frame_queue.full_since
+                    logger.warning(f"Camera {self.camera_name}: Encoder queue full ({self.frame_queue.nbytes // (1024 * 1024)} MB), dropping frames")
+
+    def _keep_thumbnail(self, frame, frame_time):
+        """One downscaled frame per file, THUMBNAIL_OFFSET into it (written as its .jpg when it is closed)"""
+        segment = self.recording.segment
+        if segment.thumbnail is not None or (frame_time or time.time()) - segment.start_time < THUMBNAIL_OFFSET:
+            return
+        segment.thumbnail = thumbnail_frame(frame)
+
+    def _recording_metadata(self, path, thumbnail):
+        """duration, codec, keyframes, file_size and thumbnail_path for the recording_end payload"""
+        try:
+            meta = probe_recording(path)
+            if thumbnail is None:
+                thumbnail = thumbnail_from_file(path)
+            meta["thumbnail_path"] = write_thumbnail(thumbnail, path)
+            return meta
+        except Exception as e:
+            logger.warning(f"Camera {self.camera_name} (ID: {self.camera_id}): Could not read recording metadata of {path}: {e}")
+            return {}
+
+    def _passthrough_allowed(self):
+        """Whether the camera stream may be copied: privacy masks must be burned in before recording"""
+        return (not parse_polygons(self.config.get('privacy_masks'), self.camera_name)
+                and getattr(self.stream_reader, 'video_stream', None) is not None)
+
+    def _switch_to_passthrough(self):
+        """Overload policy 'passthrough': the encoder fell behind and the stream can be copied instead"""
+        fq = getattr(self, 'frame_queue', None)
+        return fq is not None and fq.policy == 'passthrough' and fq.overloaded and self._passthrough_allowed()
+
+    def get_queue_stats(self):
+        """Depth and drop counters of the transcoded recording frame queue"""
+        fq = getattr(self, 'frame_queue', None)
+        if fq is not None and self.is_recording and not self.passthrough_active:
+            return fq.get_stats()
+        return {"depth": 0, "bytes": 0, **self.queue_stats}
+
     def _monitor_ffmpeg_logs(self, process):
         try:
             for line in iter(process.stderr.readline, b''):
@@ -126,12 +295,37 @@ class RecordingManager:
         except Exception:
             pass
 
-    def _async_pyav_passthrough_writer(self, full_path, q, cam_name, width, height, event_callback):
+    def _open_passthrough_container(self, full_path):
         import av
+        resampler = None
+        out_aud = None
+        # Use fragmented MP4 flags to support priming samples and negative PTS
+        out_container = av.open(full_path, mode='w', format='mp4', 
+                                options={'movflags': '+frag_keyframe+empty_moov+default_base_moof'})
+        out_vid = add_stream_like(out_container, self.stream_reader.video_stream)
+        
+        if self.stream_reader.audio_stream and self.config.get('record_audio'):
+            in_aud = self.stream_reader.audio_stream
+            if in_aud.name == 'aac':
+                out_aud = add_stream_like(out_container, in_aud)
+            else:
+                out_aud = out_container.add_stream('aac', rate=max(in_aud.rate or 8000, 8000))
+                resampler = av.AudioResampler(
+                    format=out_aud.format, layout=out_aud.layout, rate=out_aud.rate
+                )
+        return out_container, out_vid, out_aud, resampler
+
+    def _segment_due(self, state):
+        max_len = self.max_segment_length()
+        return state.segmenting and state.stop is None and max_len > 0 and time.time() - state.segment.start_time >= max_len
+
+    def _async_pyav_passthrough_writer(self, state, q, cam_name, width, height, event_callback, preroll=None):
+        full_path = state.segment.path
         out_container = None
         out_vid = None
         out_aud = None
         resampler = None
+        audio_decoder = None
         
         start_dts = None
         start_pts_vid = None
@@ -142,47 +336,42 @@ class RecordingManager:
         
         try:
             while not out_container:
-                if not self.is_recording:
+                if state.stop is not None:
                     return
                 if self.stream_reader and self.stream_reader.video_stream:
-                    # Use fragmented MP4 flags to support priming samples and negative PTS
-                    out_container = av.open(full_path, mode='w', format='mp4', 
-                                            options={'movflags': '+frag_keyframe+empty_moov+default_base_moof'})
-                    out_vid = out_container.add_stream(template=self.stream_reader.video_stream)
-                    
-                    if self.stream_reader.audio_stream and self.config.get('record_audio'):
-                        in_aud = self.stream_reader.audio_stream
-                        if in_aud.name == 'aac':
-                            out_aud = out_container.add_stream(template=in_aud)
-                        else:
-                            out_aud = out_container.add_stream('aac', rate=max(in_aud.rate or 8000, 8000))
-                            resampler = av.AudioResampler(
-                                format=out_aud.format, layout=out_aud.layout, rate=out_aud.rate
-                            )
+                    out_container, out_vid, out_aud, resampler = self._open_passthrough_container(full_path)
                 else:
                     time.sleep(0.1)
                     
             if event_callback:
                 event_callback(self.camera_id, 'recording_start', {"file_path": full_path, "width": width, "height": height})
                 
+            # Pre-roll packets (starting at a keyframe) are written before the live queue
+            preroll = deque(preroll or ())
             while True:
-                if not self.is_recording and q.empty():
+                if state.stop is not None and not preroll and q.empty():
                     break
                 try:
-                    original_packet = q.get(timeout=1.0)
+                    original_packet = preroll.popleft() if preroll else q.get(timeout=1.0)
                     if original_packet is None:
                         break
                         
-                    # Deep copy the packet to avoid modifying the shared instance across threads
-                    packet = av.Packet(bytes(original_packet))
-                    packet.pts = original_packet.pts
-                    packet.dts = original_packet.dts
-                    if original_packet.time_base is not None:
-                        packet.time_base = original_packet.time_base
-                        
-                    packet_stream_type = original_packet.stream.type
-                    
-                    is_keyframe = getattr(original_packet, 'is_keyframe', False)
+                    # Private copy (timing/stream get rewritten below); the SharedPacket itself stays untouched
+                    packet = original_packet.clone()
+                    packet_stream_type = original_packet.stream_type
+                    is_keyframe = original_packet.is_keyframe
+                    if packet_stream_type == 'video' and is_keyframe and not waiting_for_keyframe and self._segment_due(state):
+                        # Cut here without leaving the subscription: the keyframe opens the next file
+                        if out_aud and resampler:
+                            for enc_packet in out_aud.encode(None):
+                                out_container.mux(enc_packet)
+                        out_container.close()
+                        out_container = None
+                        full_path = self._next_segment(state, width, height, event_callback)
+                        out_container, out_vid, out_aud, resampler = self._open_passthrough_container(full_path)
+                        waiting_for_keyframe = True
+                        start_dts = start_pts_vid = start_pts_aud = None
+                        last_muxed_dts = -1
                     if waiting_for_keyframe:
                         if packet_stream_type == 'video' and is_keyframe:
                             waiting_for_keyframe = False
@@ -224,13 +413,10 @@ class RecordingManager:
                             if start_pts_aud is None and packet.pts is not None:
                                 start_pts_aud = packet.pts
                             try:
-                                # Use original_packet for decoding to access its internal codec context
-                                # MUST lock decoding because libavcodec codec context is NOT thread-safe
-                                decoded_frames = []
-                                with self.stream_reader.audio_decode_lock:
-                                    decoded_frames = original_packet.decode()
-                                    
-                                for frame in decoded_frames:
+                                # This writer's own decoder: other recorders get the same packets
+                                if audio_decoder is None:
+                                    audio_decoder = decoder_like(self.stream_reader.audio_stream)
+                                for frame in audio_decoder.decode(original_packet.clone()):
                                     frame.pts = None
                                     for r_frame in resampler.resample(frame):
                                         for enc_packet in out_aud.encode(r_frame):
@@ -261,24 +447,26 @@ class RecordingManager:
                     pass
             if self.stream_reader:
                 self.stream_reader.unsubscribe_packets(q)
+            self._writer_exited(state)
 
-    def _start_passthrough_recording(self, full_path, width, height, event_callback):
+    def _start_passthrough_recording(self, state, width, height, event_callback):
         try:
             self.passthrough_queue = queue.Queue(maxsize=1500)
             self.is_recording = True
-            self.recording_filename = full_path
-            self.recording_start_time = time.time()
+            self.recording = state
+            state.writer_reports = True
             
-            # Subscribe to the stream reader to get the pre-buffer and live packets
+            # Subscribe to the stream reader to get the pre-roll and live packets
+            preroll = []
             if self.stream_reader:
                 reason = getattr(self, 'current_recording_reason', 'unknown').lower()
                 # Continuous segments shouldn't get the pre-buffer again, only motion events
-                include_prebuf = (reason != 'continuous')
-                self.stream_reader.subscribe_packets(self.passthrough_queue, include_prebuffer=include_prebuf)
+                pre_roll = self.pre_roll_seconds() if reason != 'continuous' else None
+                preroll = self.stream_reader.subscribe_packets(self.passthrough_queue, pre_roll=pre_roll)
                 
             self.writer_thread = threading.Thread(
                 target=self._async_pyav_passthrough_writer, 
-                args=(full_path, self.passthrough_queue, self.camera_name, width, height, event_callback), 
+                args=(state, self.passthrough_queue, self.camera_name, width, height, event_callback, preroll), 
                 daemon=True
             )
             self.writer_thread.start()
@@ -291,19 +479,73 @@ class RecordingManager:
             self.is_recording = False
             return False
 
-    def _async_ffmpeg_writer(self, proc, q, cam_name, w, h, do_resize):
+    def _monitor_ffmpeg_segments(self, state, process, segment_pattern, width, height, event_callback):
+        """Rename and report each segment FFmpeg's segment muxer closes (csv list on stdout).
+
+        Every listed segment is moved to the path announced when it was opened and a
+        new path is announced for the next one; after the final segment that last
+        announcement is simply never written.
+        """
+        t0 = state.start_time
+        segment_dir = os.path.dirname(segment_pattern)
+        end_time = t0
+        try:
+            for line in iter(process.stdout.readline, b''):
+                try:
+                    name, _start, end = line.decode('utf-8', errors='replace').strip().rsplit(',', 2)
+                    end_time = t0 + float(end)
+                except ValueError:
+                    continue
+                final_path = state.segment.path
+                try:
+                    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                    os.replace(os.path.join(segment_dir, name.strip('"')), final_path)
+                except OSError as e:
+                    logger.error(f"Camera {self.camera_name} (ID: {self.camera_id}): Could not move segment {name} to {final_path}: {e}")
+                self._next_segment(state, width, height, event_callback, start_time=end_time)
+        except Exception as e:
+            logger.error(f"Camera {self.camera_name} (ID: {self.camera_id}): Segment monitor died: {e}")
+        if self.segment_listener and not os.path.exists(state.segment.path):
+            self.segment_listener.segment_finished(state.segment.path, end_time, False)
+        # A killed FFmpeg leaves its open segment without an index
+        prefix = os.path.basename(segment_pattern).split('%')[0]
+        for leftover in os.listdir(segment_dir):
+            if leftover.startswith(prefix):
+                logger.warning(f"Camera {self.camera_name} (ID: {self.camera_id}): Removing unfinished segment {leftover}")
+                try:
+                    os.remove(os.path.join(segment_dir, leftover))
+                except OSError:
+                    pass
+
+    def _async_ffmpeg_writer(self, proc, q, cam_name, w, h, do_resize, fps=15):
+        # Writes as fast as FFmpeg reads; the frame rate comes from the capture timestamps
+        clock = CfrClock(fps)
+        previous = None
         try:
             while True:
                 if proc.poll() is not None:
                     break
                 try:
-                    frame_data = q.get(timeout=1.0)
-                    if frame_data is None:
+                    item = q.get(timeout=1.0)
+                    if item is None:
                         break
+                    capture_time, frame_data = item
+                    repeats = clock.slots(capture_time)
+                    if repeats == 0:
+                        continue
+                    if isinstance(frame_data, EncodedFrame):
+                        # Pre-capture frames stay compressed until they are written
+                        frame_data = frame_data.decode()
+                        if frame_data is None:
+                            continue
                     if do_resize:
                         frame_data = cv2.resize(frame_data, (w, h), interpolation=cv2.INTER_LINEAR)
-                    proc.stdin.write(frame_data.tobytes())
-                    time.sleep(0.033)
+                    data = memoryview(np.ascontiguousarray(frame_data)).cast('B')
+                    # Missing slots repeat the previous frame, like FFmpeg's fps filter
+                    for _ in range(repeats - 1):
+                        proc.stdin.write(previous if previous is not None else data)
+                    proc.stdin.write(data)
+                    previous = data
                 except queue.Empty:
                     continue
                 except Exception as e:
@@ -316,38 +558,52 @@ class RecordingManager:
                 except Exception:
                     pass
 
-    def _launch_transcoded_ffmpeg(self, full_path, width, height, event_callback):
-        quality = self.config.get('movie_quality', 75)
-        crf = max(18, min(51, int(51 - (quality * 0.33))))
+    def _video_codec(self, in_process=False):
         hw_accel_enabled = os.environ.get('HW_ACCEL', 'false').lower() == 'true'
         hw_accel_type = os.environ.get('HW_ACCEL_TYPE', 'auto').lower()
-        video_codec = 'libx264'
-        # Limit CPU threads to prevent system starvation during fallback SW encoding
-        codec_specific_args = ['-preset', self.config.get('opt_ffmpeg_preset', 'ultrafast'), '-crf', str(crf), '-threads', '2']
-
-        try:
-            from main import GLOBAL_CONFIG
-            ffmpeg_loglevel = 'debug' if GLOBAL_CONFIG.get('opt_verbose_engine_logs') else 'error'
-        except ImportError:
-            ffmpeg_loglevel = 'error'
-
         if hw_accel_enabled:
             if hw_accel_type in ['vaapi', 'intel', 'amd', 'auto'] and os.path.exists('/dev/dri'):
-                if _probe_vaapi_init():
-                    video_codec = 'h264_vaapi'
-                    codec_specific_args = ['-vaapi_device', '/dev/dri/renderD128', '-vf', 'format=nv12,hwupload', '-qp', str(int(crf * 0.7))]
+                # VAAPI needs hwupload into GPU surfaces, which only the FFmpeg command line sets up
+                if not in_process and _probe_vaapi_init():
+                    return 'h264_vaapi'
             elif hw_accel_type == 'nvidia':
-                video_codec = 'h264_nvenc'
-                codec_specific_args = ['-preset', 'fast', '-cq', str(crf)]
+                return 'h264_nvenc'
+        return 'libx264'
+
+    def _video_encoder_settings(self, width, height, in_process=False):
+        """(video_codec, crf, target_w, target_h) shared by the FFmpeg and PyAV encoders"""
+        quality = self.config.get('movie_quality', 75)
+        crf = max(18, min(51, int(51 - (quality * 0.33))))
+        hw_accel_enabled = os.environ.get('HW_ACCEL', 'false').lower() == 'true'
+        video_codec = self._video_codec(in_process)
 
         target_w, target_h = width, height
-        needs_resize = False
-        if not hw_accel_enabled and height > 720:
-            needs_resize = True
+        # In-process VAAPI falls back to software encoding, which gets the software size limit
+        software = not hw_accel_enabled or (in_process and video_codec == 'libx264')
+        if software and height > 720:
             scale = 720 / height
             target_h = 720
             target_w = int(width * scale)
             target_w -= target_w % 2  # Must be even for yuv420p
+        return video_codec, crf, target_w, target_h
+
+    def _launch_transcoded_ffmpeg(self, state, width, height, event_callback):
+        full_path = state.segment.path
+        video_codec, crf, target_w, target_h = self._video_encoder_settings(width, height)
+        needs_resize = (target_w, target_h) != (width, height)
+        if video_codec == 'h264_vaapi':
+            codec_specific_args = ['-vaapi_device', '/dev/dri/renderD128', '-vf', 'format=nv12,hwupload', '-qp', str(int(crf * 0.7))]
+        elif video_codec == 'h264_nvenc':
+            codec_specific_args = ['-preset', 'fast', '-cq', str(crf)]
+        else:
+            # Limit CPU threads to prevent system starvation during fallback SW encoding
+            codec_specific_args = ['-preset', self.config.get('opt_ffmpeg_preset', 'ultrafast'), '-crf', str(crf), '-threads', '2']
+
+        try:
+            from main import GLOBAL_CONFIG
+            ffmpeg_loglevel = 'debug' if GLOBAL_CONFIG.get('opt_verbose_engine_logs') else 'error'
+        except ImportError:
+            ffmpeg_loglevel = 'error'
 
         command = [
             'ffmpeg', '-y', '-loglevel', ffmpeg_loglevel, '-f', 'rawvideo', '-vcodec', 'rawvideo',
@@ -356,7 +612,7 @@ class RecordingManager:
         ]
 
         if self.config.get('record_audio'):
-            # Fetch audio from RTSP as a second input
+            # Fallback only (no demuxed audio, VAAPI, or a failed in-process encoder): fetch audio from RTSP as a second input
             command += [
                 '-rtsp_transport', self.config.get('rtsp_transport', 'tcp'),
                 '-i', self.config['rtsp_url'],
@@ -366,17 +622,40 @@ class RecordingManager:
             command += ['-an']
 
         # -shortest is CRITICAL: it forces FFmpeg to stop recording the RTSP audio stream when stdin (video) closes.
-        command += ['-c:v', video_codec, *codec_specific_args, '-pix_fmt', 'yuv420p', '-movflags', '+faststart', '-shortest', full_path]
+        command += ['-c:v', video_codec, *codec_specific_args, '-pix_fmt', 'yuv420p', '-shortest']
+
+        segment_pattern = None
+        if self.segment_length > 0:
+            # One long-lived FFmpeg cuts the continuous recording at forced keyframes and lists
+            # each closed segment on stdout; the monitor thread renames it and reports it
+            seg = self.segment_length
+            segment_pattern = os.path.join(os.path.dirname(full_path), f".segment-{int(state.start_time)}-%05d.mp4.part")
+            command += [
+                '-force_key_frames', f'expr:gte(t,n_forced*{seg})',
+                '-f', 'segment', '-segment_time', str(seg), '-segment_format', 'mp4',
+                '-segment_format_options', 'movflags=+faststart', '-reset_timestamps', '1',
+                '-segment_list', 'pipe:1', '-segment_list_type', 'csv', segment_pattern
+            ]
+        else:
+            command += ['-movflags', '+faststart', full_path]
 
         # Apply nice -n 19 to lower FFmpeg's CPU scheduling priority
         command = ['nice', '-n', '19'] + command
 
         try:
-            self.recording_process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+            self.recording_process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE,
+                                                      stdout=subprocess.PIPE if segment_pattern else None)
 
             threading.Thread(target=self._monitor_ffmpeg_logs, args=(self.recording_process,), daemon=True).start()
-
-            self.writer_thread = threading.Thread(target=self._async_ffmpeg_writer, args=(self.recording_process, self.frame_queue, self.camera_name, target_w, target_h, needs_resize), daemon=True)
+            if segment_pattern:
+                self.segment_monitor = threading.Thread(
+                    target=self._monitor_ffmpeg_segments,
+                    args=(state, self.recording_process, segment_pattern, width, height, event_callback),
+                    daemon=True
+                )
+                self.segment_monitor.start()
+
+            self.writer_thread = threading.Thread(target=self._async_ffmpeg_writer, args=(self.recording_process, self.frame_queue, self.camera_name, target_w, target_h, needs_resize, self.config.get('framerate', 15) or 15), daemon=True)
             self.writer_thread.start()
 
             if event_callback:
@@ -386,28 +665,152 @@ class RecordingManager:
             self.is_recording = False
             self.recording_process = None
 
-    def _start_transcoded_recording(self, full_path, width, height, pre_buffer_frames, event_callback):
+    def _start_transcoded_recording(self, state, width, height, pre_buffer_frames, event_callback):
         # Setup Async Writer Queue synchronously so CameraThread can push to it immediately
-        self.frame_queue = queue.Queue(maxsize=1500)
+        max_bytes = int(_global_opt('opt_recording_queue_mb', DEFAULT_QUEUE_MB) or DEFAULT_QUEUE_MB) * 1024 * 1024
+        policy = _global_opt('opt_recording_overload', 'drop')
+        if policy == 'passthrough' and not self._passthrough_allowed():
+            # Privacy masks (or no stream to copy): an overloaded encoder drops frames instead
+            policy = 'drop'
+        self.frame_queue = FrameQueue(max_bytes, policy, self.queue_stats)
         self.is_recording = True
-        self.recording_filename = full_path
-        self.recording_start_time = time.time()
+        self.recording = state
 
         # Flush pre-buffer synchronously
         if pre_buffer_frames:
+            now = time.time()
             for pref in pre_buffer_frames:
                 try:
-                    self.frame_queue.put_nowait(pref)
+                    self.frame_queue.put_nowait((getattr(pref, 'capture_time', None) or now, pref))
                 except queue.Full:
                     pass
 
-        threading.Thread(target=self._launch_transcoded_ffmpeg, args=(full_path, width, height, event_callback), daemon=True).start()
+        if self.encoder_backend == 'pyav':
+            state.writer_reports = True
+            self.writer_thread = threading.Thread(
+                target=self._async_pyav_encoder_writer,
+                args=(state, self.frame_queue, self.camera_name, width, height, event_callback),
+                daemon=True
+            )
+            self.writer_thread.start()
+            return True
+
+        threading.Thread(target=self._launch_transcoded_ffmpeg, args=(state, width, height, event_callback), daemon=True).start()
         return True
 
-    def start_recording(self, width, height, pre_buffer_frames, event_callback=None, reason="Manual", trigger_source=None):
-        self.current_ai_detections = [] # Reset for new event
+    def _select_encoder_backend(self):
+        """Engine-wide opt_recording_encoder; recordings with audio go in-process when they can"""
+        if self.pyav_encoder_failed:
+            return 'ffmpeg'
+        if self.config.get('record_audio'):
+            # The reader's audio packets are muxed in-process, so the camera keeps a single RTSP
+            # session. VAAPI is only available to FFmpeg, which then opens its own audio input.
+            if self._audio_template() is not None and self._video_codec() != 'h264_vaapi':
+                return 'pyav'
+            return 'ffmpeg'
+        return _global_opt('opt_recording_encoder', 'ffmpeg')
+
+    def _audio_template(self):
+        """The StreamReader's demuxed audio stream, when audio is recorded"""
+        if not self.config.get('record_audio') or self.stream_reader is None:
+            return None
+        return getattr(self.stream_reader, 'audio_stream', None)
+
+    def _mux_pending_audio(self, encoder, audio_q, pending, until):
+        """Mux the subscribed audio packets captured up to `until` (wall clock); later ones wait in `pending`"""
+        reader = self.stream_reader
+        while True:
+            if not pending:
+                try:
+                    packet = audio_q.get_nowait()
+                except queue.Empty:
+                    return
+                if packet is None or packet.stream_type != 'audio':
+                    continue
+                if len(pending) >= audio_q.maxsize:
+                    pending.popleft() # Audio clock far ahead of the video: keep memory bounded
+                pending.append((reader.stream_to_wall(packet.time_sec), packet))
+            wall_time, packet = pending[0]
+            if wall_time > until:
+                return
+            pending.popleft()
+            try:
+                encoder.mux_audio(packet, wall_time)
+            except Exception as e:
+                logger.debug(f"Camera {self.camera_name}: Skipped audio packet: {e}")
+
+    def _async_pyav_encoder_writer(self, state, q, cam_name, width, height, event_callback):
+        from pyav_encoder import PyAVEncoder
+        full_path = state.segment.path
+        video_codec, crf, target_w, target_h = self._video_encoder_settings(width, height, in_process=True)
+        fps = self.config.get('framerate', 15) or 15
+        preset = self.config.get('opt_ffmpeg_preset', 'ultrafast')
+        encoder = None
+        audio_template = self._audio_template()
+        audio_q = None
+        pending_audio = deque()
+        if audio_template is not None:
+            # Same packets as passthrough recordings and live view: no second RTSP session for audio
+            audio_q = queue.Queue(maxsize=1500)
+            reason = getattr(self, 'current_recording_reason', 'unknown').lower()
+            preroll = self.stream_reader.subscribe_packets(audio_q, pre_roll=self.pre_roll_seconds() if reason != 'continuous' else None)
+            reader = self.stream_reader
+            pending_audio.extend((reader.stream_to_wall(p.time_sec), p) for p in preroll if p.stream_type == 'audio')
+        try:
+            encoder = PyAVEncoder(full_path, target_w, target_h, fps, video_codec, crf, preset, audio_template=audio_template)
+            if event_callback:
+                event_callback(self.camera_id, 'recording_start', {"file_path": full_path, "width": width, "height": height})
+            while True:
+                try:
+                    item = q.get(timeout=1.0)
+                except queue.Empty:
+                    continue
+                if item is None:
+                    break
+                capture_time, frame_data = item
+                if self._segment_due(state):
+                    # A new encoder starts the next file with an IDR frame, no process to restart
+                    encoder.close()
+                    encoder = None
+                    full_path = self._next_segment(state, width, height, event_callback)
+                    encoder = PyAVEncoder(full_path, target_w, target_h, fps, video_codec, crf, preset, audio_template=audio_template)
+                if isinstance(frame_data, EncodedFrame):
+                    frame_data = frame_data.decode()
+                    if frame_data is None:
+                        continue
+                encoder.encode(frame_data, capture_time)
+                if audio_q is not None:
+                    self._mux_pending_audio(encoder, audio_q, pending_audio, capture_time)
+        except Exception as e:
+            logger.error(f"Camera {cam_name}: PyAV encoder writer died: {e}")
+            self.pyav_encoder_failed = True
+        finally:
+            if audio_q is not None:
+                self.stream_reader.unsubscribe_packets(audio_q)
+            if encoder:
+                try:
+                    encoder.close()
+                except Exception:
+                    pass
+            self._writer_exited(state)
+
+    def output_path(self, reason, when=None):
+        """Recording file path for `reason`, named after `when` (a datetime, default now)"""
+        format_str = self.config.get('movie_file_name', '%Y-%m-%d/%H-%M-%S').replace('%q', '00')
+        timestamp_path = (when or datetime.now()).strftime(format_str)
         
-        is_fallback_or_restart = (reason in ["Fallback", "Restart"])
+        # Determine output directory based on tiered storage configuration
+        base_dir = self.config.get('storage_path', '/var/lib/vibe/recordings')
+        if reason == "Motion" or reason == "motion":
+            base_dir = self.config.get('motion_storage_path') or base_dir
+        elif reason == "Continuous" or reason == "continuous":
+            base_dir = self.config.get('continuous_storage_path') or base_dir
+            
+        output_dir = os.path.join(base_dir, str(self.camera_id))
+        return os.path.join(output_dir, f"{timestamp_path}.mp4")
+
+    def start_recording(self, width, height, pre_buffer_frames, event_callback=None, reason="Manual", trigger_source=None):
+        is_fallback_or_restart = (reason in ["Fallback", "Restart", "Overload"])
         if not is_fallback_or_restart:
             self.current_recording_reason = reason
             
@@ -416,18 +819,7 @@ class RecordingManager:
         
         if event_callback is not None:
             self.last_event_callback = event_callback
-        format_str = self.config.get('movie_file_name', '%Y-%m-%d/%H-%M-%S').replace('%q', '00')
-        timestamp_path = datetime.now().strftime(format_str)
-        
-        # Determine output directory based on tiered storage configuration
-        base_dir = self.config.get('storage_path', '/var/lib/vibe/recordings')
-        if actual_reason == "Motion" or actual_reason == "motion":
-            base_dir = self.config.get('motion_storage_path') or base_dir
-        elif actual_reason == "Continuous" or actual_reason == "continuous":
-            base_dir = self.config.get('continuous_storage_path') or base_dir
-            
-        output_dir = os.path.join(base_dir, str(self.camera_id))
-        full_path = os.path.join(output_dir, f"{timestamp_path}.mp4")
+        full_path = self.output_path(actual_reason)
         os.makedirs(os.path.dirname(full_path), exist_ok=True)
         
         trigger_info = f" (Trigger: {trigger_source})" if trigger_source else ""
@@ -439,75 +831,168 @@ class RecordingManager:
         elif reason == "Restart":
             self.passthrough_active = self.config.get('movie_passthrough', False)
             self.current_recording_method = "passthrough (restart)" if self.passthrough_active else "transcoded (restart)"
+        elif reason == "Overload":
+            self.passthrough_active = True
+            self.current_recording_method = "passthrough (overload)"
         else:
             self.passthrough_active = self.config.get('movie_passthrough', False)
             self.current_recording_method = "passthrough" if self.passthrough_active else "transcoded"
+        self.encoder_backend = None if self.passthrough_active else self._select_encoder_backend()
         
-        if self.passthrough_active:
-            return self._start_passthrough_recording(full_path, width, height, event_callback)
+        # Continuous recordings keep one writer that cuts segments at keyframes
+        self.segmenting = actual_reason.lower() == 'continuous'
+        self.segment_length = self.max_segment_length() if self.segmenting else 0
 
-        return self._start_transcoded_recording(full_path, width, height, pre_buffer_frames, event_callback)
+        self.recording_start_time = time.time()
+        state = RecordingState(full_path, self.recording_start_time, actual_reason, self.current_recording_method, self.segmenting)
+        if self.passthrough_active:
+            started = self._start_passthrough_recording(state, width, height, event_callback)
+        else:
+            started = self._start_transcoded_recording(state, width, height, pre_buffer_frames, event_callback)
+        if started and self.segment_listener:
+            self.segment_listener.segment_started(full_path, self.segment_start_time)
+        return started
 
     def stop_recording(self, event_callback=None, width=0, height=0):
-        if not self.is_recording: return
+        """Signal the writer and return at once; the file is closed and reported on the finalizer pool.
+
+        Returns the Future of the finalization ('recording_end' is emitted when the file is closed).
+        """
+        if not self.is_recording: return None
         logger.info(f"[RECORDING] Camera {self.camera_name} (ID: {self.camera_id}): Stop Recording")
         
         self.is_recording = False
+        stopped_at = time.time()
+        state = self.recording
+        with state.lock:
+            state.stop = (stopped_at, width, height, event_callback)
+            # In-process and passthrough writers report their last file when they exit (unless already gone)
+            report = not state.writer_reports or state.closed
         
+        writer = getattr(self, 'writer_thread', None)
+        process = None
         if self.passthrough_active:
-            if hasattr(self, 'passthrough_queue'):
-                try:
-                    self.passthrough_queue.put_nowait(None)
-                except queue.Full:
-                    pass
-            if hasattr(self, 'writer_thread') and self.writer_thread:
-                self.writer_thread.join(timeout=10.0)
+            q, timeout = getattr(self, 'passthrough_queue', None), 10.0
+        elif self.encoder_backend == 'pyav':
+            q, timeout = getattr(self, 'frame_queue', None), 30.0
         elif self.recording_process:
-            # Signal writer thread to stop and wait for it to flush
-            if hasattr(self, 'frame_queue'):
-                try:
-                    self.frame_queue.put_nowait(None)
-                except queue.Full:
-                    pass
-            if hasattr(self, 'writer_thread') and self.writer_thread:
-                self.writer_thread.join(timeout=30.0)
-                
-            # The writer thread automatically closes stdin when it finishes processing the queue.
+            q, timeout = getattr(self, 'frame_queue', None), 30.0
+            process, self.recording_process = self.recording_process, None
+        else:
+            q = writer = None
+        if q is not None:
+            # Signal writer thread to stop and flush
+            try:
+                q.put_nowait(None)
+            except queue.Full:
+                pass
+
+        monitor, self.segment_monitor = self.segment_monitor, None
+        self.finalizing = finalizer.submit(self._finalize_recording, writer, timeout if writer else 0, process, monitor,
+                                           state if report else None)
+        return self.finalizing
+
+    def _finalize_recording(self, writer, timeout, process, monitor, state):
+        """Finalizer pool: wait until the writer (and FFmpeg) closed the file, then validate and report it.
+
+        `state` is None when the writer reports its last file itself.
+        """
+        if writer:
+            writer.join(timeout=timeout)
+        if process:
+            # The writer thread closes stdin when it finishes processing the queue.
             # Now we just wait for FFmpeg to finalize the moov atom (+faststart index).
-
-            try: self.recording_process.wait(timeout=15)
+            try: process.wait(timeout=15)
             except subprocess.TimeoutExpired:
                 logger.warning(f"Camera {self.camera_name}: FFmpeg did not finish in 15s, killing process")
-                self.recording_process.kill()
-            self.recording_process = None
-        
-        time.sleep(0.5)
-        
+                process.kill()
+
+        if monitor is not None:
+            # The segment monitor renamed and reported every segment, the last one included
+            monitor.join(timeout=15.0)
+            return
+
+        if state is not None:
+            time.sleep(0.5)
+            self._finish_segment(state, *state.stop)
+
+    def _writer_exited(self, state):
+        """A writer closed its last file: report it if the recording was stopped, else stop_recording() will"""
+        with state.lock:
+            state.closed = True
+            stop = state.stop if state.writer_reports else None
+        if stop is not None:
+            self._finish_segment(state, *stop)
+
+    def wait_finalized(self, timeout=60.0):
+        """Block until the last stopped recording of this manager is closed and reported"""
+        pending = self.finalizing
+        if pending is not None:
+            wait([pending], timeout=timeout)
+        reports = list(self.reports)
+        if reports:
+            wait(reports, timeout=timeout)
+
+    def _next_segment(self, state, width, height, event_callback, start_time=None):
+        """Report the file a long-lived writer just closed and name the one it opens next"""
+        now = start_time or time.time()
+        finished = state.segment
+        full_path = self.output_path(state.reason, datetime.fromtimestamp(now))
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        state.segment = RecordingSegment(full_path, now)
+        if state.stop is None:
+            logger.info(f"[RECORDING] Camera {self.camera_name} (ID: {self.camera_id}): Next segment {full_path}")
+
+        if self._validate_segment(finished, now) and event_callback:
+            # Probing the closed file and writing its thumbnail would stall this writer thread
+            future = finalizer.submit(self._report_segment, finished, width, height, event_callback, state.reason, state.method)
+            self.reports.add(future)
+            future.add_done_callback(self.reports.discard)
+        if self.segment_listener:
+            self.segment_listener.segment_started(full_path, now)
+        if event_callback and state.stop is None:
+            event_callback(self.camera_id, 'recording_start', {"file_path": full_path, "width": width, "height": height})
+        return full_path
+
+    def _finish_segment(self, state, end_time, width, height, event_callback):
+        """Validate and report the file a recording ended with"""
+        segment = state.segment
+        valid_recording = self._validate_segment(segment, end_time)
+        if valid_recording and event_callback:
+            self._report_segment(segment, width, height, event_callback, state.reason, state.method)
+        return valid_recording
+
+    def _validate_segment(self, segment, end_time):
+        """Discard a short/empty file; tells the segment listener either way"""
+        path = segment.path
         valid_recording = False
-        if self.recording_filename and os.path.exists(self.recording_filename):
+        if path and os.path.exists(path):
             try:
-                duration = time.time() - self.recording_start_time
-                if duration < 2.0 or os.path.getsize(self.recording_filename) < 1024:
-                    os.remove(self.recording_filename)
+                duration = end_time - segment.start_time
+                if duration < 2.0 or os.path.getsize(path) < 1024:
+                    os.remove(path)
                     logger.info(f"Camera {self.camera_name} (ID: {self.camera_id}): Discarded short/empty recording ({duration:.1f}s)")
                 else:
                     valid_recording = True
             except OSError as e:
-                logger.warning(f"Camera {self.camera_name} (ID: {self.camera_id}): Error validating or removing recording {self.recording_filename}: {e}")
+                logger.warning(f"Camera {self.camera_name} (ID: {self.camera_id}): Error validating or removing recording {path}: {e}")
 
-        ai_meta_str = None
-        if self.current_ai_detections:
-            ai_meta_str = ",".join(self.current_ai_detections)
+        if self.segment_listener:
+            self.segment_listener.segment_finished(path, end_time, valid_recording)
+        return valid_recording
 
-        if valid_recording and event_callback:
-             reason = getattr(self, 'current_recording_reason', 'unknown')
-             method = getattr(self, 'current_recording_method', 'unknown')
-
-             event_callback(self.camera_id, 'recording_end', {
-                 "file_path": self.recording_filename, 
-                 "width": width, 
-                 "height": height,
-                 "ai_metadata": ai_meta_str,
-                 "reason": reason,
-                 "method": method
-             })
+    def _report_segment(self, segment, width, height, event_callback, reason, method):
+        """recording_end event of a valid file, with its metadata"""
+        ai_meta_str = None
+        if segment.ai_detections:
+            ai_meta_str = ",".join(segment.ai_detections)
+
+        event_callback(self.camera_id, 'recording_end', {
+            "file_path": segment.path,
+            "width": width,
+            "height": height,
+            "ai_metadata": ai_meta_str,
+            "reason": reason,
+            "method": method,
+            **self._recording_metadata(segment.path, segment.thumbnail)
+        })
@@ -0,0 +1,74 @@
+import os
+import logging
+
+import av
+import cv2
+
+logger = logging.getLogger(__name__)
+
+# Same thumbnail the backend used to render with `ffmpeg -ss 1 -vframes 1 -vf scale=320:-1`
+THUMBNAIL_WIDTH = 320
+THUMBNAIL_OFFSET = 1.0
+THUMBNAIL_QUALITY = 85
+
+def thumbnail_frame(frame):
+    """Downscaled copy of a BGR frame, kept in memory until the recording is closed"""
+    height, width = frame.shape[:2]
+    if width <= THUMBNAIL_WIDTH:
+        return frame.copy()
+    thumb_h = max(2, int(height * THUMBNAIL_WIDTH / width))
+    return cv2.resize(frame, (THUMBNAIL_WIDTH, thumb_h), interpolation=cv2.INTER_AREA)
+
+def write_thumbnail(frame, video_path):
+    """Write `frame` as the JPEG next to the recording (same name, .jpg); returns its path or None"""
+    if frame is None:
+        return None
+    thumb_path = f"{os.path.splitext(video_path)[0]}.jpg"
+    ok, jpeg = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), THUMBNAIL_QUALITY])
+    if not ok:
+        return None
+    try:
+        with open(thumb_path, 'wb') as f:
+            f.write(jpeg.tobytes())
+    except OSError as e:
+        logger.warning(f"Could not write thumbnail {thumb_path}: {e}")
+        return None
+    return thumb_path
+
+def thumbnail_from_file(path):
+    """Decode the keyframe at about THUMBNAIL_OFFSET (for files the engine has no frame of, e.g. remuxed clips)"""
+    with av.open(path) as inp:
+        stream = inp.streams.video[0]
+        if THUMBNAIL_OFFSET and stream.time_base:
+            try:
+                inp.seek(int(THUMBNAIL_OFFSET / stream.time_base), stream=stream, backward=True, any_frame=False)
+            except av.error.FFmpegError:
+                pass
+        for frame in inp.decode(stream):
+            return thumbnail_frame(frame.to_ndarray(format='bgr24'))
+    return None
+
+def probe_recording(path):
+    """Duration, video codec, keyframe count and size of a finished recording.
+
+    Only demuxes (reads packet headers and timestamps); nothing is decoded.
+    """
+    info = {"duration": None, "codec": None, "keyframes": 0, "file_size": os.path.getsize(path)}
+    with av.open(path) as inp:
+        if not inp.streams.video:
+            return info
+        stream = inp.streams.video[0]
+        info["codec"] = stream.codec_context.name
+        first = last = None
+        for packet in inp.demux(stream):
+            if packet.pts is None:
+                continue
+            if packet.is_keyframe:
+                info["keyframes"] += 1
+            start = packet.pts
+            end = packet.pts + (packet.duration or 0)
+            first = start if first is None else min(first, start)
+            last = end if last is None else max(last, end)
+        if first is not None:
+            info["duration"] = round(float((last - first) * stream.time_base), 3)
+    return info
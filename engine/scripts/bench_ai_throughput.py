@@ -0,0 +1,98 @@
+"""AI inference throughput vs. number of cameras on CPU.
+
+Runs the real AIDetector path (pre-processing, AIScheduler, invoke, post-
+processing) with CPU models. Every simulated camera thread submits a frame,
+waits for its detections and submits the next one, with no fps budget, so the
+scheduler is always saturated. For each model it compares:
+  serial  one interpreter (the former single inference thread)
+  pool    cpu_pool_layout() with --interpreters (0 = auto, as in the engine)
+and reports total inferences/s, the slowest camera's rate and the mean
+latency from submit to detections.
+
+Needs tflite_runtime and the CPU models in models/ (downloaded by the engine
+image build).
+
+Usage (from the engine directory):
+    python scripts/bench_ai_throughput.py [--cameras 1 2 4 8 16] [--seconds 5] [--interpreters 0] [--image frame.jpg]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import ai_detector
+from ai_detector import AIDetector, cpu_pool_layout
+
+MODELS = ("mobilenet_ssd_v2", "yolo_v8")
+DETECT_CONFIG = {"ai_threshold": 0.5, "ai_object_types": ["person", "vehicle"]}
+
+def load(detector, model_type, interpreters):
+    detector.config.update({"ai_model": model_type, "ai_hardware": "cpu", "opt_ai_cpu_interpreters": interpreters})
+    detector._load_model(force_cpu=True)
+    return detector.interpreter is not None and detector.model_type == model_type
+
+def run_cameras(detector, frame, cameras, seconds):
+    counts = [0] * cameras
+    latency = [0.0] * cameras
+    stop = time.monotonic() + seconds
+
+    def camera(index):
+        while time.monotonic() < stop:
+            start = time.monotonic()
+            future = detector.submit(frame, camera_id=index, config=DETECT_CONFIG)
+            if future is None:
+                return
+            future.result(timeout=30)
+            end = time.monotonic()
+            if end > stop:
+                return  # Only count what completed within the window
+            latency[index] += end - start
+            counts[index] += 1
+
+    threads = [threading.Thread(target=camera, args=(i,)) for i in range(cameras)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for i in range(cameras):
+        detector.scheduler.remove(i)
+    total = sum(counts)
+    return total / seconds, min(counts) / seconds, (sum(latency) / total * 1000) if total else 0.0
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cameras", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--interpreters", type=int, default=0, help="pool size (0 = auto)")
+    parser.add_argument("--image", help="frame to detect on (default: synthetic 1280x720)")
+    args = parser.parse_args()
+
+    if not ai_detector.HAS_TFLITE:
+        sys.exit("tflite_runtime is not installed")
+    frame = cv2.imread(args.image) if args.image else np.random.default_rng(0).integers(0, 255, (720, 1280, 3), dtype=np.uint8)
+
+    detector = AIDetector(config={"ai_enabled": False, "opt_ai_fps_budget": 0})
+    detector._enabled = True
+    pool_size, threads = cpu_pool_layout(args.interpreters)
+    layouts = (("serial", 1), ("pool", args.interpreters))
+    print(f"{os.cpu_count()} cores; pool: {pool_size} interpreters x {threads} threads; {args.seconds:.0f}s per run")
+    print(f"{'model':<17} {'layout':<7} {'cameras':>7} {'infer/s':>8} {'min cam/s':>10} {'latency ms':>11}")
+    for model_type in MODELS:
+        for name, interpreters in layouts:
+            if name == "pool" and pool_size == 1:
+                continue  # Same as serial on this machine
+            if not load(detector, model_type, 1 if name == "serial" else interpreters):
+                print(f"{model_type:<17} {name:<7} skipped: CPU model not available")
+                continue
+            for cameras in args.cameras:
+                rate, slowest, latency_ms = run_cameras(detector, frame, cameras, args.seconds)
+                print(f"{model_type:<17} {name:<7} {cameras:>7} {rate:>8.1f} {slowest:>10.1f} {latency_ms:>11.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Per-frame cost of turning a decoded frame into the camera loop's working image.
+
+Compares the legacy path (full-resolution bgr24 conversion, frame.copy(),
+cv2.resize, cv2.rotate) with frame_pipeline.convert_frame (one fused swscale
+pass + rotation on the scaled image).
+
+Usage (from the engine directory):
+    python scripts/bench_frame_pipeline.py [--iterations 50]
+"""
+import argparse
+import os
+import sys
+import time
+
+import av
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from frame_pipeline import convert_frame  # noqa: E402
+
+CASES = [
+    # (label, source size, target size, rotation)
+    ("1080p -> 1280x720", (1920, 1080), (1280, 720), 0),
+    ("1080p -> 1080p", (1920, 1080), (1920, 1080), 0),
+    ("1080p -> 1280x720 rot90", (1920, 1080), (1280, 720), 90),
+    ("4K -> 1920x1080", (3840, 2160), (1920, 1080), 0),
+    ("4K -> 4K", (3840, 2160), (3840, 2160), 0),
+    ("4K -> 1920x1080 rot180", (3840, 2160), (1920, 1080), 180),
+]
+
+def legacy_path(frame, target_w, target_h, rotation):
+    img = frame.to_ndarray(format='bgr24')
+    img = img.copy()
+    if img.shape[1] != target_w or img.shape[0] != target_h:
+        img = cv2.resize(img, (target_w, target_h))
+    if rotation == 90: img = cv2.rotate(img, cv2.ROTATE_90_CLOCKWISE)
+    elif rotation == 180: img = cv2.rotate(img, cv2.ROTATE_180)
+    elif rotation == 270: img = cv2.rotate(img, cv2.ROTATE_90_COUNTERCLOCKWISE)
+    return img
+
+def make_frame(width, height):
+    rng = np.random.default_rng(0)
+    img = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    return av.VideoFrame.from_ndarray(img, format='bgr24').reformat(format='yuv420p')
+
+def time_it(fn, iterations):
+    fn()  # warm up swscale contexts / allocator
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1000.0
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    cv2.setNumThreads(1)  # Camera threads share cores; compare single-thread cost
+    print(f"{'case':<28} {'legacy ms':>10} {'fused ms':>10} {'speedup':>8}")
+    for label, (sw, sh), (tw, th), rot in CASES:
+        frame = make_frame(sw, sh)
+        legacy = time_it(lambda: legacy_path(frame, tw, th, rot), args.iterations)
+        fused = time_it(lambda: convert_frame(frame, tw, th, rot), args.iterations)
+        print(f"{label:<28} {legacy:>10.2f} {fused:>10.2f} {legacy / fused:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Accuracy / CPU comparison: motion-vector motion detection vs. MOG2.
+
+For every clip the script decodes the video twice:
+  * MOG2 path  - full decode, BGR conversion (what the camera loop needs for the
+                 OpenCV engine), 180p luma plane, MOG2 every Nth frame
+  * MV path    - decode with export_mvs, no pixel conversion, MotionVectorAnalyzer
+and reports CPU seconds per path plus agreement of the per-window motion
+decisions. With no clip arguments a synthetic clip with known motion intervals
+is generated, so precision/recall against ground truth is reported as well.
+
+Usage (from the engine directory):
+    python scripts/bench_mv_motion.py [clip.mp4 ...] [--threshold 1.0] [--window 3] [--min-magnitude 2]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import av
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from frame_pipeline import convert_frame, motion_plane  # noqa: E402
+from mv_motion import MotionVectorAnalyzer  # noqa: E402
+
+SYNTH_FPS = 15
+SYNTH_MOTION = [(60, 150), (240, 300)]  # frame intervals with a moving object
+
+def make_synthetic_clip(path, frames=360, width=1280, height=720):
+    rng = np.random.default_rng(1)
+    background = cv2.GaussianBlur(rng.integers(0, 255, (height, width, 3), dtype=np.uint8), (21, 21), 0)
+    # Textured "object" (a flat-coloured box only produces vectors along its edges)
+    sprite = cv2.GaussianBlur(rng.integers(0, 255, (240, 160, 3), dtype=np.uint8), (5, 5), 0)
+    container = av.open(path, 'w')
+    stream = container.add_stream('libx264', rate=SYNTH_FPS)
+    stream.width, stream.height, stream.pix_fmt = width, height, 'yuv420p'
+    stream.options = {'g': str(SYNTH_FPS * 2), 'bf': '0', 'preset': 'veryfast'}
+    for i in range(frames):
+        img = background.copy()
+        # Sensor noise on every frame so the still periods are not trivially static
+        noise = rng.integers(-4, 5, img.shape, dtype=np.int16)
+        img = np.clip(img.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+        for start, end in SYNTH_MOTION:
+            if start <= i < end:
+                x = int((i - start) * (width - 160) / (end - start))
+                img[height // 3:height // 3 + 240, x:x + 160] = sprite
+        for packet in stream.encode(av.VideoFrame.from_ndarray(img, format='bgr24')):
+            container.mux(packet)
+    for packet in stream.encode():
+        container.mux(packet)
+    container.close()
+
+def run_mog2(path, window, threshold, height=180):
+    fgbg = cv2.createBackgroundSubtractorMOG2(history=200, varThreshold=25, detectShadows=False)
+    decisions = []
+    container = av.open(path)
+    stream = container.streams.video[0]
+    stream.thread_type = 'AUTO'
+    start = time.process_time()
+    n = 0
+    for frame in container.decode(stream):
+        n += 1
+        convert_frame(frame)  # The OpenCV engine always needs the display frame
+        if n % window:
+            continue
+        plane = motion_plane(frame, height)
+        mask = fgbg.apply(plane)
+        _, mask = cv2.threshold(mask, 200, 255, cv2.THRESH_BINARY)
+        decisions.append((n, np.count_nonzero(mask) / mask.size * 100 > threshold))
+    cpu = time.process_time() - start
+    container.close()
+    return cpu, n, decisions
+
+def run_mv(path, window, threshold, min_magnitude):
+    analyzer = MotionVectorAnalyzer(window=window, min_magnitude=min_magnitude)
+    decisions = []
+    container = av.open(path)
+    stream = container.streams.video[0]
+    stream.thread_type = 'AUTO'
+    stream.codec_context.flags2 |= av.codec.context.Flags2.export_mvs
+    start = time.process_time()
+    n = 0
+    for frame in container.decode(stream):
+        n += 1
+        if frame.key_frame:
+            continue
+        mvs = frame.side_data.get('MOTION_VECTORS')
+        analyzer.feed(mvs.to_ndarray() if mvs is not None else None, frame.width, frame.height, n)
+        sample = analyzer.consume()
+        if sample is not None:
+            decisions.append((n, sample[0] > threshold))
+    cpu = time.process_time() - start
+    container.close()
+    return cpu, n, decisions
+
+def to_timeline(decisions, frames, window):
+    """Expand per-window decisions to a per-frame boolean array"""
+    timeline = np.zeros(frames + 1, dtype=bool)
+    for n, moving in decisions:
+        if moving:
+            timeline[max(0, n - window + 1):n + 1] = True
+    return timeline[1:]
+
+def score(pred, truth):
+    tp = np.count_nonzero(pred & truth)
+    precision = tp / max(1, np.count_nonzero(pred))
+    recall = tp / max(1, np.count_nonzero(truth))
+    return precision, recall
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("clips", nargs="*")
+    parser.add_argument("--threshold", type=float, default=1.0, help="Percent of moving area/macroblocks")
+    parser.add_argument("--min-magnitude", type=float, default=MotionVectorAnalyzer().min_magnitude, help="Pixels a block must move")
+    parser.add_argument("--window", type=int, default=3, help="Frames per decision (opt_motion_fps_throttle)")
+    args = parser.parse_args()
+
+    cv2.setNumThreads(1)
+    clips = [(c, None) for c in args.clips]
+    tmpdir = None
+    if not clips:
+        tmpdir = tempfile.TemporaryDirectory()
+        path = os.path.join(tmpdir.name, "synthetic.mp4")
+        print("Generating synthetic 1280x720 clip...")
+        make_synthetic_clip(path)
+        clips = [(path, SYNTH_MOTION)]
+
+    for path, truth_intervals in clips:
+        mog_cpu, frames, mog_dec = run_mog2(path, args.window, args.threshold)
+        mv_cpu, _, mv_dec = run_mv(path, args.window, args.threshold, args.min_magnitude)
+        mog = to_timeline(mog_dec, frames, args.window)
+        mv = to_timeline(mv_dec, frames, args.window)
+        print(f"\n{os.path.basename(path)}: {frames} frames")
+        print(f"  CPU   MOG2 path {mog_cpu:6.2f}s ({mog_cpu / frames * 1000:5.2f} ms/frame)"
+              f"   MV path {mv_cpu:6.2f}s ({mv_cpu / frames * 1000:5.2f} ms/frame)   {mog_cpu / mv_cpu:4.1f}x")
+        print(f"  Agreement MV vs MOG2: {np.mean(mog == mv) * 100:5.1f}% of frames")
+        if truth_intervals:
+            truth = np.zeros(frames, dtype=bool)
+            for start, end in truth_intervals:
+                truth[start:end] = True
+            for label, pred in (("MOG2", mog), ("MV", mv)):
+                p, r = score(pred, truth)
+                print(f"  {label:<5} precision {p:5.2f}  recall {r:5.2f}")
+
+    if tmpdir:
+        tmpdir.cleanup()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""CPU and memory traffic of the transcoded recording encoders.
+
+Feeds the same synthetic BGR frames (what CameraThread queues for a transcoded
+recording) to:
+  pipe-only  tobytes() + write to a `cat > /dev/null` process: the copy/pipe
+             overhead alone, without any encoding
+  ffmpeg     the subprocess backend: `ffmpeg -f rawvideo -pix_fmt bgr24 -i -`
+             with the same libx264 options as _launch_transcoded_ffmpeg
+             (skipped when no ffmpeg binary is installed)
+  pyav       pyav_encoder.PyAVEncoder in-process
+Each mode runs in its own process so peak RSS is not shared. CPU is user+sys
+of the benchmark process plus its children (the FFmpeg/cat process).
+
+Usage (from the engine directory):
+    python scripts/bench_recording_encoder.py [--width 1920 --height 1080] [--frames 150]
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+FPS = 15
+CRF = 26  # movie_quality 75
+MODES = ("pipe-only", "ffmpeg", "pyav")
+
+def make_frames(width, height, count=8):
+    """A few textured frames with motion; cycled so generation is not measured"""
+    y, x = np.mgrid[0:height, 0:width]
+    frames = []
+    for i in range(count):
+        base = ((x + 12 * i) ^ (y // 2)) & 0xFF
+        frame = np.dstack([base, (base + 85) & 0xFF, (base * 3) & 0xFF]).astype(np.uint8)
+        frames.append(frame)
+    return frames
+
+def cpu_seconds():
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime, children.ru_utime + children.ru_stime
+
+def run_mode(mode, width, height, count, out_dir):
+    frames = make_frames(width, height)
+    out_path = os.path.join(out_dir, f"{mode}.mp4")
+    copied = 0
+    cpu0 = cpu_seconds()
+    start = time.perf_counter()
+    if mode in ("pipe-only", "ffmpeg"):
+        if mode == "pipe-only":
+            command = ['sh', '-c', 'cat > /dev/null']
+        else:
+            command = ['ffmpeg', '-y', '-loglevel', 'error', '-f', 'rawvideo', '-vcodec', 'rawvideo',
+                       '-s', f'{width}x{height}', '-pix_fmt', 'bgr24', '-r', str(FPS), '-i', '-', '-an',
+                       '-c:v', 'libx264', '-preset', 'ultrafast', '-crf', str(CRF), '-threads', '2',
+                       '-pix_fmt', 'yuv420p', '-movflags', '+faststart', out_path]
+        proc = subprocess.Popen(command, stdin=subprocess.PIPE)
+        for i in range(count):
+            data = frames[i % len(frames)].tobytes()
+            # tobytes() copy + kernel copy into the pipe + the reader's copy out of it
+            copied += 3 * len(data)
+            proc.stdin.write(data)
+        proc.stdin.close()
+        proc.wait()
+    else:
+        from pyav_encoder import PyAVEncoder
+        encoder = PyAVEncoder(out_path, width, height, FPS, 'libx264', CRF, 'ultrafast')
+        for i in range(count):
+            encoder.encode(frames[i % len(frames)], i / FPS)
+        encoder.close()
+    wall = time.perf_counter() - start
+    cpu1 = cpu_seconds()
+    return {
+        "mode": mode,
+        "wall_s": wall,
+        "cpu_self_s": cpu1[0] - cpu0[0],
+        "cpu_child_s": cpu1[1] - cpu0[1],
+        "copied_mb": copied / 1e6,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "file_kb": os.path.getsize(out_path) / 1024 if os.path.exists(out_path) else 0,
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--frames", type=int, default=150)
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        with tempfile.TemporaryDirectory() as out_dir:
+            print(json.dumps(run_mode(args.mode, args.width, args.height, args.frames, out_dir)))
+        return
+
+    frame_mb = args.width * args.height * 3 / 1e6
+    print(f"{args.width}x{args.height} bgr24 ({frame_mb:.1f} MB/frame), {args.frames} frames, libx264 ultrafast crf {CRF}")
+    print(f"{'mode':<10} {'wall s':>7} {'enc fps':>8} {'CPU ms/frame':>13} {'(self/child)':>14} {'copied MB':>10} {'peak RSS MB':>12} {'file KB':>8}")
+    for mode in MODES:
+        if mode == "ffmpeg" and not shutil.which("ffmpeg"):
+            print(f"{mode:<10} skipped: no ffmpeg binary")
+            continue
+        out = subprocess.run([sys.executable, __file__, "--mode", mode, "--width", str(args.width),
+                              "--height", str(args.height), "--frames", str(args.frames)],
+                             capture_output=True, text=True, check=True)
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        cpu = r["cpu_self_s"] + r["cpu_child_s"]
+        split = f"{r['cpu_self_s'] * 1000 / args.frames:.1f}/{r['cpu_child_s'] * 1000 / args.frames:.1f}"
+        print(f"{mode:<10} {r['wall_s']:>7.2f} {args.frames / r['wall_s']:>8.1f} {cpu * 1000 / args.frames:>13.1f} {split:>14}"
+              f" {r['copied_mb']:>10.0f} {r['peak_rss_mb']:>12.0f} {r['file_kb']:>8.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Event-loop cost of delivering camera packets to WebSocket viewers.
+
+A producer thread plays the StreamReader role (25 fps video + ~47 audio
+packets/s per camera) while N simulated viewers on one asyncio loop await their
+queues, like the /cameras/{id}/ws endpoint. Compares the legacy delivery (one
+call_soon_threadsafe per packet per viewer) with ws_delivery.LoopDispatcher
+(one wakeup per batch) and reports the CPU time of the loop and reader threads, the number of
+loop wakeups and the added delivery latency.
+
+Usage (from the engine directory):
+    python scripts/bench_ws_delivery.py [--viewers 50] [--cameras 1] [--seconds 10]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import struct
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from shared_packet import WS_AUDIO, WS_VIDEO, ws_header  # noqa: E402
+from ws_delivery import LoopDispatcher, WSClient  # noqa: E402
+
+VIDEO_FPS = 25
+AUDIO_PPS = 47  # AAC 48 kHz: 1024 samples per packet
+
+def producer(mode, loop, dispatcher, queues, seconds, stop, cpu_out):
+    """Emit video/audio packets on their own schedule; header timestamp = send time"""
+    cpu_start = time.thread_time()
+    interval = 1.0 / (VIDEO_FPS + AUDIO_PPS)
+    deadline = time.perf_counter() + seconds
+    next_t = time.perf_counter()
+    n = 0
+    while time.perf_counter() < deadline and not stop.is_set():
+        video = n % (VIDEO_FPS + AUDIO_PPS) < VIDEO_FPS
+        payload = ws_header(WS_VIDEO if video else WS_AUDIO, int(n % (2 * (VIDEO_FPS + AUDIO_PPS)) == 0),
+                            time.perf_counter()) + bytes(64)
+        n += 1
+        if mode == "legacy":
+            for q in queues:
+                if not q.full():
+                    loop.call_soon_threadsafe(q.put_nowait, payload)
+        else:
+            dispatcher.publish(queues, payload)
+        next_t += interval
+        time.sleep(max(0.0, next_t - time.perf_counter()))
+    cpu_out.append(time.thread_time() - cpu_start)
+
+async def viewer(q, latencies):
+    while True:
+        payload = await q.get()
+        latencies.append(time.perf_counter() - struct.unpack_from('<d', payload, 2)[0])
+        # Stand-in for websocket.send_bytes() yielding to the loop
+        await asyncio.sleep(0)
+
+async def run(mode, viewers, cameras, seconds):
+    loop = asyncio.get_running_loop()
+    dispatcher = LoopDispatcher(loop)
+    wakeups = [0]
+    if mode == "legacy":
+        original = loop.call_soon_threadsafe
+        def counting(*args, **kwargs):
+            wakeups[0] += 1
+            return original(*args, **kwargs)
+        loop.call_soon_threadsafe = counting
+
+    latencies = []
+    queues = [asyncio.Queue(maxsize=120) if mode == "legacy" else WSClient(maxsize=120)
+              for _ in range(viewers * cameras)]
+    tasks = [asyncio.create_task(viewer(q, latencies)) for q in queues]
+    stop = threading.Event()
+    producer_cpu = []
+    threads = [
+        threading.Thread(target=producer, args=(mode, loop, dispatcher,
+                         tuple(queues[c * viewers:(c + 1) * viewers]), seconds, stop, producer_cpu), daemon=True)
+        for c in range(cameras)
+    ]
+    cpu_start = time.thread_time()
+    for t in threads:
+        t.start()
+    while any(t.is_alive() for t in threads):
+        await asyncio.sleep(0.05)
+    await asyncio.sleep(0.2)  # Let the last batch drain
+    cpu = time.thread_time() - cpu_start
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    if mode != "legacy":
+        wakeups[0] = dispatcher.stats["wakeups"]
+    return cpu, sum(producer_cpu), wakeups[0], np.array(latencies) * 1000.0
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--viewers", type=int, default=50, help="Viewers per camera")
+    parser.add_argument("--cameras", type=int, default=1)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    packets = (VIDEO_FPS + AUDIO_PPS) * args.seconds * args.cameras
+    print(f"{args.cameras} camera(s) x {args.viewers} viewers, {args.seconds:.0f}s, ~{packets:.0f} packets per viewer set")
+    print(f"{'mode':<9} {'loop CPU %':>10} {'reader CPU %':>12} {'wakeups/s':>10} {'delivered':>10} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for mode in ("legacy", "batched"):
+        cpu, reader_cpu, wakeups, lat = asyncio.run(run(mode, args.viewers, args.cameras, args.seconds))
+        print(f"{mode:<9} {cpu / args.seconds * 100:>10.1f} {reader_cpu / args.seconds * 100:>12.1f} {wakeups / args.seconds:>10.0f} {len(lat):>10}"
+              f" {np.percentile(lat, 50):>8.2f} {np.percentile(lat, 99):>8.2f} {lat.max():>8.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Per-frame cost of the YOLOv8 post-processing in AIDetector.detect().
+
+Decodes the same output tensor with:
+  per-row     the former loop: dequantize, argmax and label check per anchor
+  vectorized  ai_detector.yolov8_candidates(): max over all anchors, threshold
+              mask, argmax only on the anchors above the threshold, class mask
+Both are followed by the same cv2.dnn.NMSBoxes() call, timed separately.
+
+The tensor is, in order of preference:
+  --tensor out.npy   an output recorded from a model (e.g. with np.save() on
+                     raw_outputs[0][0]), with its --scale/--zero quantization
+  --model + --image  recorded here by running the .tflite model on an image
+                     (needs tflite_runtime)
+  synthetic          int8 (84, 8400) like yolov8n at 640x640: background noise
+                     and --objects confident anchors
+
+Usage (from the engine directory):
+    python scripts/bench_yolo_postprocess.py [--tensor out.npy --scale 0.0039 --zero -128] [--runs 200]
+    python scripts/bench_yolo_postprocess.py --model models/yolov8n_full_integer_quant.tflite --image frame.jpg
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ai_detector import class_mask, yolov8_candidates
+
+LABELS_PATH = os.path.join(os.path.dirname(__file__), '..', 'models', 'yolo_labels.txt')
+VEHICLES = ["car", "truck", "bus", "motorcycle"]
+ALLOWED = ["person", "vehicle"]
+# person, bicycle, car, motorcycle, bus, truck, cat, dog: what a camera typically sees
+SCENE_CLASSES = (0, 1, 2, 3, 5, 7, 15, 16)
+
+def load_labels():
+    """`<id> <name>` lines, as AIDetector._load_labels() reads them"""
+    labels = {}
+    with open(LABELS_PATH) as f:
+        for line in f:
+            pair = line.split(maxsplit=1)
+            if len(pair) == 2 and pair[0].isdigit():
+                labels[int(pair[0])] = pair[1].strip()
+    return labels
+
+def synthetic_tensor(objects, num_classes=80, anchors=8400, seed=0):
+    rng = np.random.default_rng(seed)
+    output = rng.integers(-128, -100, size=(4 + num_classes, anchors), dtype=np.int8)
+    output[:4] = rng.integers(-128, 127, size=(4, anchors), dtype=np.int8)
+    # Each object lights up a cluster of neighbouring anchors, as a real detection does
+    for _ in range(objects):
+        start = int(rng.integers(0, anchors - 12))
+        output[4 + int(rng.choice(SCENE_CLASSES)), start:start + 12] = rng.integers(20, 127, 12, dtype=np.int8)
+    return output, 1 / 255, -128
+
+def record_tensor(model_path, image_path):
+    import tflite_runtime.interpreter as tflite
+    interpreter = tflite.Interpreter(model_path=model_path)
+    interpreter.allocate_tensors()
+    inp = interpreter.get_input_details()[0]
+    out = interpreter.get_output_details()[0]
+    height, width = inp['shape'][1:3]
+    image = cv2.cvtColor(cv2.resize(cv2.imread(image_path), (width, height)), cv2.COLOR_BGR2RGB)
+    if inp['dtype'] == np.float32:
+        image = image.astype(np.float32) / 255.0
+    elif inp['dtype'] == np.int8:
+        image = (image.astype(np.int16) - 128).astype(np.int8)
+    interpreter.set_tensor(inp['index'], image[np.newaxis])
+    interpreter.invoke()
+    scale, zero = out.get('quantization', (0.0, 0))
+    return interpreter.get_tensor(out['index'])[0], scale, zero
+
+def per_row(output, scale, zero, threshold, labels):
+    """The decode AIDetector.detect() used before yolov8_candidates()"""
+    if output.shape[0] < output.shape[1]:
+        output = output.T
+    boxes, scores, names = [], [], []
+    for row in output:
+        f_row = (row.astype(np.float32) - zero) * scale if (scale != 1.0 or zero != 0) else row.astype(np.float32)
+        scores_row = f_row[4:]
+        class_id = np.argmax(scores_row)
+        score = float(scores_row[class_id])
+        if score >= threshold:
+            label = labels.get(class_id, "unknown")
+            if label in ALLOWED or ("vehicle" in ALLOWED and label in VEHICLES):
+                xc, yc, bw, bh = f_row[0], f_row[1], f_row[2], f_row[3]
+                boxes.append([float(xc - bw/2), float(yc - bh/2), float(bw), float(bh)])
+                scores.append(score)
+                names.append(label)
+    return boxes, scores, names
+
+def vectorized(output, scale, zero, threshold, labels):
+    allowed = class_mask(labels, min(output.shape) - 4, ALLOWED, VEHICLES)
+    boxes, scores, class_ids = yolov8_candidates(output, scale, zero, threshold, allowed)
+    return boxes.tolist(), scores.tolist(), [labels.get(int(c), "unknown") for c in class_ids]
+
+def timed(fn, runs):
+    fn()
+    start = time.perf_counter()
+    for _ in range(runs):
+        result = fn()
+    return (time.perf_counter() - start) * 1000 / runs, result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tensor", help="recorded output tensor (.npy)")
+    parser.add_argument("--scale", type=float, default=1 / 255)
+    parser.add_argument("--zero", type=int, default=-128)
+    parser.add_argument("--model", help=".tflite YOLOv8 model to record a tensor with (with --image)")
+    parser.add_argument("--image")
+    parser.add_argument("--objects", type=int, default=8, help="confident objects in the synthetic tensor")
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.tensor:
+        output, scale, zero, source = np.load(args.tensor), args.scale, args.zero, args.tensor
+        if output.ndim == 3:
+            output = output[0]
+    elif args.model:
+        (output, scale, zero), source = record_tensor(args.model, args.image), args.model
+    else:
+        (output, scale, zero), source = synthetic_tensor(args.objects), "synthetic"
+    labels = load_labels()
+
+    print(f"{source}: {output.dtype} {output.shape}, scale {scale:.5f} zero {zero}, threshold {args.threshold}, {args.runs} runs")
+    print(f"{'decode':<11} {'ms/frame':>9} {'candidates':>11} {'NMS ms':>7} {'kept':>5}")
+    for name, fn in (("per-row", per_row), ("vectorized", vectorized)):
+        ms, (boxes, scores, _) = timed(lambda: fn(output, scale, zero, args.threshold, labels), args.runs)
+        nms_ms, kept = timed(lambda: cv2.dnn.NMSBoxes(boxes, scores, args.threshold, 0.45) if boxes else [], args.runs)
+        print(f"{name:<11} {ms:>9.2f} {len(scores):>11} {nms_ms:>7.3f} {len(kept):>5}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import struct
+import typing as t
+
+import av
+
+# WebSocket packet types (first header byte)
+WS_VIDEO = 0
+WS_AUDIO = 1
+WS_METADATA = 2
+
+# 10-byte WS header: Type (1b) + Keyframe (1b) + Timestamp (8b)
+_WS_HEADER = struct.Struct('<BBd')
+
+def ws_header(p_type: int, is_keyframe: int, time_sec: float) -> bytes:
+    return _WS_HEADER.pack(p_type, is_keyframe, time_sec)
+
+class SharedPacket:
+    """A demuxed packet built once by the StreamReader and referenced by every consumer.
+
+    Treat it as immutable: recorders, the pre-capture ring buffer and WebSocket
+    viewers all hold the same instance. The payload is a memoryview on the
+    av.Packet buffer (no copy), the WS header is computed once, and the WS
+    payload (header [+ SPS/PPS for keyframes] + data) is joined lazily, only
+    when viewers are connected. Consumers that must modify timing or the
+    output stream call clone() for a private av.Packet.
+    """
+    __slots__ = ('packet', 'payload', 'stream_type', 'is_keyframe', 'time_sec',
+                 'pts', 'dts', 'time_base', 'header', 'param_sets', '_ws_payload')
+
+    def __init__(self, packet, stream_type: str, is_keyframe: int, time_sec: float, param_sets: bytes = b''):
+        self.packet = packet
+        self.payload = memoryview(packet)
+        self.stream_type = stream_type
+        self.is_keyframe = is_keyframe
+        self.time_sec = time_sec
+        self.pts = packet.pts
+        self.dts = packet.dts
+        self.time_base = packet.time_base
+        self.header = ws_header(WS_VIDEO if stream_type == 'video' else WS_AUDIO, is_keyframe, time_sec)
+        # SPS/PPS prefix sent with video keyframes so a viewer can start decoding from them
+        self.param_sets = param_sets if (is_keyframe and stream_type == 'video') else b''
+        self._ws_payload: t.Optional[bytes] = None
+
+    def __len__(self):
+        return self.payload.nbytes
+
+    @property
+    def ws_payload(self) -> bytes:
+        """Bytes sent to WebSocket viewers; the reader builds them once and all viewers share them.
+
+        Only keyframes keep the joined copy (new viewers start from the last
+        one); for other packets it would just double the pre-capture buffer.
+        """
+        if self._ws_payload is not None:
+            return self._ws_payload
+        payload = b''.join((self.header, self.param_sets, self.payload))
+        if self.is_keyframe:
+            self._ws_payload = payload
+        return payload
+
+    def clone(self):
+        """Private av.Packet copy (single copy from the shared buffer) with the original timing"""
+        packet = av.Packet(self.payload)
+        packet.pts = self.pts
+        packet.dts = self.dts
+        # Without the flag the muxer writes no sync samples and the file cannot be seeked
+        packet.is_keyframe = bool(self.is_keyframe)
+        if self.time_base is not None:
+            packet.time_base = self.time_base
+        return packet
+
+def add_stream_like(container, template):
+    """Copy a stream's codec parameters into `container` (PyAV >= 16 dropped add_stream(template=))"""
+    if hasattr(container, 'add_stream_from_template'):
+        return container.add_stream_from_template(template)
+    return container.add_stream(template=template)
+
+def decoder_like(template):
+    """Private decoder with a stream's codec parameters, fed clone()s of its packets.
+
+    Every writer that re-encodes the audio needs its own: stateful decoders
+    (ADPCM, Opus) break when two writers feed the same packets into one context.
+    """
+    source = template.codec_context
+    decoder = av.CodecContext.create(source.name, 'r')
+    decoder.sample_rate = source.sample_rate
+    if source.channels:
+        decoder.layout = source.layout
+    if source.extradata:
+        decoder.extradata = source.extradata
+    return decoder
@@ -3,75 +3,331 @@ import time
 import threading
 import logging
 import os
-import struct
 import typing as t
-from collections import deque
 import queue
 from utils import mask_url
+from frame_pipeline import convert_frame, motion_plane
+from shared_packet import SharedPacket, WS_METADATA, ws_header
+from ws_delivery import get_dispatcher
+from packet_buffer import PacketRingBuffer
 
 logger = logging.getLogger(__name__)
 
+# Packet history kept beyond the pre-roll so it can start at a keyframe (longest expected GOP)
+MAX_GOP_SECONDS = 20.0
+
 class StreamReader(threading.Thread):
     """
     Dedicated thread for reading frames from RTSP stream using PyAV.
     """
-    def __init__(self, camera_id, url, camera_name="Unknown", event_callback=None, rtsp_transport="tcp"):
+    def __init__(self, camera_id, url, camera_name="Unknown", event_callback=None, rtsp_transport="tcp", decode_mode="demand",
+                 decode_threads=0, decode_thread_type="auto"):
         super().__init__(daemon=True)
         self.camera_id = camera_id
         self.url = url
         self.camera_name = camera_name
         self.event_callback = event_callback
         self.rtsp_transport = rtsp_transport
-        self.pre_buffer_duration = 10.0 # Will store up to 10s of packets
+        self.pre_roll = 0.0 # Seconds of packet history recordings may start with (captured_before)
         self.latest_frame = None
         self.last_read_time = 0.0
         self.lock = threading.Lock()
-        self.audio_decode_lock = threading.Lock()
+        # Signalled (under self.lock) whenever a new frame is published; frame_seq counts them
+        self.frame_ready = threading.Condition(self.lock)
+        self.frame_seq = 0
         self.running = False
         self.connected = False
         self.health_status: str = "STARTING"
         self.consecutive_failures: int = 0
         self.last_health_report_status = None
         self.ws_clients = set()
+        self.ws_routes = ()  # ((LoopDispatcher, (WSClient, ...)), ...)
         self.packet_subscribers = set()
-        self.packet_ring_buffer = deque() # Stores tuples: (packet, is_keyframe, time_sec)
+        self.packet_ring_buffer = PacketRingBuffer(max_duration=MAX_GOP_SECONDS, pre_roll=self.pre_roll)
         self.video_stream = None
         self.audio_stream = None
-        self.last_keyframe: t.Optional[bytes] = None
+        self.last_keyframe: t.Optional[SharedPacket] = None
         self.last_headers: bytes = b''
 
-    def add_ws_client(self, q, loop):
+        # Demand-paced decoding: consumers only need frames at `target_fps`, so
+        # non-reference frames are skipped in the decoder and reference frames are
+        # only converted to BGR when a consumer is due for a new frame. An idle
+        # camera decodes keyframes only.
+        self.decode_mode = decode_mode  # "demand" | "all"
+        self.target_fps = 0.0
+        self.decode_idle = False
+        self.keyframes_only = False # Decoder in skip_frame=NONKEY: seconds between frames on long GOPs
+        self.last_packet_time = 0.0 # Wall clock of the last demuxed video packet
+        self._decode_settings_dirty = True
+        self._await_keyframe = False
+        self._last_convert_time = 0.0
+        self.decode_stats = {"packets_demuxed": 0, "frames_decoded": 0, "frames_converted": 0}
+
+        # Output geometry applied at conversion time (0 = keep the stream size)
+        self.output_width = 0
+        self.output_height = 0
+        self.output_rotation = 0
+        # Grayscale motion plane published next to each frame (0 = disabled)
+        self.motion_height = 0
+        self.latest_motion_plane = None
+        # Compressed-domain motion: decoder exports motion vectors to this analyzer
+        self.mv_analyzer = None
+
+        # Decoder threading, applied when the stream is opened (0 threads = pick from resolution)
+        self.decode_threads = int(decode_threads or 0)
+        self.decode_thread_type = decode_thread_type
+        self.active_decode_threads = None  # (count, type) actually applied to the open decoder
+        # Decode lag: wall clock vs. stream PTS, relative to the smallest offset seen since connecting
+        self._pts_wall_offset = None
+        self.decode_lag = 0.0
+        self.decode_lag_max = 0.0
+        self._last_lag_warning = 0.0
+
+    def add_ws_client(self, client, loop):
+        """Attach a ws_delivery.WSClient owned by `loop`"""
         with self.lock:
-            self.ws_clients.add((q, loop))
-            if self.last_keyframe:
-                loop.call_soon_threadsafe(q.put_nowait, self.last_keyframe)
+            self.ws_clients.add((client, loop))
+            self._rebuild_ws_routes()
+            if self.last_keyframe is not None:
+                get_dispatcher(loop).publish((client,), self.last_keyframe.ws_payload)
 
-    def remove_ws_client(self, q):
+    def remove_ws_client(self, client):
         with self.lock:
-            to_remove = [c for c in self.ws_clients if c[0] == q]
+            to_remove = [c for c in self.ws_clients if c[0] == client]
             for c in to_remove:
                 self.ws_clients.remove(c)
+            self._rebuild_ws_routes()
+
+    def _rebuild_ws_routes(self):
+        """Group WS clients by event loop (caller holds self.lock)"""
+        by_loop = {}
+        for client, loop in self.ws_clients:
+            by_loop.setdefault(loop, []).append(client)
+        # Immutable snapshot: the reader thread iterates it without taking the lock
+        self.ws_routes = tuple((get_dispatcher(loop), tuple(clients)) for loop, clients in by_loop.items())
+
+    def _broadcast_ws(self, payload):
+        for dispatcher, clients in self.ws_routes:
+            dispatcher.publish(clients, payload)
+
+    def get_buffer_stats(self):
+        """Size of the pre-capture packet buffer (packets, bytes, keyframes, duration)"""
+        with self.lock:
+            return self.packet_ring_buffer.get_stats()
+
+    def get_ws_stats(self):
+        """Per-viewer send statistics (lag, drops, keyframe resyncs)"""
+        with self.lock:
+            clients = [c for c, _ in self.ws_clients]
+        return [c.get_stats() for c in clients]
+
+    def set_pre_roll(self, seconds):
+        """Size the packet history: `seconds` of pre-roll plus the GOP that covers it"""
+        seconds = max(0.0, float(seconds or 0))
+        with self.lock:
+            if seconds == self.pre_roll:
+                return
+            self.pre_roll = seconds
+            self.packet_ring_buffer.set_limits(max_duration=seconds + MAX_GOP_SECONDS, pre_roll=seconds)
+
+    def subscribe_packets(self, q: queue.Queue, pre_roll: t.Optional[float] = None):
+        """Receive every new packet on `q`.
 
-    def subscribe_packets(self, q: queue.Queue, include_prebuffer: bool = True):
+        With `pre_roll` (seconds), also returns the buffered packets starting at
+        the newest keyframe that covers it; the caller consumes that list before
+        the queue. Only references are collected under the lock.
+        """
         with self.lock:
             self.packet_subscribers.add(q)
-            if include_prebuffer:
-                # Push pre-buffer contents immediately to the new subscriber
-                for item in list(self.packet_ring_buffer):
-                    try:
-                        q.put_nowait(item[0]) # Put the av.Packet
-                    except queue.Full:
-                        pass
+            if pre_roll is None:
+                return []
+            return self.packet_ring_buffer.covering(pre_roll)
 
     def unsubscribe_packets(self, q: queue.Queue):
         with self.lock:
             if q in self.packet_subscribers:
                 self.packet_subscribers.remove(q)
 
+    def stream_to_wall(self, time_sec):
+        """Wall-clock time of a packet's stream time, using the PTS anchor of the decoded video"""
+        offset = self._pts_wall_offset
+        return time_sec + offset if offset is not None else time.time()
+
     def get_health(self):
         with self.lock:
             return self.health_status
 
+    def set_decode_demand(self, target_fps=None, idle=None, mode=None):
+        """Tell the reader how many frames its consumers actually need.
+
+        target_fps: rate at which decoded frames are converted for consumers (0 = every frame).
+        idle: when True, only keyframes are decoded (nobody is watching or analysing).
+        mode: "demand" (default) or "all" to restore decode-everything behaviour.
+        """
+        with self.lock:
+            if target_fps is not None:
+                self.target_fps = max(0.0, float(target_fps))
+            if idle is not None and bool(idle) != self.decode_idle:
+                self.decode_idle = bool(idle)
+                self._decode_settings_dirty = True
+            if mode is not None and mode != self.decode_mode:
+                self.decode_mode = mode
+                self._decode_settings_dirty = True
+
+    def set_output_geometry(self, width=0, height=0, rotation=0):
+        """Deliver frames already scaled to width x height and rotated, in a single conversion pass"""
+        with self.lock:
+            self.output_width = int(width or 0)
+            self.output_height = int(height or 0)
+            self.output_rotation = int(rotation or 0)
+
+    def set_motion_height(self, height=0):
+        """Publish a grayscale luma plane of `height` rows alongside each converted frame"""
+        with self.lock:
+            self.motion_height = int(height or 0)
+            if not self.motion_height:
+                self.latest_motion_plane = None
+
+    def set_mv_analyzer(self, analyzer=None):
+        """Feed decoder motion vectors to `analyzer` (see mv_motion.MotionVectorAnalyzer)"""
+        with self.lock:
+            toggled = (self.mv_analyzer is None) != (analyzer is None)
+            self.mv_analyzer = analyzer
+            self._decode_settings_dirty = True
+        if toggled and self.connected:
+            # export_mvs is a decoder open-time flag: reopen the stream to apply it
+            self.force_reconnect()
+
+    def set_decode_threading(self, threads=None, thread_type=None):
+        """Configure decoder threads. Takes effect on the next (re)connect, forced if already connected."""
+        with self.lock:
+            changed = False
+            if threads is not None and int(threads) != self.decode_threads:
+                self.decode_threads = int(threads)
+                changed = True
+            if thread_type is not None and thread_type != self.decode_thread_type:
+                self.decode_thread_type = thread_type
+                changed = True
+        if changed and self.connected:
+            logger.info(f"StreamReader ({self.camera_name}): Decoder threading changed, reconnecting")
+            self.force_reconnect()
+
+    def _apply_decode_threading(self, video_stream):
+        """Set thread count/type on the video decoder. Must run before the first packet is decoded."""
+        try:
+            ctx = video_stream.codec_context
+            threads = self.decode_threads
+            thread_type = {"frame": "FRAME", "slice": "SLICE"}.get(self.decode_thread_type)
+            if threads <= 0:
+                if ctx.width * ctx.height <= 1920 * 1088:
+                    # Up to 1080p FFmpeg's thread count keeps up; only a chosen thread type is applied
+                    if thread_type:
+                        ctx.thread_type = thread_type
+                    self.active_decode_threads = (ctx.thread_count, (thread_type or ctx.thread_type.name).lower())
+                    return
+                threads = min(4, os.cpu_count() or 1)
+            thread_type = thread_type or "AUTO"
+            ctx.thread_count = threads
+            ctx.thread_type = thread_type
+            self.active_decode_threads = (threads, thread_type.lower())
+            logger.info(f"StreamReader ({self.camera_name}): Decoding {ctx.width}x{ctx.height} with {threads} {thread_type.lower()} thread(s)")
+        except Exception as e:
+            logger.debug(f"StreamReader ({self.camera_name}): Could not set decoder threading: {e}")
+
+    def _update_decode_lag(self, frame, now):
+        """Track how far decoding trails the stream clock (PTS anchored to the fastest frame seen)"""
+        pts_time = frame.time
+        if pts_time is None:
+            return
+        offset = now - pts_time
+        if self._pts_wall_offset is None or offset < self._pts_wall_offset or offset - self._pts_wall_offset > 60.0:
+            # First frame, faster delivery than ever seen, or a PTS discontinuity: re-anchor
+            self._pts_wall_offset = offset
+        lag = offset - self._pts_wall_offset
+        self.decode_lag = lag if self.decode_lag == 0.0 else (self.decode_lag * 0.9 + lag * 0.1)
+        self.decode_lag_max = max(self.decode_lag_max, lag)
+        if self.decode_lag > 5.0 and now - self._last_lag_warning > 60.0:
+            self._last_lag_warning = now
+            logger.warning(f"StreamReader ({self.camera_name}): Decoder is {self.decode_lag:.1f}s behind the stream. "
+                           f"Consider more decode threads or a sub-stream.")
+
+    def get_decode_stats(self):
+        with self.lock:
+            stats = dict(self.decode_stats)
+            stats["mode"] = self.decode_mode
+            stats["idle"] = self.decode_idle
+            stats["target_fps"] = self.target_fps
+            stats["threads"] = self.active_decode_threads
+            stats["lag_ms"] = round(self.decode_lag * 1000, 1)
+            stats["lag_max_ms"] = round(self.decode_lag_max * 1000, 1)
+        demuxed = stats["packets_demuxed"]
+        stats["decode_ratio"] = round(stats["frames_decoded"] / demuxed, 3) if demuxed else 0.0
+        return stats
+
+    def _apply_decode_settings(self, video_stream):
+        """Apply the skip_frame policy to the video decoder. Must run on the reader thread."""
+        with self.lock:
+            self._decode_settings_dirty = False
+            mode, idle = self.decode_mode, self.decode_idle
+            mv_export = self.mv_analyzer is not None
+        if mode != "demand":
+            skip = "DEFAULT"
+        else:
+            # Motion vectors live in P-frames, so an idle reader feeding the analyzer keeps decoding them
+            skip = "NONKEY" if idle and not mv_export else "NONREF"
+        try:
+            ctx = video_stream.codec_context
+            # Leaving keyframe-only mode mid-GOP: references are missing until the next keyframe
+            if getattr(ctx, 'skip_frame', None) == "NONKEY" and skip != "NONKEY":
+                self._await_keyframe = True
+            ctx.skip_frame = skip
+            self.keyframes_only = skip == "NONKEY"
+            logger.debug(f"StreamReader ({self.camera_name}): Decoder skip_frame={skip}")
+        except Exception as e:
+            logger.debug(f"StreamReader ({self.camera_name}): Could not set skip_frame: {e}")
+
+    def _frame_wanted(self, frame, now):
+        """Decide whether a decoded frame must be converted and published."""
+        if self._await_keyframe:
+            if not getattr(frame, 'key_frame', False):
+                return False
+            self._await_keyframe = False
+        if self.decode_mode != "demand":
+            return True
+        if self.decode_idle:
+            # Idle but still decoding for motion vectors: only keyframes are converted
+            return bool(getattr(frame, 'key_frame', False))
+        if self.target_fps <= 0:
+            return True
+        # Small tolerance so jitter in packet arrival does not halve the delivered rate
+        return (now - self._last_convert_time) >= (0.9 / self.target_fps)
+
+    def _collect_param_sets(self, payload):
+        """Remember SPS/PPS NAL units (H.264) so keyframes can be sent self-contained to viewers"""
+        # Parameter sets precede the first slice, so only the head of the packet is scanned
+        data = bytes(payload[:4096])
+        pos = 0
+        while True:
+            pos = data.find(b'\x00\x00\x01', pos)
+            if pos == -1 or pos > len(data) - 4:
+                break
+            nal_type = data[pos + 3] & 0x1F
+            if nal_type in (1, 5):
+                break  # First slice: no more parameter sets
+            # SPS (7) or PPS (8)
+            if nal_type == 7 or nal_type == 8:
+                next_pos = data.find(b'\x00\x00\x01', pos + 3)
+                if next_pos == -1: next_pos = len(data)
+                nalu = data[pos:next_pos]
+                with self.lock:
+                    if nalu not in self.last_headers:
+                        # Limit header size to prevent memory leaks from malformed streams
+                        if len(self.last_headers) < 1024:
+                            self.last_headers += nalu
+                pos = next_pos
+            else:
+                pos += 3
+
     def _maybe_send_health_callback(self, status, title, message):
         if self.last_health_report_status == status:
             return
@@ -148,6 +404,14 @@ class StreamReader(threading.Thread):
                     with self.lock:
                         self.video_stream = container.streams.video[0]
                         self.audio_stream = container.streams.audio[0] if container.streams.audio else None
+                        self._decode_settings_dirty = True
+                        if self.mv_analyzer is not None:
+                            self.video_stream.codec_context.flags2 |= av.codec.context.Flags2.export_mvs
+                        self._pts_wall_offset = None
+                        self.decode_lag = 0.0
+                        self.decode_lag_max = 0.0
+                    self._apply_decode_threading(self.video_stream)
+                    self._await_keyframe = False
 
                 except Exception as e:
                     self.consecutive_failures += 1
@@ -241,7 +505,6 @@ class StreamReader(threading.Thread):
                     with self.lock:
                         current_url = self.url
                         current_health = self.health_status
-                        clients = list(self.ws_clients)
                         
                     if current_url != target_url:
                         break
@@ -252,93 +515,66 @@ class StreamReader(threading.Thread):
                     if stream_type not in ('video', 'audio'):
                         continue
 
-                    raw_data = bytes(packet)
-                    
+                    payload = memoryview(packet)
+                    if payload.nbytes == 0:
+                        continue
+                    is_keyframe = 1 if getattr(packet, 'is_keyframe', False) else 0
+
                     # Video specific NAL parsing for keyframe headers (SPS/PPS)
-                    # OPTIMIZED: Use find() instead of byte-by-byte scan
-                    if stream_type == 'video' and len(raw_data) > 4:
-                        # Only scan if it's a keyframe or if we haven't found headers yet
-                        is_kf = getattr(packet, 'is_keyframe', False)
-                        if is_kf or not self.last_headers:
-                            pos = 0
-                            while True:
-                                pos = raw_data.find(b'\x00\x00\x01', pos)
-                                if pos == -1 or pos > len(raw_data) - 4:
-                                    break
-                                
-                                nal_header = raw_data[pos + 3]
-                                nal_type = nal_header & 0x1F
-                                
-                                # SPS (7) or PPS (8)
-                                if nal_type == 7 or nal_type == 8:
-                                    next_pos = raw_data.find(b'\x00\x00\x01', pos + 3)
-                                    if next_pos == -1: next_pos = len(raw_data)
-                                    nalu: bytes = raw_data[pos:next_pos]
-                                    with self.lock:
-                                        if nalu not in self.last_headers:
-                                            # Limit header size to prevent memory leaks from malformed streams
-                                            if len(self.last_headers) < 1024:
-                                                self.last_headers += nalu
-                                    pos = next_pos
-                                else:
-                                    pos += 3
-
-                    if len(raw_data) > 0:
-                        pts = getattr(packet, 'pts', None)
-                        time_base = getattr(packet, 'time_base', None)
-                        time_sec = float(pts * time_base) if pts is not None and time_base is not None else time.time()
-                        is_keyframe = 1 if getattr(packet, 'is_keyframe', False) else 0
+                    if stream_type == 'video' and payload.nbytes > 4 and (is_keyframe or not self.last_headers):
+                        self._collect_param_sets(payload)
 
-                        with self.lock:
-                            # 1. Update ring buffer
-                            self.packet_ring_buffer.append((packet, is_keyframe, time_sec))
-                            # Pop old packets (keep self.pre_buffer_duration seconds of history)
-                            while self.packet_ring_buffer and (time_sec - self.packet_ring_buffer[0][2] > self.pre_buffer_duration):
-                                self.packet_ring_buffer.popleft()
-                            
-                            # 2. Push to local subscribers
-                            subscribers = list(self.packet_subscribers)
-                            for q in subscribers:
-                                try:
-                                    q.put_nowait(packet)
-                                except queue.Full:
-                                    pass
-
-                        # 3. WS Broadcasting (for UI)
-                        if clients:
+                    pts = getattr(packet, 'pts', None)
+                    time_base = getattr(packet, 'time_base', None)
+                    time_sec = float(pts * time_base) if pts is not None and time_base is not None else time.time()
+
+                    # One shared, immutable packet per demuxed packet, whatever the number of consumers
+                    shared = SharedPacket(packet, stream_type, is_keyframe, time_sec, self.last_headers)
+
+                    with self.lock:
+                        # 1. Update ring buffer
+                        self.packet_ring_buffer.append(shared)
+
+                        # 2. Push to local subscribers
+                        subscribers = list(self.packet_subscribers)
+                        for q in subscribers:
                             try:
-                                # Packet Type: 0 = Video, 1 = Audio
-                                p_type = 0 if stream_type == 'video' else 1
-                                
-                                # New 10-byte header: Type (1b) + Keyframe (1b) + Timestamp (8b)
-                                header: bytes = struct.pack('<BBd', p_type, is_keyframe, time_sec)
-                                
-                                if stream_type == 'video':
-                                    if is_keyframe:
-                                        with self.lock:
-                                            lh: bytes = self.last_headers or b''
-                                            self.last_keyframe = header + lh + raw_data
-                                    
-                                    broadcast_payload = header + raw_data
-                                    if is_keyframe and self.last_headers:
-                                        broadcast_payload = header + self.last_headers + raw_data
-                                else:
-                                    # Audio packet
-                                    broadcast_payload = header + raw_data
-                                    
-                                for q, loop in clients:
-                                    if not q.full():
-                                        loop.call_soon_threadsafe(q.put_nowait, broadcast_payload)
-                            except Exception as e:
-                                logger.error(f"StreamReader ({self.camera_name}): WS Broadcast error: {e}")
+                                q.put_nowait(shared)
+                            except queue.Full:
+                                pass
+
+                        if stream_type == 'video' and is_keyframe:
+                            self.last_keyframe = shared
+
+                    # 3. WS Broadcasting (for UI)
+                    if self.ws_routes:
+                        try:
+                            self._broadcast_ws(shared.ws_payload)
+                        except Exception as e:
+                            logger.error(f"StreamReader ({self.camera_name}): WS Broadcast error: {e}")
 
                     if stream_type == 'video':
+                        if self._decode_settings_dirty:
+                            self._apply_decode_settings(packet.stream)
+                        self.decode_stats["packets_demuxed"] += 1
+                        self.last_packet_time = time.time()
                         for frame in packet.decode():
-                            img = frame.to_ndarray(format='bgr24')
-                            with self.lock:
-                                self.latest_frame = img
-                                self.last_read_time = time.time()
-                                self.health_status = "CONNECTED"
+                            self.decode_stats["frames_decoded"] += 1
+                            now = time.time()
+                            self._update_decode_lag(frame, now)
+                            analyzer = self.mv_analyzer
+                            if analyzer is not None and not frame.key_frame:
+                                mvs = frame.side_data.get('MOTION_VECTORS')
+                                analyzer.feed(mvs.to_ndarray() if mvs is not None else None, frame.width, frame.height, now)
+                            if not self._frame_wanted(frame, now):
+                                continue
+                            self._last_convert_time = now
+                            img = convert_frame(frame, self.output_width, self.output_height, self.output_rotation)
+                            plane = None
+                            if self.motion_height:
+                                plane = motion_plane(frame, self.motion_height, self.output_width, self.output_height, self.output_rotation)
+                            self.decode_stats["frames_converted"] += 1
+                            self._publish_frame(img, plane, now)
                         
                         # YIELD CPU: Prevent PyAV from starving the EdgeTPU USB driver during RTSP burst/I-frame decoding.
                         # This fixes the TPU freezing at the "first check" when passthrough is disabled.
@@ -376,19 +612,13 @@ class StreamReader(threading.Thread):
         """Send JSON metadata to all connected WebSocket clients (p_type=2)"""
         try:
             import json
-            with self.lock:
-                clients = list(self.ws_clients)
-            
-            if not clients:
+            if not self.ws_routes:
                 return
 
             # Header: Type=2 (Metadata), Keyframe=0, Timestamp=now
-            header = struct.pack('<BBd', 2, 0, time.time())
+            header = ws_header(WS_METADATA, 0, time.time())
             payload = header + json.dumps(data).encode('utf-8')
-
-            for q, loop in clients:
-                if not q.full():
-                    loop.call_soon_threadsafe(q.put_nowait, payload)
+            self._broadcast_ws(payload)
         except Exception as e:
             logger.error(f"StreamReader ({self.camera_name}): Metadata broadcast error: {e}")
 
@@ -396,8 +626,34 @@ class StreamReader(threading.Thread):
         with self.lock:
             return self.latest_frame, self.last_read_time
 
+    def get_motion_plane(self):
+        """Grayscale plane matching the frame returned by get_latest() with the same read_time"""
+        with self.lock:
+            return self.latest_motion_plane, self.last_read_time
+
+    def _publish_frame(self, img, plane, now):
+        with self.lock:
+            self.latest_frame = img
+            self.latest_motion_plane = plane
+            self.last_read_time = now
+            self.health_status = "CONNECTED"
+            self.frame_seq += 1
+            self.frame_ready.notify_all()
+
+    def wait_for_frame(self, last_seq, timeout):
+        """Block until a frame newer than `last_seq` is published or `timeout` expires.
+
+        Returns (frame, motion_plane, read_time, seq); seq == last_seq means the
+        wait timed out (or the reader stopped) and the frame is not new.
+        """
+        with self.frame_ready:
+            self.frame_ready.wait_for(lambda: self.frame_seq != last_seq or not self.running, timeout)
+            return self.latest_frame, self.latest_motion_plane, self.last_read_time, self.frame_seq
+
     def stop(self):
         self.running = False
+        with self.frame_ready:
+            self.frame_ready.notify_all()
 
     def update_url(self, new_url):
         with self.lock:
@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+
+from shared_packet import WS_VIDEO, WS_AUDIO
+
+logger = logging.getLogger(__name__)
+
+# Payloads waiting for the loop; the oldest are discarded if the loop stalls (their viewers resync)
+MAX_PENDING = 4096
+
+class WSClient:
+    """Per-viewer send queue with GOP-aware dropping. Lives on the event loop thread.
+
+    Dropping single packets breaks the references of every following frame until
+    the next keyframe, so a viewer that falls behind (queue full, or the oldest
+    queued packet older than `max_lag` seconds when a keyframe arrives) skips
+    straight to the next keyframe: queued packets are discarded and nothing but
+    metadata is queued until then. Live latency is bounded to about one GOP.
+    """
+    def __init__(self, maxsize=120, max_lag=1.0):
+        self.maxsize = maxsize
+        self.max_lag = max_lag
+        self._items = deque()  # (enqueue_time, payload)
+        self._ready = asyncio.Event()
+        self.waiting_for_keyframe = False
+        self.connected_at = time.monotonic()
+        self.stats = {"sent": 0, "dropped": 0, "resyncs": 0, "lag_ms": 0.0, "lag_max_ms": 0.0}
+
+    def _skip_queue(self):
+        self.stats["dropped"] += len(self._items)
+        self._items.clear()
+
+    def resync(self):
+        """Packets were lost before reaching this queue: drop the broken GOP and wait for a keyframe"""
+        self._skip_queue()
+        self.waiting_for_keyframe = True
+
+    def offer(self, payload) -> bool:
+        """Queue a WS payload (header byte 0 = type, byte 1 = keyframe); False if dropped"""
+        now = time.monotonic()
+        p_type = payload[0]
+        if p_type == WS_VIDEO and payload[1]:
+            behind = self._items and now - self._items[0][0] > self.max_lag
+            if self.waiting_for_keyframe or behind:
+                # Resume from this keyframe; everything queued before it is stale
+                self._skip_queue()
+                self.waiting_for_keyframe = False
+                self.stats["resyncs"] += 1
+        elif self.waiting_for_keyframe and p_type in (WS_VIDEO, WS_AUDIO):
+            self.stats["dropped"] += 1
+            return False
+        if len(self._items) >= self.maxsize:
+            # Fell behind mid-GOP: stop feeding broken references until the next keyframe
+            self._skip_queue()
+            self.waiting_for_keyframe = True
+            self.stats["dropped"] += 1
+            return False
+        self._items.append((now, payload))
+        self._ready.set()
+        return True
+
+    async def get(self) -> bytes:
+        while not self._items:
+            self._ready.clear()
+            await self._ready.wait()
+        queued_at, payload = self._items.popleft()
+        lag = time.monotonic() - queued_at
+        stats = self.stats
+        stats["sent"] += 1
+        # EMA so a single slow send does not dominate
+        stats["lag_ms"] = round(stats["lag_ms"] * 0.9 + lag * 100, 1)
+        stats["lag_max_ms"] = max(stats["lag_max_ms"], round(lag * 1000, 1))
+        return payload
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats["queued"] = len(self._items)
+        stats["waiting_for_keyframe"] = self.waiting_for_keyframe
+        stats["connected_s"] = round(time.monotonic() - self.connected_at)
+        return stats
+
+class LoopDispatcher:
+    """Hands payloads from reader threads to the WebSocket clients of one event loop.
+
+    publish() only appends to a deque (atomic under the GIL, no lock) and wakes
+    the loop with a single call_soon_threadsafe() when no drain is scheduled yet,
+    so the loop's self-pipe is written at most once per batch instead of once
+    per packet per viewer. The drain runs on the loop and fans every pending
+    payload out to its WSClient queues, which apply their own drop policy.
+
+    If the loop stalls and MAX_PENDING payloads pile up, the oldest are
+    discarded and the viewers of a discarded video/audio packet are resynced
+    (see WSClient.resync) on the next drain.
+    """
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self._pending = deque()
+        self._scheduled = False
+        self._resync = set()  # Clients that lost a discarded media payload
+        self._resync_lock = threading.Lock()
+        self.stats = {"wakeups": 0, "delivered": 0, "dropped": 0, "overflow": 0}
+
+    def publish(self, clients, payload):
+        """Queue `payload` for every WSClient in `clients` (called from any thread)"""
+        if len(self._pending) >= MAX_PENDING:
+            self._discard_oldest()
+        self._pending.append((clients, payload))
+        # Appending before checking the flag guarantees a running drain either
+        # sees this payload or has already cleared the flag
+        if not self._scheduled:
+            self._scheduled = True
+            try:
+                self.loop.call_soon_threadsafe(self._drain)
+            except RuntimeError:
+                # Loop closed: nobody is left to deliver to
+                self._pending.clear()
+
+    def _discard_oldest(self):
+        try:
+            clients, payload = self._pending.popleft()
+        except IndexError:
+            return  # Drained meanwhile
+        self.stats["overflow"] += 1
+        if payload[0] in (WS_VIDEO, WS_AUDIO):
+            with self._resync_lock:
+                self._resync.update(clients)
+
+    def _drain(self):
+        self._scheduled = False
+        self.stats["wakeups"] += 1
+        if self._resync:
+            # Before the remaining payloads: they continue a GOP these clients lost packets of
+            with self._resync_lock:
+                resync, self._resync = self._resync, set()
+            for client in resync:
+                client.resync()
+        pending = self._pending
+        delivered = dropped = 0
+        while pending:
+            try:
+                clients, payload = pending.popleft()
+            except IndexError:
+                break
+            for client in clients:
+                if client.offer(payload):
+                    delivered += 1
+                else:
+                    dropped += 1
+        self.stats["delivered"] += delivered
+        self.stats["dropped"] += dropped
+
+_dispatchers = {}
+_dispatchers_lock = threading.Lock()
+
+def get_dispatcher(loop: asyncio.AbstractEventLoop) -> LoopDispatcher:
+    """Shared dispatcher for `loop` (one per event loop, whatever the number of cameras)"""
+    with _dispatchers_lock:
+        dispatcher = _dispatchers.get(loop)
+        if dispatcher is None:
+            for stale in [l for l in _dispatchers if l.is_closed()]:
+                del _dispatchers[stale]
+            dispatcher = _dispatchers[loop] = LoopDispatcher(loop)
+        return dispatcher
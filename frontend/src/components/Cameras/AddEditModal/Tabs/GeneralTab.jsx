@@ -109,6 +109,20 @@ export const GeneralTab = ({ newCamera, setNewCamera, storageProfiles }) => {
                     help={t('cameras.tcp_is_recommended_for_', 'TCP is recommended for most cameras. Use UDP only if you experience lag or if your camera prefers it.')}
                 />
 
+                <SelectField
+                    label={t('cameras.decoder_threads', 'Decoder Threads')}
+                    value={String(newCamera.decode_threads || 0)}
+                    onChange={(val) => setNewCamera({ ...newCamera, decode_threads: parseInt(val) })}
+                    options={[
+                        { value: '0', label: t('cameras.decoder_threads_global', 'Global Default') },
+                        { value: '1', label: '1' },
+                        { value: '2', label: '2' },
+                        { value: '4', label: '4' },
+                        { value: '8', label: '8' }
+                    ]}
+                    help={t('cameras.decoder_threads_help', 'Raise for 4K/H.265 main streams that fall behind real time (check decode lag in the engine status).')}
+                />
+
                 <div className="h-px bg-border my-6" />
                 
                 <h3 className="text-sm font-medium text-foreground">{t('cameras.sub_stream_configuration', 'Sub-Stream Configuration (Optional)')}</h3>
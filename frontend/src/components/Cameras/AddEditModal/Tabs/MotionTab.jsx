@@ -33,6 +33,7 @@ export const MotionTab = ({ newCamera, setNewCamera, setActiveTab, globalSetting
                 onChange={(val) => setNewCamera({ ...newCamera, detect_engine: val })}
                 options={[
                     { value: 'OpenCV', label: t('cameras.opencv_server_image_ana', 'OpenCV (Server Image Analysis)') },
+                    { value: 'Motion Vectors', label: t('cameras.motion_vectors_compressed', 'Motion Vectors (Compressed Stream, Low CPU)') },
                     { 
                         value: 'AI', 
                         label: t('cameras.ai_object_detection_tpu_cpu', 'AI (Object Detection - TPU/CPU)') + 
@@ -58,6 +58,9 @@ export const Settings = () => {
         global_attach_image_telegram: true,
         opt_live_view_fps_throttle: 2,
         opt_motion_fps_throttle: 3,
+        opt_ai_fps_budget: 5,
+        opt_ai_cpu_interpreters: 0,
+        opt_ai_motion_gate: false,
         opt_live_view_height_limit: 720,
         opt_motion_analysis_height: 180,
         opt_live_view_quality: 60,
@@ -65,6 +68,12 @@ export const Settings = () => {
         opt_ffmpeg_preset: 'ultrafast',
         opt_pre_capture_fps_throttle: 1,
         opt_verbose_engine_logs: false,
+        opt_motion_clips_from_continuous: false,
+        opt_decode_threads: 0,
+        opt_decode_thread_type: 'auto',
+        opt_recording_encoder: 'ffmpeg',
+        opt_recording_queue_mb: 256,
+        opt_recording_overload: 'drop',
         telemetry_enabled: true,
         default_live_view_mode: 'auto',
         backup_auto_enabled: false,
@@ -193,6 +202,9 @@ export const Settings = () => {
 
                     opt_live_view_fps_throttle: data.opt_live_view_fps_throttle?.value !== undefined ? parseInt(data.opt_live_view_fps_throttle.value) : prev.opt_live_view_fps_throttle,
                     opt_motion_fps_throttle: data.opt_motion_fps_throttle?.value !== undefined ? parseInt(data.opt_motion_fps_throttle.value) : prev.opt_motion_fps_throttle,
+                    opt_ai_fps_budget: data.opt_ai_fps_budget?.value !== undefined ? parseInt(data.opt_ai_fps_budget.value) : prev.opt_ai_fps_budget,
+                    opt_ai_cpu_interpreters: data.opt_ai_cpu_interpreters?.value !== undefined ? parseInt(data.opt_ai_cpu_interpreters.value) : prev.opt_ai_cpu_interpreters,
+                    opt_ai_motion_gate: data.opt_ai_motion_gate?.value !== undefined ? String(data.opt_ai_motion_gate.value).toLowerCase() === 'true' : prev.opt_ai_motion_gate,
                     opt_live_view_height_limit: data.opt_live_view_height_limit?.value !== undefined ? parseInt(data.opt_live_view_height_limit.value) : prev.opt_live_view_height_limit,
                     opt_motion_analysis_height: data.opt_motion_analysis_height?.value !== undefined ? parseInt(data.opt_motion_analysis_height.value) : prev.opt_motion_analysis_height,
                     opt_live_view_quality: data.opt_live_view_quality?.value !== undefined ? parseInt(data.opt_live_view_quality.value) : prev.opt_live_view_quality,
@@ -200,6 +212,12 @@ export const Settings = () => {
                     opt_ffmpeg_preset: data.opt_ffmpeg_preset?.value || prev.opt_ffmpeg_preset,
                     opt_pre_capture_fps_throttle: data.opt_pre_capture_fps_throttle?.value !== undefined ? parseInt(data.opt_pre_capture_fps_throttle.value) : prev.opt_pre_capture_fps_throttle,
                     opt_verbose_engine_logs: data.opt_verbose_engine_logs?.value !== undefined ? String(data.opt_verbose_engine_logs.value).toLowerCase() === 'true' : prev.opt_verbose_engine_logs,
+                    opt_motion_clips_from_continuous: data.opt_motion_clips_from_continuous?.value !== undefined ? String(data.opt_motion_clips_from_continuous.value).toLowerCase() === 'true' : prev.opt_motion_clips_from_continuous,
+                    opt_decode_threads: data.opt_decode_threads?.value !== undefined ? parseInt(data.opt_decode_threads.value) : prev.opt_decode_threads,
+                    opt_decode_thread_type: data.opt_decode_thread_type?.value || prev.opt_decode_thread_type,
+                    opt_recording_encoder: data.opt_recording_encoder?.value || prev.opt_recording_encoder,
+                    opt_recording_queue_mb: data.opt_recording_queue_mb?.value !== undefined ? parseInt(data.opt_recording_queue_mb.value) : prev.opt_recording_queue_mb,
+                    opt_recording_overload: data.opt_recording_overload?.value || prev.opt_recording_overload,
                     telemetry_enabled: data.telemetry_enabled?.value !== undefined ? String(data.telemetry_enabled.value).toLowerCase() !== 'false' : prev.telemetry_enabled,
                     default_live_view_mode: data.default_live_view_mode?.value || prev.default_live_view_mode,
                     backup_auto_enabled: data.backup_auto_enabled?.value !== undefined ? String(data.backup_auto_enabled.value).toLowerCase() === 'true' : prev.backup_auto_enabled,
@@ -278,6 +296,9 @@ export const Settings = () => {
 
                     opt_live_view_fps_throttle: settingsToSave.opt_live_view_fps_throttle.toString(),
                     opt_motion_fps_throttle: settingsToSave.opt_motion_fps_throttle.toString(),
+                    opt_ai_fps_budget: settingsToSave.opt_ai_fps_budget.toString(),
+                    opt_ai_cpu_interpreters: settingsToSave.opt_ai_cpu_interpreters.toString(),
+                    opt_ai_motion_gate: Boolean(settingsToSave.opt_ai_motion_gate).toString(),
                     opt_live_view_height_limit: settingsToSave.opt_live_view_height_limit.toString(),
                     opt_motion_analysis_height: settingsToSave.opt_motion_analysis_height.toString(),
                     opt_live_view_quality: settingsToSave.opt_live_view_quality.toString(),
@@ -285,6 +306,12 @@ export const Settings = () => {
                     opt_ffmpeg_preset: settingsToSave.opt_ffmpeg_preset,
                     opt_pre_capture_fps_throttle: settingsToSave.opt_pre_capture_fps_throttle.toString(),
                     opt_verbose_engine_logs: settingsToSave.opt_verbose_engine_logs.toString(),
+                    opt_motion_clips_from_continuous: Boolean(settingsToSave.opt_motion_clips_from_continuous).toString(),
+                    opt_decode_threads: settingsToSave.opt_decode_threads.toString(),
+                    opt_decode_thread_type: settingsToSave.opt_decode_thread_type,
+                    opt_recording_encoder: settingsToSave.opt_recording_encoder,
+                    opt_recording_queue_mb: settingsToSave.opt_recording_queue_mb.toString(),
+                    opt_recording_overload: settingsToSave.opt_recording_overload,
                     telemetry_enabled: settingsToSave.telemetry_enabled.toString(),
                     default_live_view_mode: settingsToSave.default_live_view_mode,
                     backup_auto_enabled: Boolean(settingsToSave.backup_auto_enabled).toString(),
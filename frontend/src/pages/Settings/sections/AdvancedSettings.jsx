@@ -69,6 +69,67 @@ export const AdvancedSettings = ({
                     </div>
                 </div>
 
+                {/* AI Inference Budget */}
+                <div className="grid grid-cols-1 md:grid-cols-3 gap-6 border-b border-border/50 pb-6">
+                    <div className="md:col-span-1 space-y-1.5">
+                        <label className="block text-sm font-medium text-foreground">{t('settings_forms.adv_ai_fps_budget', 'AI Inference Budget (FPS per camera)')}</label>
+                        <p className="text-xs text-muted-foreground leading-relaxed">
+                            {t('settings_advancedsettings.ai_fps_budget_desc1', 'Caps how many frames per second each camera sends to the AI engine. The engine is shared fairly between all AI cameras, and cameras with ongoing motion get a larger share.')}
+                            <br /><br />
+                            {t('settings_advancedsettings.ai_fps_budget_desc2', 'Lower values leave more AI capacity for other cameras. 0 removes the cap.')}
+                        </p>
+                    </div>
+                    <div className="md:col-span-2">
+                        <InputField
+                            type="number"
+                            className="max-w-full sm:max-w-[150px] h-11"
+                            value={globalSettings.opt_ai_fps_budget}
+                            onChange={val => setGlobalSettings({ ...globalSettings, opt_ai_fps_budget: val })}
+                        />
+                        <p className="text-xs text-muted-foreground mt-2 font-medium opacity-70">{t('settings_forms.adv_ai_fps_budget_def', 'Default: 5 (0 = unlimited)')}</p>
+                    </div>
+                </div>
+
+                {/* CPU AI Interpreter Pool */}
+                <div className="grid grid-cols-1 md:grid-cols-3 gap-6 border-b border-border/50 pb-6">
+                    <div className="md:col-span-1 space-y-1.5">
+                        <label className="block text-sm font-medium text-foreground">{t('settings_forms.adv_ai_cpu_interpreters', 'Parallel CPU AI Interpreters')}</label>
+                        <p className="text-xs text-muted-foreground leading-relaxed">
+                            {t('settings_advancedsettings.ai_cpu_interpreters_desc1', 'When AI runs on the CPU (no Coral TPU), several copies of the model process frames of different cameras in parallel.')}
+                            <br /><br />
+                            {t('settings_advancedsettings.ai_cpu_interpreters_desc2', 'Auto uses one per 4 CPU cores (up to 4) and gives AI at most half of the cores. Each copy uses extra RAM.')}
+                        </p>
+                    </div>
+                    <div className="md:col-span-2">
+                        <InputField
+                            type="number"
+                            className="max-w-full sm:max-w-[150px] h-11"
+                            value={globalSettings.opt_ai_cpu_interpreters}
+                            onChange={val => setGlobalSettings({ ...globalSettings, opt_ai_cpu_interpreters: val })}
+                        />
+                        <p className="text-xs text-muted-foreground mt-2 font-medium opacity-70">{t('settings_forms.adv_ai_cpu_interpreters_def', 'Default: 0 (auto)')}</p>
+                    </div>
+                </div>
+
+                {/* Motion-Gated AI Inference */}
+                <div className="grid grid-cols-1 md:grid-cols-3 gap-6 border-b border-border/50 pb-6">
+                    <div className="md:col-span-1 space-y-1.5">
+                        <label className="block text-sm font-medium text-foreground">{t('settings_forms.adv_ai_motion_gate', 'Motion-Gated AI Inference')}</label>
+                        <p className="text-xs text-muted-foreground leading-relaxed">
+                            {t('settings_advancedsettings.ai_motion_gate_desc1', 'AI cameras only run the model when pixels change in the scene (same background model and threshold as OpenCV motion detection). The model then sees a crop around the change instead of the whole frame, so small or distant objects keep more detail.')}
+                            <br /><br />
+                            {t('settings_advancedsettings.ai_motion_gate_desc2', 'Static scenes need far fewer inferences. A full-frame inference still runs every 10 seconds.')}
+                        </p>
+                    </div>
+                    <div className="md:col-span-2">
+                        <Toggle
+                            checked={globalSettings.opt_ai_motion_gate}
+                            onChange={val => setGlobalSettings({ ...globalSettings, opt_ai_motion_gate: val })}
+                        />
+                        <p className="text-xs text-muted-foreground mt-2 font-medium opacity-70">{t('settings_forms.adv_off', 'Default: Off')}</p>
+                    </div>
+                </div>
+
                 {/* Pre-Capture Throttling */}
                 <div className="grid grid-cols-1 md:grid-cols-3 gap-4 border-b border-border/50 pb-4">
                     <div className="md:col-span-1">
@@ -206,6 +267,111 @@ export const AdvancedSettings = ({
                     </div>
                 </div>
 
+                {/* Recording Encoder */}
+                <div className="grid grid-cols-1 md:grid-cols-3 gap-4 pt-4 border-t border-border/50">
+                    <div className="col-span-1">
+                        <label className="block text-sm font-medium mb-1">{t('settings_forms.adv_recording_encoder', 'Recording Encoder')}</label>
+                        <p className="text-xs text-muted-foreground">
+                            {t('settings_advancedsettings.recording_encoder_desc1', 'Encoder used for transcoded recordings. In-process encoding avoids copying every frame through a pipe to an FFmpeg process.')}
+                            <br /><br />
+                            {t('settings_advancedsettings.recording_encoder_desc2', 'Recordings with audio always use the in-process encoder (except with VAAPI), so the camera's audio comes from the existing stream. With VAAPI, in-process encoding runs in software.')}
+                        </p>
+                    </div>
+                    <div className="col-span-2">
+                        <SelectField
+                            className="max-w-[200px]"
+                            value={globalSettings.opt_recording_encoder}
+                            onChange={val => setGlobalSettings({ ...globalSettings, opt_recording_encoder: val })}
+                            options={[
+                                { value: 'ffmpeg', label: t('settings_forms.recording_encoder_ffmpeg', 'FFmpeg Process') },
+                                { value: 'pyav', label: t('settings_forms.recording_encoder_pyav', 'In-Process (PyAV)') }
+                            ]}
+                        />
+                        <p className="text-[10px] text-muted-foreground mt-1">{t('settings_forms.adv_recording_encoder_def', 'Default: FFmpeg Process')}</p>
+                    </div>
+                </div>
+
+                {/* Recording Queue */}
+                <div className="grid grid-cols-1 md:grid-cols-3 gap-4 pt-4 border-t border-border/50">
+                    <div className="col-span-1">
+                        <label className="block text-sm font-medium mb-1">{t('settings_forms.adv_recording_queue', 'Recording Queue (MB)')}</label>
+                        <p className="text-xs text-muted-foreground">
+                            {t('settings_advancedsettings.recording_queue_desc1', 'Memory each transcoded recording may use for frames waiting for the encoder. A raw 4K frame takes about 25 MB.')}
+                            <br /><br />
+                            {t('settings_advancedsettings.recording_queue_desc2', 'When the encoder falls behind, frames can be dropped, the recorded frame rate lowered, or the recording continued as passthrough (no overlays).')}
+                        </p>
+                    </div>
+                    <div className="col-span-2 flex flex-col gap-2">
+                        <InputField
+                            type="number"
+                            className="max-w-[150px]"
+                            value={globalSettings.opt_recording_queue_mb}
+                            onChange={val => setGlobalSettings({ ...globalSettings, opt_recording_queue_mb: val })}
+                        />
+                        <SelectField
+                            className="max-w-[200px]"
+                            value={globalSettings.opt_recording_overload}
+                            onChange={val => setGlobalSettings({ ...globalSettings, opt_recording_overload: val })}
+                            options={[
+                                { value: 'drop', label: t('settings_forms.recording_overload_drop', 'Drop Frames') },
+                                { value: 'reduce_fps', label: t('settings_forms.recording_overload_reduce_fps', 'Lower Frame Rate') },
+                                { value: 'passthrough', label: t('settings_forms.recording_overload_passthrough', 'Switch to Passthrough') }
+                            ]}
+                        />
+                        <p className="text-[10px] text-muted-foreground mt-1">{t('settings_forms.adv_recording_queue_def', 'Default: 256 MB, Drop Frames')}</p>
+                    </div>
+                </div>
+
+                {/* Decoder Threads */}
+                <div className="grid grid-cols-1 md:grid-cols-3 gap-4 pt-4 border-t border-border/50">
+                    <div className="col-span-1">
+                        <label className="block text-sm font-medium mb-1">{t('settings_forms.adv_decode_threads', 'Video Decoder Threads')}</label>
+                        <p className="text-xs text-muted-foreground">
+                            {t('settings_advancedsettings.decode_threads_desc1', 'Threads used to decode each camera stream. With 0 (Auto), FFmpeg picks the thread count up to 1080p and higher resolutions use up to 4 threads. A thread type other than Auto is always applied.')}
+                            <br /><br />
+                            <strong>{t('settings_advancedsettings.decode_threads_desc2', 'Frame threading')}</strong> {t('settings_advancedsettings.decode_threads_desc3', 'scales best for 4K/H.265 but adds one frame of delay per thread. Cameras can override the thread count.')}
+                        </p>
+                    </div>
+                    <div className="col-span-2 flex flex-col gap-2">
+                        <InputField
+                            type="number"
+                            className="max-w-[150px]"
+                            value={globalSettings.opt_decode_threads}
+                            onChange={val => setGlobalSettings({ ...globalSettings, opt_decode_threads: val })}
+                        />
+                        <SelectField
+                            className="max-w-[200px]"
+                            value={globalSettings.opt_decode_thread_type}
+                            onChange={val => setGlobalSettings({ ...globalSettings, opt_decode_thread_type: val })}
+                            options={[
+                                { value: 'auto', label: t('settings_forms.decode_thread_auto', 'Auto') },
+                                { value: 'frame', label: t('settings_forms.decode_thread_frame', 'Frame') },
+                                { value: 'slice', label: t('settings_forms.decode_thread_slice', 'Slice (Lowest Latency)') }
+                            ]}
+                        />
+                        <p className="text-[10px] text-muted-foreground mt-1">{t('settings_forms.adv_decode_threads_def', 'Default: 0 (Auto count), Auto type')}</p>
+                    </div>
+                </div>
+
+                {/* Motion Clips from Continuous Recording */}
+                <div className="grid grid-cols-1 md:grid-cols-3 gap-4 pt-4 border-t border-border/50">
+                    <div className="col-span-1">
+                        <label className="block text-sm font-medium mb-1">{t('settings_forms.adv_motion_clips_from_continuous', 'Motion Clips from Continuous Recording')}</label>
+                        <p className="text-xs text-muted-foreground">
+                            {t('settings_advancedsettings.motion_clips_desc1', 'In Always/Continuous mode, motion events are cut from the continuous recording without re-encoding instead of being encoded a second time.')}
+                            <br /><br />
+                            {t('settings_advancedsettings.motion_clips_desc2', 'Halves encoder CPU and disk writes; clips appear once their continuous segment is closed (at most 5 minutes when the movie length is unlimited).')}
+                        </p>
+                    </div>
+                    <div className="col-span-2">
+                        <Toggle
+                            checked={globalSettings.opt_motion_clips_from_continuous}
+                            onChange={val => setGlobalSettings({ ...globalSettings, opt_motion_clips_from_continuous: val })}
+                        />
+                        <p className="text-xs text-muted-foreground mt-1 opacity-70 font-medium tracking-tight">{t('settings_forms.adv_off', 'Default: Off')}</p>
+                    </div>
+                </div>
+
                 {/* Verbose Logs */}
                 <div className="grid grid-cols-1 md:grid-cols-3 gap-4 pt-4 border-t border-border/50">
                     <div className="col-span-1">
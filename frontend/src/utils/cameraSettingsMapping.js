@@ -11,7 +11,7 @@ export const CAMERA_SETTINGS_CATEGORIES = [
 ];
 
 export const CATEGORY_FIELD_MAP = {
-    recording: ['recording_mode', 'movie_quality', 'movie_passthrough', 'max_movie_length', 'preserve_movies', 'max_storage_gb', 'live_view_mode', 'rtsp_transport', 'sub_rtsp_transport'],
+    recording: ['recording_mode', 'movie_quality', 'movie_passthrough', 'max_movie_length', 'preserve_movies', 'max_storage_gb', 'live_view_mode', 'rtsp_transport', 'sub_rtsp_transport', 'decode_threads'],
     snapshots: ['picture_quality', 'picture_recording_mode', 'preserve_pictures', 'enable_manual_snapshots', 'max_pictures_storage_gb'],
     motion: [
         'threshold', 'despeckle_filter', 'motion_gap', 'captured_before', 'captured_after', 